@@ -28,7 +28,7 @@ from abipy.electrons.gw import SigresFile, SigresPlotter
 from abipy.electrons.bse import MdfFile
 from abipy.electrons.scissors import ScissorsBuilder
 from abipy.dfpt import PhbstFile, PhononBands, PhdosFile, PhdosReader
-from abipy.dfpt.ddb import DdbFile
+from abipy.dfpt.ddb import DdbFile, DdbMerger, merge_ddb_files
 from abipy.core.mixins import AbinitInputFile, AbinitLogFile, AbinitOutputFile
 from abipy.waves import WfkFile
 
@@ -0,0 +1,189 @@
+# coding: utf-8
+"""
+Registry of FFT backends used to perform (batched) 3D FFTs on :class:`Mesh3D` objects.
+
+The transforms are always computed along the last three axes of the input array
+so that a block of bands (nband, nspinor, nx, ny, nz) is transformed with a single call.
+pyFFTW and scipy.fft are used, if available, with multiple threads. numpy.fft is the fallback.
+"""
+from __future__ import print_function, division, unicode_literals
+
+import multiprocessing
+import numpy as np
+
+from collections import OrderedDict
+
+__all__ = [
+    "register_fft_backend",
+    "get_fft_backend",
+    "available_fft_backends",
+    "set_default_fft_backend",
+]
+
+
+_BACKEND_CLASSES = OrderedDict()
+
+# Cache of backend instances indexed by (name, nthreads).
+_BACKEND_INSTANCES = {}
+
+# Name of the default backend. None means "best available".
+_DEFAULT_BACKEND = None
+
+
+def register_fft_backend(cls):
+    """Class decorator used to register a new :class:`FFTBackend`."""
+    _BACKEND_CLASSES[cls.name] = cls
+    return cls
+
+
+def available_fft_backends():
+    """
+    List with the names of the backends that can be used, ordered by priority.
+    Backends registered later have higher priority.
+    """
+    return [name for name, cls in reversed(_BACKEND_CLASSES.items()) if cls.is_available()]
+
+
+def set_default_fft_backend(name):
+    """
+    Change the backend used when :func:`get_fft_backend` is called with name=None.
+    None restores the default behaviour, i.e. the best backend available.
+    """
+    global _DEFAULT_BACKEND
+    if name is not None and name not in available_fft_backends():
+        raise ValueError("FFT backend %s is not available. Choose among %s" % (name, available_fft_backends()))
+    _DEFAULT_BACKEND = name
+
+
+def get_fft_backend(name=None, nthreads=None):
+    """
+    Return an instance of :class:`FFTBackend`.
+
+    Args:
+        name: Name of the backend. None to use the default backend. An instance of FFTBackend is returned as is.
+        nthreads: Number of threads. None to use all the CPUs available.
+    """
+    if isinstance(name, FFTBackend):
+        return name
+
+    if name is None:
+        name = _DEFAULT_BACKEND if _DEFAULT_BACKEND is not None else available_fft_backends()[0]
+
+    if nthreads is None:
+        nthreads = multiprocessing.cpu_count()
+
+    key = (name, nthreads)
+    try:
+        return _BACKEND_INSTANCES[key]
+    except KeyError:
+        try:
+            cls = _BACKEND_CLASSES[name]
+        except KeyError:
+            raise ValueError("Unknown FFT backend %s. Choose among %s" % (name, list(_BACKEND_CLASSES.keys())))
+
+        if not cls.is_available():
+            raise ValueError("FFT backend %s is not available" % name)
+
+        backend = _BACKEND_INSTANCES[key] = cls(nthreads=nthreads)
+        return backend
+
+
+class FFTBackend(object):
+    """
+    Abstract base class for FFT backends.
+    Subclasses must define `name`, `is_available` and the unnormalized transforms `_fftn` and `_ifftn`.
+    """
+    name = None
+
+    def __init__(self, nthreads=1):
+        self.nthreads = nthreads
+
+    def __str__(self):
+        return "%s: nthreads = %d" % (self.__class__.__name__, self.nthreads)
+
+    @classmethod
+    def is_available(cls):
+        """True if the backend can be used."""
+        return True
+
+    @staticmethod
+    def _axes(arr):
+        return tuple(range(arr.ndim - 3, arr.ndim))
+
+    def fftn(self, arr):
+        """Forward FFT along the last three axes of arr (no normalization)."""
+        return self._fftn(arr, self._axes(arr))
+
+    def ifftn(self, arr):
+        """Backward FFT along the last three axes of arr (normalized by 1/N as in numpy)."""
+        return self._ifftn(arr, self._axes(arr))
+
+    def _fftn(self, arr, axes):
+        raise NotImplementedError()
+
+    def _ifftn(self, arr, axes):
+        raise NotImplementedError()
+
+
+@register_fft_backend
+class NumpyFFT(FFTBackend):
+    """Serial FFTs with numpy.fft."""
+    name = "numpy"
+
+    def _fftn(self, arr, axes):
+        return np.fft.fftn(arr, axes=axes)
+
+    def _ifftn(self, arr, axes):
+        return np.fft.ifftn(arr, axes=axes)
+
+
+@register_fft_backend
+class ScipyFFT(FFTBackend):
+    """FFTs with scipy.fft (multithreaded via the workers argument)."""
+    name = "scipy"
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import scipy.fft
+            return True
+        except ImportError:
+            return False
+
+    def _fftn(self, arr, axes):
+        import scipy.fft
+        return scipy.fft.fftn(arr, axes=axes, workers=self.nthreads)
+
+    def _ifftn(self, arr, axes):
+        import scipy.fft
+        return scipy.fft.ifftn(arr, axes=axes, workers=self.nthreads)
+
+
+@register_fft_backend
+class PyFFTW(FFTBackend):
+    """
+    FFTs with pyFFTW. The plans are cached so that repeated transforms
+    of arrays with the same shape and dtype do not pay the planning cost.
+    """
+    name = "pyfftw"
+
+    def __init__(self, nthreads=1):
+        super(PyFFTW, self).__init__(nthreads=nthreads)
+        import pyfftw.interfaces.cache
+        pyfftw.interfaces.cache.enable()
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import pyfftw
+            return True
+        except ImportError:
+            return False
+
+    def _fftn(self, arr, axes):
+        from pyfftw.interfaces import numpy_fft
+        return numpy_fft.fftn(arr, axes=axes, threads=self.nthreads)
+
+    def _ifftn(self, arr, axes):
+        from pyfftw.interfaces import numpy_fft
+        return numpy_fft.ifftn(arr, axes=axes, threads=self.nthreads)
@@ -9,6 +9,7 @@ from monty.functools import lazy_property
 from pymatgen.core.units import bohr_to_angstrom
 from abipy.tools import transpose_last3dims
 from abipy.iotools import Visualizer, xsf, ETSF_Reader
+from abipy.iotools.cube import cube_write_data
 from abipy.core.mesh3d import Mesh3D
 from abipy.core.mixins import Has_Structure
 from abipy.tools import transpose_last3dims
@@ -176,38 +177,127 @@ class ScalarField(Has_Structure):
     #    else:
     #        raise NotImplemented("nspinor != 1 not implmenented")
 
-    #def map_coordinates(self, rcoords, order=3, frac_coords=True)
-    #    """
-    #    Interpolate the real space data
-    #
-    #    Args:
-    #        coordinates: array_like
-    #           The coordinates at which input is evaluated.
-    #        order: int, optional
-    #            The order of the spline interpolation, default is 3. The order has to be in the range 0-5.
-    #    Returns: 
-    #       ndarray with the interpolated results.
-    #    """
-    #    from scipy.ndimage.interpolation import map_coordinates
-    #    # Compute the fractional coordinates at which datar is interpolated.
-    #    rcoords = np.asarray(rcoords)
-    #    if not frac_coords:
-    #       rcoords = self.structure.to_frac_coords(rcoords, in_cell=True)
-    #    # Wrap in the unit cell.
-    #    rcoords %= 1
-    #    coordinates = [rcoords[0], rcoords[1], rcoords[2]]
-
-    #    Interpolate the real part.
-    #    interp_data = []
-    #    for indata in self.datar_xyz:
-    #        assert not np.iscomple(indata)
-    #        interp_data.append(map_coordinates(indata.real, coordinates, order=order))
-
-    #    return np.array(interp_data)
-
-    #def fourier_interp(self, new_mesh):
-        #intp_datar = self.mesh.fourier_interp(self.datar, new_mesh, inspace="r")
-        #return self.__class__(self.nspinor, self.nsppol, self.nspden, self.structure, intp_datar)
+    def _to_frac_coords(self, rcoords, frac_coords):
+        """Return the reduced coordinates of the points as an array of shape [npts, 3]."""
+        rcoords = np.reshape(np.asarray(rcoords, dtype=np.float), (-1, 3))
+        if not frac_coords:
+            rcoords = self.structure.lattice.get_fractional_coords(rcoords)
+        return rcoords
+
+    def map_coordinates(self, rcoords, order=3, frac_coords=True):
+        """
+        Interpolate the real space data at arbitrary points with splines.
+
+        Args:
+            rcoords: array_like of shape [npts, 3] with the coordinates at which the data is evaluated.
+            order: The order of the spline interpolation, default is 3. The order has to be in the range 0-5.
+            frac_coords: True if rcoords are in reduced coordinates, False if they are Cartesian in Angstrom.
+
+        Returns:
+           ndarray of shape [nspden, npts] with the interpolated results.
+        """
+        from scipy.ndimage import map_coordinates
+        rcoords = self._to_frac_coords(rcoords, frac_coords)
+
+        # Position of the points in the padded array (coordinates are wrapped in the unit cell).
+        pad, coeffs = self._get_spline_coeffs(order)
+        coordinates = (rcoords % 1).T * np.reshape(self.mesh.shape, (3, 1)) + pad
+
+        interp_data = np.array([map_coordinates(c, coordinates, order=order, prefilter=False) for c in coeffs])
+        if np.iscomplexobj(self.datar):
+            # Real and imaginary parts are interpolated separately.
+            interp_data = interp_data[0::2] + 1j * interp_data[1::2]
+
+        return interp_data
+
+    def _get_spline_coeffs(self, order):
+        """
+        Return (pad, coeffs) where coeffs is the list with the spline coefficients of the real space data
+        computed on a grid padded with pad periodic images along each direction.
+        For complex data, the coefficients of the real and imaginary parts are stored one after the other.
+        The results are cached since the prefiltering is the expensive part of map_coordinates.
+        """
+        if not hasattr(self, "_spline_coeffs"): self._spline_coeffs = {}
+        if order in self._spline_coeffs: return self._spline_coeffs[order]
+
+        from scipy.ndimage import spline_filter
+        # The prefilter is not periodic. The error introduced at the borders
+        # decays exponentially and it is negligible after a few points.
+        pad = 12 if order > 1 else 1
+
+        if np.iscomplexobj(self.datar):
+            arrays = [a for datar in self.datar for a in (datar.real, datar.imag)]
+        else:
+            arrays = list(self.datar)
+
+        coeffs = []
+        for arr in arrays:
+            arr = np.pad(arr, pad, mode="wrap")
+            coeffs.append(spline_filter(arr, order=order) if order > 1 else arr)
+
+        self._spline_coeffs[order] = (pad, coeffs)
+        return pad, coeffs
+
+    def fourier_eval(self, rcoords, frac_coords=True):
+        """
+        Evaluate the field at arbitrary points with trigonometric interpolation
+        i.e. by summing the Fourier series defined by datag.
+        This is more accurate but more expensive than map_coordinates.
+
+        Args:
+            rcoords: array_like of shape [npts, 3] with the coordinates at which the data is evaluated.
+            frac_coords: True if rcoords are in reduced coordinates, False if they are Cartesian in Angstrom.
+
+        Returns:
+           ndarray of shape [nspden, npts] with the interpolated results.
+        """
+        rcoords = self._to_frac_coords(rcoords, frac_coords)
+        values = self.mesh.fourier_eval(self.datag, rcoords)
+        return values if np.iscomplexobj(self.datar) else values.real.copy()
+
+    def line_profile(self, point1, point2, num=200, frac_coords=True, method="spline"):
+        """
+        Interpolate the field along the segment point1 --> point2.
+
+        Args:
+            point1, point2: Extrema of the segment.
+            num: Number of points along the segment (extrema are included).
+            frac_coords: True if the points are in reduced coordinates, False if they are Cartesian in Angstrom.
+            method: "spline" to use map_coordinates, "fourier" to use fourier_eval.
+
+        Returns:
+            (dist, values) where dist is the array with the distance in Angstrom from point1
+            and values is an array of shape [nspden, num] with the field along the line.
+        """
+        p1, p2 = self._to_frac_coords([point1, point2], frac_coords)
+        rcoords = p1 + np.outer(np.linspace(0, 1, num), p2 - p1)
+
+        length = np.linalg.norm(np.dot(p2 - p1, self.mesh.vectors))
+        dist = np.linspace(0, length, num)
+
+        if method == "spline":
+            return dist, self.map_coordinates(rcoords)
+        elif method == "fourier":
+            return dist, self.fourier_eval(rcoords)
+        else:
+            raise ValueError("Wrong method %s" % method)
+
+    def fourier_interp(self, new_mesh):
+        """
+        Fourier interpolation of the field on a different FFT mesh.
+        Useful e.g. to compare fields obtained with different ecut.
+
+        Args:
+            new_mesh: :class:`Mesh3D` object or the three divisions of the new mesh.
+
+        Returns:
+            New instance of the same class defined on new_mesh.
+        """
+        if not isinstance(new_mesh, Mesh3D):
+            new_mesh = Mesh3D(new_mesh, self.mesh.vectors)
+
+        intp_datar = self.mesh.fourier_interp(self.datar, new_mesh, inspace="r")
+        return self.__class__(self.nspinor, self.nsppol, self.nspden, intp_datar, self.structure)
 
     def export(self, filename, visu=None):
         """
@@ -217,6 +307,7 @@ class ScalarField(Has_Structure):
             filename: String specifying the file path and the file format.
                 The format is defined by the file extension. filename="prefix.xsf", for example, 
                 will produce a file in XSF format. An *empty* prefix, e.g. ".xsf" makes the code use a temporary file.
+                Supported extensions: "xsf", "cube" (Gaussian cube) and "npy" (raw numpy array).
             visu:
                :class:`Visualizer` subclass. By default, this method returns the first available
                 visualizer that supports the given file format. If visu is not None, an
@@ -224,7 +315,7 @@ class ScalarField(Has_Structure):
                 applications and formats supported.
 
         Returns:
-            Instance of :class:`Visualizer`
+            Instance of :class:`Visualizer` (None for the npy format)
         """
         if "." not in filename:
             raise ValueError(" Cannot detect file extension in filename: %s " % filename)
@@ -236,11 +327,20 @@ class ScalarField(Has_Structure):
             import tempfile
             filename = tempfile.mkstemp(suffix="." + ext, text=True)[1]
 
+        if ext == "npy":
+            # Raw numpy array with shape [nspden, nx, ny, nz] (no visualizer).
+            np.save(filename, self.datar)
+            return None
+
         with open(filename, mode="w") as fh:
             if ext == "xsf":
                 # xcrysden
                 xsf.xsf_write_structure(fh, self.structure)
                 xsf.xsf_write_data(fh, self.structure, self.datar, add_replicas=True)
+            elif ext == "cube":
+                if self.nspden != 1:
+                    raise ValueError("cube format supports only nspden == 1")
+                cube_write_data(fh, self.structure, self.datar[0])
             else:
                 raise NotImplementedError("extension %s is not supported." % ext)
 
@@ -400,36 +500,18 @@ class Density(ScalarField):
         Solve the Poisson's equation in reciprocal space.
 
         returns:
-            (vhr, vhg) Hartree potential in real, reciprocal space.
-        """
-        raise NotImplementedError("")
-        # Compute |G| for each G in the mesh and treat G=0.
-        gvecs = self.mesh.gvecs
-        gwork = self.mesh.zeros().ravel()
-        gnorm = self.structure.gnorm(gvec)
-
-        for idx, gg in enumerate(gvecs):
-            #gnorm = self.structure.gnorm(gg)
-            gnorm = 1.0  # self.structure.gnorm(gg)
-
-            #gg = np.atleast_2d(gg)
-            #mv = np.dot(self.structure.gmet, gg.T)
-            #norm2 = 2*np.pi * np.dot(gg, mv)
-            #gnorm = np.sqrt(norm2)
-
-            #print gg, gnorm
-            if idx != 0:
-                gwork[idx] = 4*np.pi/gnorm
-            else:
-                gwork[idx] = 0.0
+            (vhr, vhg) Hartree potential (in Hartree) in real, reciprocal space.
+        """
+        # 4 pi / |G|^2 on the FFT mesh. The G=0 component is set to zero (neutralizing background).
+        g2 = self.mesh.g2
+        with np.errstate(divide="ignore"):
+            gwork = np.where(g2 > 0, 4 * np.pi / g2, 0.0)
 
-        new_shape = self.mesh.ndivs
-        gwork = np.reshape(gwork, new_shape)
-        #gwork = self.mesh.reshape(gwork)
+        # The density and G are in Angstrom units, the factor converts to atomic units.
+        vhg = self.total_rhog * gwork * bohr_to_angstrom
 
         # FFT to obtain vh in real space.
-        vhg = self.total_rhog * gwork
-        vhr = self.mesh.fft_g2r(vhg, fg_ishifted=False)
+        vhr = self.mesh.fft_g2r(vhg, fg_ishifted=False).real
 
         return vhr, vhg
 
@@ -464,33 +546,106 @@ class DensityReader(ETSF_Reader):
         structure = self.read_structure()
         dims = self.read_den_dims()
 
+        # rhor is a C-ordered view of the data stored in Fortran order on file, no copy is needed.
+        rhor = self.read_rhor()
+        return cls(dims.nspinor, dims.nsppol, dims.nspden, rhor, structure, iorder="c")
+
+    def read_rhor(self, spin=None, chunk_size=2**18):
+        """
+        Read the density in real space (electrons/Angstrom^3).
+
+        The data is read by hyperslabs of z-planes so that only the spin components
+        that are requested are loaded and no temporary copy of the full array is needed.
+
+        Args:
+            spin: None to read all the components. If not None, only the component with index spin is read.
+                For collinear spin-polarized calculations (nspden == 2), 0 selects the spin-up
+                and 1 the spin-down density.
+            chunk_size: Max number of elements read from file in a single call.
+
+        Returns:
+            Array of shape [nspden, nx, ny, nz] (nspden == 1 if spin is not None). 
+            This is a view of the Fortran-ordered array with the indices in C-order.
+        """
+        dims = self.read_den_dims()
+        spins = self._get_spins(dims, spin)
+
+        rhor = np.empty((len(spins), dims.nfft3, dims.nfft2, dims.nfft1))
+        for i, s in enumerate(spins):
+            for zslice, rho_slab in self._iter_slabs(dims, s, chunk_size):
+                rhor[i, zslice] = rho_slab
+
+        # Structure uses Angstrom. Abinit uses bohr.
+        rhor /= bohr_to_angstrom ** 3
+
+        # (z,y,x) --> (x,y,z)
+        return rhor.transpose(0, 3, 2, 1)
+
+    def read_nelect(self, spin=None, chunk_size=2**18):
+        """
+        Integrate the density by reading the file in chunks, without loading the full array.
+
+        Args:
+            spin: None to integrate all the components, else the index of the component (see read_rhor).
+            chunk_size: Max number of elements read from file in a single call.
+
+        Returns:
+            Array with the number of electrons for each spin component.
+            For collinear spin-polarized calculations, n_up - n_down gives the magnetization.
+        """
+        dims = self.read_den_dims()
+        spins = self._get_spins(dims, spin)
+
+        # Abinit uses bohr for both the density and the volume.
+        structure = self.read_structure()
+        dv = structure.volume / bohr_to_angstrom ** 3 / (dims.nfft1 * dims.nfft2 * dims.nfft3)
+
+        nelect = np.zeros(len(spins))
+        for i, s in enumerate(spins):
+            for _, rho_slab in self._iter_slabs(dims, s, chunk_size):
+                nelect[i] += rho_slab.sum()
+
+        return nelect * dv
+
+    @staticmethod
+    def _get_spins(dims, spin):
+        """List with the indices of the spin components to read."""
+        if dims.cplex_den != 1:
+            raise NotImplementedError("cplex_den %s not coded" % dims.cplex_den)
+        if dims.nspden == 4:
+            raise NotImplementedError("nspden == 4 not coded")
+        if dims.nspden not in (1, 2):
+            raise RuntimeError("You should not be here")
+
+        if spin is None:
+            return list(range(dims.nspden))
+
+        if spin not in range(dims.nspden):
+            raise ValueError("Wrong spin index %s for nspden %s" % (spin, dims.nspden))
+        return [spin]
+
+    def _iter_slabs(self, dims, spin, chunk_size):
+        """
+        Yields (zslice, slab) where slab is the array with shape [nz_slab, nfft2, nfft1] with the 
+        density for the given spin in the planes zslice (Fortran order, Abinit units).
+        """
         # Abinit conventions:
         # rhor(nfft,nspden) = electron density in r space
         # (if spin polarized, array contains total density in first half and spin-up density in second half)
         # (for non-collinear magnetism, first element: total density, 3 next ones: mx,my,mz in units of hbar/2)
-        rhor = self.read_value("density")
-
-        if dims.nspden == 1:
-            pass
-        elif dims.nspden == 2:
-            # Store rho_up, rho_down instead of rho_total, rho_up
-            total = rhor[0].copy()
-            rhor[0] = rhor[1]
-            rhor[1] = total - rhor[1]
-        elif dims.nspden == 4:
-            raise NotImplementedError("nspden == 4 not coded")
-        else:
-            raise RuntimeError("You should not be here")
+        # Here we return rho_up, rho_down instead of rho_total, rho_up
+        var = self.read_variable("density")
+        nz_slab = max(1, chunk_size // (dims.nfft1 * dims.nfft2))
 
-        # use iorder="f" to transpose the last 3 dimensions since ETSF
-        # stores data in Fortran order while abipy uses C-ordering.
-        if dims.cplex_den == 1:
-            # Get rid of fake last dimensions (cplex).
-            rhor = np.reshape(rhor, (dims.nspden, dims.nfft1, dims.nfft2, dims.nfft3))
+        for z0 in range(0, dims.nfft3, nz_slab):
+            zslice = slice(z0, min(z0 + nz_slab, dims.nfft3))
 
-            # Structure uses Angstrom. Abinit uses bohr.
-            rhor /= (bohr_to_angstrom ** 3)
-            return cls(dims.nspinor, dims.nsppol, dims.nspden, rhor, structure, iorder="f")
+            if dims.nspden == 1:
+                slab = np.asarray(var[0, zslice, :, :, 0])
+            elif spin == 0:
+                slab = np.asarray(var[1, zslice, :, :, 0])
+            else:
+                slab = np.asarray(var[0, zslice, :, :, 0])
+                slab -= np.asarray(var[1, zslice, :, :, 0])
 
-        else:
-            raise NotImplementedError("cplex_den %s not coded" % dims.cplex_den)
+            yield zslice, slab
@@ -5,6 +5,8 @@ from __future__ import print_function, division, unicode_literals
 import collections
 import numpy as np
 
+from monty.functools import lazy_property
+from pymatgen.core.units import bohr_to_ang
 from .kpoints import Kpoint
 
 __all__ = [
@@ -36,20 +38,27 @@ class GSphere(collections.Sequence):
         if istwfk != 1:
             raise NotImplementedError("istwfk %d is not implemented" % self.istwfk)
 
+        # Cache with the tables used to map the sphere onto FFT meshes (indexed by mesh.shape)
+        self._fft_tables = {}
+        # Cache with the tables used to rotate arrays defined on the sphere (see rotation_table)
+        self._rot_tables = {}
+
     @property
     def gvecs(self):
         """ndarray with the G-vectors in reduced coordinates."""
         return self._gvecs
 
-    #@property
-    #def kpg2(self):
-    #    """ndarray with |k+G|**2. in atomic unit"""
-    #    try:
-    #        return self._kpg2
-    #    except AttributeError
-    #        # note that now we use pymatgen lattice hence we have to convert to a.u.
-    #        self.kpg2 = 
-    #        return self._kpg2
+    @lazy_property
+    def kpg2(self):
+        """
+        ndarray with |k+G|**2 in atomic units (Bohr^-2).
+        The reciprocal lattice is assumed in 1/Angstrom (2 pi included) as in pymatgen.
+        """
+        gprimd = np.asarray(getattr(self.lattice, "matrix", self.lattice), dtype=np.float)
+        gmet = np.dot(gprimd, gprimd.T) * bohr_to_ang ** 2
+
+        kpg = self.gvecs + self.kpoint.frac_coords
+        return np.sum(np.dot(kpg, gmet) * kpg, axis=1)
 
     # Sequence protocol
     def __len__(self):
@@ -147,79 +156,104 @@ class GSphere(collections.Sequence):
     #  """Returns the number of divisions of the FFT box enclosing the sphere."""
     #  #return ndivs
 
+    def fft_indices(self, mesh):
+        """
+        Return the indices of the G-vectors of the sphere in the flattened FFT mesh
+        i.e. arr_on_mesh.flat[inds] gives the values of the sphere.
+        The table is computed once per mesh shape and then cached.
+        """
+        try:
+            return self._fft_tables[mesh.shape]
+        except KeyError:
+            pass
+
+        if self.istwfk != 1:
+            raise NotImplementedError("istwfk = %s not implemented" % self.istwfk)
+
+        #  i1=kg_k(1,ipw); if(i1<0)i1=i1+n1; i1=i1+1
+        # +G and -G would be mapped onto the same point if the sphere spans ndivs points (or more).
+        ndivs = np.array(mesh.shape)
+        gvecs = self.gvecs
+        if (np.any(gvecs >= ndivs) or np.any(gvecs < -ndivs) or
+            np.any(gvecs.max(axis=0) - gvecs.min(axis=0) >= ndivs)):
+            raise ValueError("FFT mesh %s is too small to contain the G-sphere" % str(mesh.shape))
+
+        boxg = np.where(gvecs < 0, gvecs + ndivs, gvecs)
+        inds = np.ravel_multi_index(boxg.T, mesh.shape)
+
+        self._fft_tables[mesh.shape] = inds
+        return inds
+
+    def rotation_table(self, symmop, g0=(0, 0, 0)):
+        """
+        Return the table used to rotate arrays defined on the sphere:
+        gvecs[table[ig]] = S gvecs[ig] + g0 where S is the rotation of symmop in reciprocal space.
+        Entries are set to -1 if the rotated G-vector is not in the sphere.
+        The table is computed once per (operation, g0) and then cached.
+
+        Args:
+            symmop: :class:`SymmOp` object.
+            g0: Reciprocal lattice vector added to the rotated G-vectors e.g. G0 = Sk - k
+                if symmop belongs to the little group of k.
+        """
+        g0 = np.asarray(g0, dtype=np.int)
+        key = (tuple(np.ravel(symmop.rot_g)), symmop.time_sign, tuple(g0))
+        try:
+            return self._rot_tables[key]
+        except KeyError:
+            pass
+
+        # Lookup table defined on the box enclosing the sphere: box[flat_index(G)] = ig
+        gmin = self.gvecs.min(axis=0)
+        dims = tuple(self.gvecs.max(axis=0) - gmin + 1)
+        box = -np.ones(np.prod(dims), dtype=np.int)
+        box[np.ravel_multi_index((self.gvecs - gmin).T, dims)] = np.arange(self.npw)
+
+        rot_gvecs = symmop.rotate_gvecs(self.gvecs) + g0 - gmin
+        inside = np.all((rot_gvecs >= 0) & (rot_gvecs < dims), axis=1)
+
+        table = -np.ones(self.npw, dtype=np.int)
+        table[inside] = box[np.ravel_multi_index(rot_gvecs[inside].T, dims)]
+
+        self._rot_tables[key] = table
+        return table
+
     def tofftmesh(self, mesh, arr_on_sphere):
         """
         Insert the array arr_on_sphere given on the sphere inside the FFT mesh.
 
         Args:
-            mesh:
-            arr_on_sphere:
+            mesh: :class:`Mesh3D` object.
+            arr_on_sphere: Array of shape [..., npw].
         """
         arr_on_sphere = np.atleast_2d(arr_on_sphere)
         ishape = arr_on_sphere.shape
-        s0 = ishape[0]
         assert self.npw == ishape[-1]
 
-        arr_on_mesh = np.zeros((s0,) + mesh.shape, dtype=arr_on_sphere.dtype)
-
-        if self.istwfk == 1:
-            #do ipw=1,npw
-            #  i1=kg_k(1,ipw); if(i1<0)i1=i1+n1; i1=i1+1
-            #  i2=kg_k(2,ipw); if(i2<0)i2=i2+n2; i2=i2+1
-            #  i3=kg_k(3,ipw); if(i3<0)i3=i3+n3; i3=i3+1
-            #end do
-
-            (n1, n2, n3) = mesh.shape
-            for sph_idx, gvec in enumerate(self.gvecs):
-                i1 = gvec[0]
-                if i1 < 0: i1 = i1 + n1
-                i2 = gvec[1]
-                if i2 < 0: i2 = i2 + n2
-                i3 = gvec[2]
-                if i3 < 0: i3 = i3 + n3
-                arr_on_mesh[..., i1, i2, i3] = arr_on_sphere[..., sph_idx]
+        inds = self.fft_indices(mesh)
+        arr_on_sphere = np.reshape(arr_on_sphere, (-1, self.npw))
 
-        else:
-            raise NotImplementedError("istwfk = %s not implemented" % self.istwfk)
+        arr_on_mesh = np.zeros((arr_on_sphere.shape[0], mesh.size), dtype=arr_on_sphere.dtype)
+        arr_on_mesh[:, inds] = arr_on_sphere
 
-        if s0 == 1:  
+        if ishape[:-1] == (1,):
             # Reinstate input shape
-            arr_on_mesh.shape = mesh.shape
+            return np.reshape(arr_on_mesh, mesh.shape)
 
-        return arr_on_mesh
+        return np.reshape(arr_on_mesh, ishape[:-1] + mesh.shape)
 
     def fromfftmesh(self, mesh, arr_on_mesh):
         """
         Transfer arr_on_mesh given on the FFT mesh to the G-sphere.
         """
-        indim =  arr_on_mesh.ndim
+        indim = arr_on_mesh.ndim
         arr_on_mesh = mesh.reshape(arr_on_mesh)
-        ishape = arr_on_mesh.shape
-        s0 = ishape[0]
-
-        arr_on_sphere = np.empty((s0,) + (self.npw,), dtype=arr_on_mesh.dtype)
-
-        if self.istwfk == 1:
-            #do ig=1,npwout
-            #  i1=kg_kout(1,ig); if (i1<0) i1=i1+n1; i1=i1+1
-            #  i2=kg_kout(2,ig); if (i2<0) i2=i2+n2; i2=i2+1
-            #  i3=kg_kout(3,ig); if (i3<0) i3=i3+n3; i3=i3+1
-            #end do
-            (n1, n2, n3) = mesh.shape
-
-            for sph_idx, gvec in enumerate(self.gvecs):
-                i1 = gvec[0]
-                if i1 < 0: i1 = i1 + n1
-                i2 = gvec[1]
-                if i2 < 0: i2 = i2 + n2
-                i3 = gvec[2]
-                if i3 < 0: i3 = i3 + n3
-                arr_on_sphere[..., sph_idx] = arr_on_mesh[..., i1, i2, i3]
+        s0 = arr_on_mesh.shape[0]
 
-        else:
-            raise NotImplementedError("istwfk %s is not implemented" % self.istwfk)
+        inds = self.fft_indices(mesh)
+        arr_on_sphere = np.reshape(arr_on_mesh, (s0, mesh.size))[:, inds]
 
-        if s0 == 1 and indim == 1:  
+        if s0 == 1 and indim == 1:
             # Reinstate input shape
             arr_on_sphere.shape = self.npw
 
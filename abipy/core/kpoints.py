@@ -23,6 +23,10 @@ __all__ = [
     "IrredZone",
     "rc_list",
     "kmesh_from_mpdivs",
+    "ibz_from_mpdivs",
+    "KSymmetryTable",
+    "KpointHashTable",
+    "map_mesh2ibz",
 ]
 
 # Tolerance used to compare k-points.
@@ -137,18 +141,304 @@ def kmesh_from_mpdivs(mpdivs, shifts, pbc=False, order="bz"):
     shifts = np.reshape(shifts, (-1,3))
     assert np.all(np.abs(shifts) <= 0.5)
 
-    # Build k-point grid.
-    from itertools import product
+    # Build k-point grid (last index running fastest).
     kbz = []
     for ish, shift in enumerate(shifts):
         rc0 = rc_list(mpdivs[0], shift[0], pbc=pbc, order=order)
         rc1 = rc_list(mpdivs[1], shift[1], pbc=pbc, order=order)
         rc2 = rc_list(mpdivs[2], shift[2], pbc=pbc, order=order)
 
-        for kxyz in product(rc0, rc1, rc2):
-            kbz.append(kxyz)
+        kbz.append(np.array(np.meshgrid(rc0, rc1, rc2, indexing="ij")).reshape(3, -1).T)
 
-    return np.array(kbz)
+    return np.concatenate(kbz)
+
+
+def _mesh_indices(frac_coords, mpdivs, shifts, atol):
+    """
+    Returns the index of the points with reduced coordinates frac_coords (arbitrary shape [..., 3])
+    in the mesh produced by `kmesh_from_mpdivs` with order="unit_cell" (-1 if the point is not in the mesh)
+    and the integer coordinates (i + shift)/n of the points before the wrapping to the unit cell.
+    """
+    frac_coords = np.asarray(frac_coords, dtype=np.float)
+    flat = -np.ones(frac_coords.shape[:-1], dtype=np.int)
+    ixyz = np.zeros(frac_coords.shape, dtype=np.int)
+
+    nmesh = mpdivs.prod()
+    for ish, shift in enumerate(shifts):
+        xyz = frac_coords * mpdivs - shift
+        rxyz = np.around(xyz)
+        ok = np.all(np.abs(xyz - rxyz) < atol * mpdivs.max(), axis=-1) & (flat == -1)
+        rxyz = rxyz[ok].astype(np.int)
+        ixyz[ok] = rxyz
+        flat[ok] = ish * nmesh + np.ravel_multi_index(tuple((rxyz % mpdivs).T), mpdivs)
+
+    return flat, ixyz
+
+
+def ibz_from_mpdivs(mpdivs, shifts, krots=None, atol=_ATOL_KDIFF):
+    """
+    Reduce a homogeneous mesh to the irreducible wedge.
+
+    Args:
+        mpdivs: The three MP divisions.
+        shifts: Array-like object with the shifts of the mesh.
+        krots: Array of shape [nsym, 3, 3] with the rotations in reciprocal space (reduced coordinates)
+            multiplied by the time-reversal sign e.g. spacegroup.rot_g * spacegroup.time_sign[:, None, None].
+            None if only the identity should be used. Rotations that do not map the mesh onto itself are ignored.
+        atol: Absolute tolerance used to compare k-points.
+
+    Returns:
+        (frac_coords, weights) where frac_coords is a `ndarray` with the reduced coordinates of the
+        points in the IBZ (wrapped to ]-1/2, 1/2]) and weights are normalized to one.
+        As in ABINIT, the representative of a star is the first point of the mesh
+        when the first reduced coordinate runs fastest.
+    """
+    mpdivs = np.array(mpdivs, dtype=np.int)
+    shifts = np.reshape(shifts, (-1, 3))
+    kbz = kmesh_from_mpdivs(mpdivs, shifts, order="unit_cell")
+    nbz, nmesh = len(kbz), mpdivs.prod()
+
+    # Rank of the points of the mesh when the first index runs fastest.
+    i, j, k = np.unravel_index(np.arange(nmesh), mpdivs)
+    rank = np.concatenate([ish * nmesh + i + mpdivs[0] * (j + mpdivs[1] * k) for ish in range(len(shifts))])
+
+    # Each point is associated to the point of its star with the smallest rank.
+    star_rank = rank.copy()
+    if krots is not None:
+        for krot in np.reshape(krots, (-1, 3, 3)):
+            flat = _mesh_indices(np.dot(kbz, krot.T), mpdivs, shifts, atol)[0]
+            if np.any(flat == -1): continue
+            star_rank = np.minimum(star_rank, rank[flat])
+
+    counts = np.bincount(star_rank, minlength=nbz)
+    irred_ranks = np.nonzero(counts)[0]
+
+    rank2bz = np.empty(nbz, dtype=np.int)
+    rank2bz[rank] = np.arange(nbz)
+
+    return wrap_to_ws(kbz[rank2bz[irred_ranks]]), counts[irred_ranks] / nbz
+
+
+class KSymmetryTable(object):
+    """
+    Tables with the mapping between the points of a homogeneous mesh (full BZ)
+    and the points in the irreducible wedge:
+
+        k_bz = S k_ibz - G0
+
+    where S is one of the symmetries (time-reversal included) and G0 a reciprocal lattice vector.
+
+    The points of the mesh are ordered in blocks, one block for each shift.
+    Inside each block, points are ordered following the C convention i.e. the mesh is the one
+    produced by `kmesh_from_mpdivs` with order="unit_cell". The computation is fully vectorized.
+
+    .. attribute:: bz2ibz
+
+        `ndarray` with the index of the IBZ point associated to each point of the mesh (-1 if not found).
+
+    .. attribute:: symop
+
+        `ndarray` with the index of the symmetry (in symmops) such that k_bz = S k_ibz - G0.
+
+    .. attribute:: g0
+
+        `ndarray` of shape [len_bz, 3] with the G0 vectors in reduced coordinates.
+    """
+    def __init__(self, symmops, mpdivs, shifts, ibz_frac_coords, atol=_ATOL_KDIFF):
+        """
+        Args:
+            symmops: Sequence of :class:`SymmOp` e.g. the FM symmetries of the :class:`SpaceGroup`.
+                If None, the identity and time-reversal are used.
+            mpdivs: The three MP divisions.
+            shifts: Array-like object with the shifts of the mesh.
+            ibz_frac_coords: Array-like object with the reduced coordinates of the points in the IBZ.
+            atol: Absolute tolerance used to compare k-points.
+        """
+        self.mpdivs = np.array(mpdivs, dtype=np.int)
+        self.shifts = np.reshape(shifts, (-1, 3))
+        self.symmops = symmops
+
+        if symmops is not None:
+            # Rotations in reciprocal space (time-reversal included).
+            self.krots = np.array([op.rot_g * op.time_sign for op in symmops])
+        else:
+            self.krots = np.array([np.eye(3, dtype=np.int), -np.eye(3, dtype=np.int)])
+
+        ibz_frac_coords = np.reshape(ibz_frac_coords, (-1, 3))
+        nsym, nibz = len(self.krots), len(ibz_frac_coords)
+
+        # Reduced coordinates of the rotated points: shape [nsym, nibz, 3]
+        rot_kcoords = np.einsum("sij,kj->ski", self.krots, ibz_frac_coords)
+        isym = np.broadcast_arrays(np.arange(nsym)[:, np.newaxis], rot_kcoords[..., 0])[0]
+        ik_ibz = np.broadcast_arrays(np.arange(nibz), rot_kcoords[..., 0])[0]
+
+        # Index in the mesh of the rotated points, -1 if S k_ibz does not belong to the mesh.
+        flat, ixyz = self._mesh_indices(rot_kcoords, atol)
+        ok = flat != -1
+
+        # np.unique returns the first occurrence so that the identity has precedence.
+        bz_inds, first = np.unique(flat[ok], return_index=True)
+
+        self.bz2ibz = -np.ones(self.len_bz, dtype=np.int)
+        self.symop = -np.ones(self.len_bz, dtype=np.int)
+        self.g0 = np.zeros((self.len_bz, 3), dtype=np.int)
+
+        self.bz2ibz[bz_inds] = ik_ibz[ok][first]
+        self.symop[bz_inds] = isym[ok][first]
+        self.g0[bz_inds] = (ixyz[ok][first] // self.mpdivs)
+
+    def _mesh_indices(self, frac_coords, atol):
+        """
+        Returns the index in the mesh of the points with reduced coordinates frac_coords
+        (arbitrary shape [..., 3]) and the integer coordinates (i + shift)/n of the points
+        before the wrapping to the unit cell.
+        """
+        return _mesh_indices(frac_coords, self.mpdivs, self.shifts, atol)
+
+    @property
+    def len_bz(self):
+        """Number of points in the mesh."""
+        return int(self.mpdivs.prod()) * len(self.shifts)
+
+    @property
+    def is_complete(self):
+        """True if all the points of the mesh can be reconstructed from the IBZ."""
+        return not np.any(self.bz2ibz == -1)
+
+    @lazy_property
+    def bz_frac_coords(self):
+        """`ndarray` of shape [len_bz, 3] with the reduced coordinates of the points of the mesh in [0, 1)."""
+        n1, n2, n3 = self.mpdivs
+        ixyz = np.array(np.meshgrid(np.arange(n1), np.arange(n2), np.arange(n3), indexing="ij")).reshape(3, -1).T
+        return np.concatenate([(ixyz + shift) / self.mpdivs for shift in self.shifts])
+
+    def mesh_indices(self, frac_coords, atol=_ATOL_KDIFF):
+        """
+        Returns the indices in the mesh of the points with reduced coordinates frac_coords.
+        Points are equivalent if they differ by a reciprocal lattice vector. -1 if the point is not in the mesh.
+        """
+        return self._mesh_indices(np.reshape(frac_coords, (-1, 3)), atol)[0]
+
+    def symmetrize(self, values_ibz, axis=0):
+        """
+        Symmetrize scalar quantities (e.g. band energies, occupation factors, phonon frequencies)
+        given in the IBZ to have them on the full mesh.
+
+        Args:
+            values_ibz: Array-like object with the values in the IBZ.
+            axis: The axis of values_ibz associated to the k-points.
+
+        Returns:
+            `ndarray` with the values on the mesh (len_bz points along axis).
+        """
+        if not self.is_complete:
+            raise ValueError("%d points of the mesh cannot be reconstructed from the IBZ" %
+                             np.count_nonzero(self.bz2ibz == -1))
+
+        return np.take(values_ibz, self.bz2ibz, axis=axis)
+
+
+def map_mesh2ibz(structure, mpdivs, shift, ibz, atol=_ATOL_KDIFF):
+    """
+    Map the points of a homogeneous mesh onto the irreducible wedge using the
+    ferromagnetic symmetries of the structure (time-reversal included, if present).
+    If the structure does not have a spacegroup, only the identity and time-reversal are used.
+
+    Args:
+        structure: :class:`Structure` object.
+        mpdivs: The three MP divisions.
+        shift: The shift of the mesh (only one shift is supported).
+        ibz: :class:`KpointList` or array-like object with the reduced coordinates of the points in the IBZ.
+        atol: Absolute tolerance used to compare k-points.
+
+    Returns:
+        `ndarray` with the index of the IBZ point associated to each point of the mesh.
+        The points of the mesh are ordered as in `kmesh_from_mpdivs` with order="unit_cell".
+        -1 is used if the point cannot be reconstructed from the IBZ.
+    """
+    if len(np.reshape(shift, (-1, 3))) != 1:
+        raise ValueError("Multiple shifts are not supported")
+
+    spacegroup = getattr(structure, "spacegroup", None)
+    symmops = spacegroup.fm_symmops if spacegroup is not None else None
+
+    ibz_frac_coords = getattr(ibz, "frac_coords", ibz)
+    return KSymmetryTable(symmops, mpdivs, shift, ibz_frac_coords, atol=atol).bz2ibz
+
+
+class KpointHashTable(object):
+    """
+    Hash table used to find k-points in O(1). The keys are obtained by rounding the
+    reduced coordinates (wrapped to [0, 1[ if umklapp is True) on a grid with spacing `binsize`.
+    Points close to the border of a bin are searched in the neighboring bins as well so that the
+    lookup gives the same results as a linear search with `issamek` and tolerance atol.
+    """
+    def __init__(self, frac_coords, atol=_ATOL_KDIFF, umklapp=True, binsize=1e-6):
+        """
+        Args:
+            frac_coords: Array-like object with the reduced coordinates of the k-points.
+            atol: Absolute tolerance used to compare k-points.
+            umklapp: True if k-points differing by a reciprocal lattice vector are considered equal.
+            binsize: Size of the bins used to compute the keys. Must be much larger than atol.
+        """
+        assert binsize > 10 * atol
+        self.atol, self.umklapp, self.binsize = atol, umklapp, binsize
+        self.nbins = int(round(1 / binsize))
+
+        self._frac_coords = []
+        self._table = collections.defaultdict(list)
+        for frac_coords in np.reshape(frac_coords, (-1, 3)):
+            self.add(frac_coords)
+
+    def __len__(self):
+        return len(self._frac_coords)
+
+    def _scaled(self, frac_coords):
+        x = np.asarray(frac_coords, dtype=np.float)
+        if self.umklapp: x = x % 1
+        return x / self.binsize
+
+    def _key(self, ixyz):
+        return tuple(int(i) % self.nbins for i in ixyz) if self.umklapp else tuple(int(i) for i in ixyz)
+
+    def add(self, frac_coords):
+        """Add a k-point to the table. Returns its index."""
+        idx = len(self._frac_coords)
+        self._frac_coords.append(np.asarray(frac_coords))
+        self._table[self._key(np.floor(self._scaled(frac_coords) + 0.5))].append(idx)
+        return idx
+
+    def find(self, frac_coords):
+        """Returns the first index of the k-point with reduced coordinates frac_coords. -1 if not found."""
+        x = self._scaled(frac_coords)
+        ixyz = np.floor(x + 0.5)
+
+        # Bins that may contain points within atol (more than one bin only if x is close to a border).
+        delta = self.atol / self.binsize
+        cands = []
+        for i in range(3):
+            c = [ixyz[i]]
+            if x[i] + delta >= ixyz[i] + 0.5: c.append(ixyz[i] + 1)
+            if x[i] - delta < ixyz[i] - 0.5: c.append(ixyz[i] - 1)
+            cands.append(c)
+
+        found = -1
+        for cx in cands[0]:
+            for cy in cands[1]:
+                for cz in cands[2]:
+                    for idx in self._table.get(self._key((cx, cy, cz)), ()):
+                        if found != -1 and idx > found: break
+                        if self._issame(frac_coords, self._frac_coords[idx]):
+                            found = idx
+                            break
+
+        return found
+
+    def _issame(self, k1, k2):
+        if self.umklapp:
+            return issamek(k1, k2, atol=self.atol)
+        else:
+            return np.allclose(k1, k2, rtol=0, atol=self.atol)
 
 
 class KpointsError(Exception):
@@ -279,9 +569,7 @@ class Kpoint(object):
 
     def set_name(self, name):
         """Set the name of the k-point."""
-        # Fix typo in Latex syntax (if any).
-        if name is not None and name.startswith("\\"): name = "$" + name + "$"
-        self._name = name
+        self._name = _fix_kname(name)
 
     @property
     def on_border(self):
@@ -375,21 +663,88 @@ class Kpoint(object):
         
     def compute_star(self, symmops, wrap_tows=True):
         """Return the star of the kpoint (tuple of `Kpoint` objects)."""
-        frac_coords = [self.frac_coords]
-
-        for sym in symmops:
-            sk_coords = sym.rotate_k(self.frac_coords, wrap_tows=wrap_tows)
+        if hasattr(symmops, "rotate_k_all"):
+            # SpaceGroup: use the stacked arrays.
+            all_sk = symmops.rotate_k_all(self.frac_coords, wrap_tows=wrap_tows)
+        else:
+            all_sk = [sym.rotate_k(self.frac_coords, wrap_tows=wrap_tows) for sym in symmops]
 
-            # Add it only if it's not already in the list.
-            for prev_coords in frac_coords:
-                if issamek(sk_coords, prev_coords, atol=self.ATOL_KDIFF):
-                    break
-            else:
+        # Add the rotated points only if they are not already in the list.
+        table = KpointHashTable([self.frac_coords], atol=self.ATOL_KDIFF)
+        frac_coords = [self.frac_coords]
+        for sk_coords in all_sk:
+            if table.find(sk_coords) == -1:
+                table.add(sk_coords)
                 frac_coords.append(sk_coords)
 
         return KpointStar(self.lattice, frac_coords, weights=None, names=len(frac_coords) * [self.name])
 
 
+def _fix_kname(name):
+    """Fix typo in Latex syntax (if any) e.g. "\\Gamma" --> "$\\Gamma$"."""
+    if name is not None and name.startswith("\\"): name = "$" + name + "$"
+    return name
+
+
+class _KpointView(Kpoint):
+    """
+    Lightweight :class:`Kpoint` whose data (coordinates, weight and name) are stored
+    in the arrays of the parent :class:`KpointList`. Changing the weight or the name
+    of the view changes the values stored in the list.
+    Operations producing new points return standalone :class:`Kpoint` objects.
+    """
+    def __init__(self, klist, index):
+        self._klist, self._index = klist, index
+        self._frac_coords = klist._frac_coords[index]
+        self._lattice = klist.reciprocal_lattice
+
+    def __reduce__(self):
+        # Pickle as a standalone Kpoint.
+        return (Kpoint, (self.frac_coords, self.lattice, self._weight, self._name))
+
+    @property
+    def _weight(self):
+        return self._klist._weights[self._index]
+
+    @_weight.setter
+    def _weight(self, weight):
+        self._klist._weights[self._index] = weight if weight is not None else 0.0
+
+    @property
+    def _name(self):
+        names = self._klist._names
+        return None if names is None else names[self._index]
+
+    @_name.setter
+    def _name(self, name):
+        if self._klist._names is None:
+            if name is None: return
+            self._klist._names = len(self._klist) * [None]
+        self._klist._names[self._index] = _fix_kname(name)
+
+    def detach(self):
+        """Returns a standalone :class:`Kpoint` with a copy of the data."""
+        return Kpoint(self.frac_coords.copy(), self.lattice, weight=self._weight, name=self._name)
+
+    def __add__(self, other):
+        return self.detach() + other
+
+    def __sub__(self, other):
+        return self.detach() - other
+
+    def copy(self):
+        return self.detach().copy()
+
+    def versor(self):
+        return self.detach().versor()
+
+    def wrap_to_ws(self):
+        return self.detach().wrap_to_ws()
+
+    def wrapt_to_bz(self):
+        return self.detach().wrapt_to_bz()
+
+
 class KpointList(collections.Sequence):
     """
     Base class defining a sequence of :class:`Kpoint` objects. Essentially consists
@@ -407,21 +762,26 @@ class KpointList(collections.Sequence):
         """
         self._reciprocal_lattice = reciprocal_lattice
 
+        # Data are stored in arrays. Kpoint objects are created on demand (see _kpoint).
         self._frac_coords = frac_coords = np.reshape(frac_coords, (-1, 3))
 
         if weights is not None:
             assert len(weights) == len(frac_coords)
-            weights = np.asarray(weights)
+            self._weights = np.array(weights, dtype=np.float)
         else:
-            weights = np.zeros(len(self.frac_coords))
+            self._weights = np.zeros(len(self.frac_coords))
 
         if names is not None:
             assert len(names) == len(frac_coords)
+            names = [_fix_kname(name) for name in names]
+        self._names = names
 
-        self._points = []
-        for i, rcs in enumerate(frac_coords):
-            name = None if names is None else names[i]
-            self._points.append(Kpoint(rcs, self.reciprocal_lattice, weight=weights[i], name=name))
+    def _kpoint(self, index):
+        """
+        Returns the :class:`Kpoint` with the given index. The view is created on demand
+        and not stored so that it is freed when the caller releases it.
+        """
+        return _KpointView(self, index)
 
     @classmethod
     def from_file(cls, filepath):
@@ -449,26 +809,34 @@ class KpointList(collections.Sequence):
 
     # Sequence protocol.
     def __len__(self):
-        return len(self._points)
+        return len(self._frac_coords)
 
     def __iter__(self):
-        return self._points.__iter__()
+        for i in range(len(self)):
+            yield self._kpoint(i)
 
     def __getitem__(self, slice):
-        return self._points[slice]
+        if isinstance(slice, (int, np.integer)):
+            if slice < 0: slice += len(self)
+            if not 0 <= slice < len(self):
+                raise IndexError("KpointList index out of range")
+            return self._kpoint(int(slice))
+
+        return [self._kpoint(i) for i in range(len(self))[slice]]
 
     def __contains__(self, kpoint):
-        return kpoint in self._points
+        return self.find(kpoint) != -1
 
     def __reversed__(self):
-        return self._points.__reversed__()
+        for i in reversed(range(len(self))):
+            yield self._kpoint(i)
 
     def __add__(self, other):
         assert self.reciprocal_lattice == other.reciprocal_lattice
         return KpointList(self.reciprocal_lattice, 
-                          frac_coords=[k.frac_coords for k in self] + [k.frac_coords for k in other], 
+                          frac_coords=np.concatenate((self.frac_coords, other.frac_coords)),
                           weights=None,
-                          names=[k.name for k in self] + [k.name for k in other],
+                          names=self.names + other.names,
                         )
 
     def __eq__(self, other):
@@ -481,30 +849,33 @@ class KpointList(collections.Sequence):
     def __ne__(self, other):
         return not self == other
 
+    @lazy_property
+    def _hash_table(self):
+        """:class:`KpointHashTable` used to find the k-points in O(1)."""
+        return KpointHashTable(self.frac_coords)
+
     def index(self, kpoint):
         """
         Returns: the first index of kpoint in self.
 
         Raises: ValueError if not found.
         """
-        try:
-            return self._points.index(kpoint)
-
-        except ValueError:
+        ind = self.find(kpoint)
+        if ind == -1:
             raise ValueError("\nCannot find point: %s in KpointList:\n%s" % (repr(kpoint), repr(self)))
 
+        return ind
+
     def find(self, kpoint):
         """
         Returns: first index of kpoint. -1 if not found
         """
-        try:
-            return self.index(kpoint)
-        except ValueError:
-            return -1
+        return self._hash_table.find(getattr(kpoint, "frac_coords", kpoint))
 
     def count(self, kpoint):
         """Return number of occurrences of kpoint"""
-        return self._points.count(kpoint)
+        diff = self.frac_coords - np.asarray(getattr(kpoint, "frac_coords", kpoint))
+        return int(np.count_nonzero(np.all(np.abs(diff - np.around(diff)) < _ATOL_KDIFF, axis=1)))
 
     @property
     def is_path(self):
@@ -523,8 +894,15 @@ class KpointList(collections.Sequence):
 
     @property
     def weights(self):
-        """`ndarray` with the weights of the k-points."""
-        return np.array([kpoint.weight for kpoint in self])
+        """`ndarray` with the weights of the k-points (read-only view)."""
+        weights = self._weights.view()
+        weights.flags.writeable = False
+        return weights
+
+    @property
+    def names(self):
+        """List with the names of the k-points (None if the name is not available)."""
+        return list(self._names) if self._names is not None else len(self) * [None]
 
     def sum_weights(self):
         """Returns the sum of the weights."""
@@ -532,24 +910,19 @@ class KpointList(collections.Sequence):
 
     def remove_duplicated(self):
         """Remove duplicated k-points from self. Returns new KpointList instance."""
-        frac_coords, good_indices = [self[0].frac_coords], [0]
-
-        for i, kpoint in enumerate(self[1:]):
-            i += 1
+        table = KpointHashTable([])
+        good_indices = []
+        for i, frac_coords in enumerate(self.frac_coords):
             # Add it only if it's not already in the list.
-            for prev_coords in frac_coords:
-                if issamek(kpoint.frac_coords, prev_coords, atol=_ATOL_KDIFF):
-                    break
-            else:
-                frac_coords.append(kpoint.frac_coords)
+            if table.find(frac_coords) == -1:
+                table.add(frac_coords)
                 good_indices.append(i)
 
-        good_kpoints = [self[i] for i in good_indices]
-
+        names = self.names
         return KpointList(self.reciprocal_lattice, 
-                          frac_coords=[k.frac_coords for k in good_kpoints],
+                          frac_coords=self.frac_coords[good_indices],
                           weights=None,
-                          names=[k.name for k in good_kpoints])
+                          names=[names[i] for i in good_indices])
 
     def to_array(self):
         """Returns a `ndarray` [nkpy, 3] with the fractional coordinates."""
@@ -589,10 +962,8 @@ class Kpath(KpointList):
         ndarray of len(self)-1 elements giving the distance between two
         consecutive k-points, i.e. ds[i] = ||k[i+1] - k[i]||.
         """
-        ds = np.zeros(len(self) - 1)
-        for (i, kpoint) in enumerate(self[:-1]):
-            ds[i] = (self[i + 1] - kpoint).norm
-        return ds
+        cart_diffs = self.reciprocal_lattice.get_cartesian_coords(np.diff(self.frac_coords, axis=0))
+        return np.sqrt(np.sum(np.reshape(cart_diffs, (-1, 3)) ** 2, axis=1))
 
     @lazy_property
     def versors(self):
@@ -671,7 +1042,7 @@ class IrredZone(KpointList):
     Provides methods to symmetrize k-dependent quantities with the full symmetry of the structure. e.g.
     bands, occupation factors, phonon frequencies.
     """
-    def __init__(self, reciprocal_lattice, frac_coords, weights, ksampling):
+    def __init__(self, reciprocal_lattice, frac_coords, weights, ksampling, spacegroup=None):
         """
         Args:
             reciprocal_lattice: :class:`Lattice` object
@@ -679,6 +1050,8 @@ class IrredZone(KpointList):
             weights: Array-like with the weights of the k-points.
             ksampling:
                 TODO
+            spacegroup: :class:`SpaceGroup` used to reconstruct the full BZ.
+                If None, only the identity and time-reversal are used.
         """
         super(IrredZone, self).__init__(reciprocal_lattice, frac_coords, weights=weights, names=None)
 
@@ -692,17 +1065,20 @@ class IrredZone(KpointList):
             #raise ValueError(err_msg)  # GA : Should not prevent a band structure from being read!
             logger.warning(err_msg)
 
+        self.ksampling = ksampling
+        self.spacegroup = spacegroup
+        self.kptopt = None if ksampling is None else ksampling.kptopt
+        self._shifts, self.mpdivs = None, None
+
         # FIXME
         # Quick and dirty hack to allow the reading of the k-points from WFK files
         # where info on the sampling is missing. I will regret it but at present 
         # is the only solution I found (changes in the ETSF-IO part of Abinit are needed)
-        return 
+        if ksampling is None or not ksampling.is_homogeneous:
+            return
 
         # FIXME: Check the treatment of the shifts, kptrlatt ...
         # time-reversal?
-        assert ksampling.is_homogeneous
-        self.kptopt = ksampling.kptopt
-
         shifts = ksampling.shifts 
         if shifts is None: shifts = [0.0, 0.0, 0.0]
 
@@ -711,22 +1087,17 @@ class IrredZone(KpointList):
         if ksampling.kptrlatt is not None:
             # Diagonal kptrlatt is equivalent to MP folding.
             # Non-diagonal kptrlatt is not supported.
-            self.mpdivs = np.array(3, dtype=np.int)
-            self.mpdivs[0] = ksampling.kptrlatt[0,0]
-            self.mpdivs[1] = ksampling.kptrlatt[1,1]
-            self.mpdivs[2] = ksampling.kptrlatt[2,2]
-
+            kptrlatt = np.reshape(ksampling.kptrlatt, (3,3))
             for i in range(3):
                 for j in range(3):
-                    if ksampling.kptrlatt[i,j] != 0:
+                    if i != j and kptrlatt[i,j] != 0:
                         raise ValueError("Non diagonal kptrlatt is not supported")
 
+            self.mpdivs = np.array([kptrlatt[0,0], kptrlatt[1,1], kptrlatt[2,2]], dtype=np.int)
+
         elif ksampling.mpdivs is not None:
             # MP folding
-            self.mpdivs = ksampling.mpdivs
-
-        else:
-            raise ValueError("Either MP mesh info or kptrlatt must be present in ksampling")
+            self.mpdivs = np.array(ksampling.mpdivs, dtype=np.int)
 
         #self.nx, self.ny, self.nz = self.mpdivs
         #grids_1d = 3 * [None]
@@ -749,49 +1120,81 @@ class IrredZone(KpointList):
         """Number of points in the full BZ."""
         return self.mpdivs.prod() * self.num_shifts
 
-    #@lazy_property
-    #def ktab(self):
-    #Compute the mapping bz --> ibz
-    #from abipy.extensions.klib import map_bz2ibz
-    #return map_bz2ibz(structure=structure, bz_arr=self.bz_arr, ib_arr=self.ibz_arr)
-
-    #def iter_bz_coords(self):
-    #    """
-    #    Generates the fractional coordinates of the points in the BZ.
-
-    #    .. note:
-
-    #        points are ordered in blocks, one block for each shift.
-    #        Inside the block, points are ordered following the C convention.
-    #    """
-    #    for shift in self.shifts:
-
-    #        for i in range(mpdivs[0]):
-    #            x = (i + shift[0]) / mpdivs[0]
-    #            for j in range(mpdivs[1]):
-    #                y = (j + shift[1]) / mpdivs[1]
-    #                for k in range(mpdivs[2]):
-    #                    z = (k + shift[2]) / mpdivs[2]
-    #                    yield np.array((x, y, z))
-
-    #def plane_cut(self, values_ibz):
-    #    """
-    #    Symmetrize values in the IBZ to have them on the full BZ, then
-    #    select a slice along the specified plane E.g. plane = (1,1,0).
-    #    """
-    #    assert len(values_ibz) == len(self)
-    #    #indices =
-    #    z0 = 0
-    #    plane = np.empty((self.nx, self.ny))
-
-    #    kx, ky = range(self.nx), range(self.ny)
-    #    for x in kx:
-    #        for y in ky:
-    #            ibz_idx = self.map_xyz2ibz[x, y, z0]
-    #            plane[x, y] = values_ibz[ibz_idx]
-
-    #    kx, ky = np.meshgrid(kx, ky)
-    #    return kx, ky, plane
+    def set_spacegroup(self, spacegroup):
+        """Set the :class:`SpaceGroup` used to reconstruct the full BZ. Reset the symmetry tables."""
+        self.spacegroup = spacegroup
+        self.__dict__.pop("ktab", None)
+
+    @lazy_property
+    def ktab(self):
+        """
+        :class:`KSymmetryTable` with the mapping BZ --> IBZ, the index of the symmetry
+        and the G0 vector associated to each point of the full mesh.
+        """
+        if self.mpdivs is None:
+            raise ValueError("Cannot compute ktab, the IrredZone does not contain info on the k-mesh")
+
+        symmops = self.spacegroup.fm_symmops if self.spacegroup is not None else None
+        return KSymmetryTable(symmops, self.mpdivs, self.shifts, self.frac_coords)
+
+    @property
+    def bz_frac_coords(self):
+        """`ndarray` with the reduced coordinates of the points in the full BZ."""
+        return self.ktab.bz_frac_coords
+
+    def iter_bz_coords(self):
+        """
+        Generates the fractional coordinates of the points in the BZ.
+
+        .. note:
+
+            points are ordered in blocks, one block for each shift.
+            Inside the block, points are ordered following the C convention.
+        """
+        for frac_coords in self.bz_frac_coords:
+            yield frac_coords
+
+    def symmetrize(self, values_ibz, axis=0):
+        """
+        Symmetrize scalar quantities given in the IBZ (band energies, occupation factors,
+        phonon frequencies...) to have them on the full BZ.
+
+        Args:
+            values_ibz: Array-like object with the values in the IBZ.
+            axis: The axis of values_ibz associated to the k-points e.g. axis=1
+                for arrays with shape [nsppol, nkpt, mband].
+
+        Returns:
+            `ndarray` with self.len_bz points along axis.
+        """
+        values_ibz = np.asarray(values_ibz)
+        if values_ibz.shape[axis] != len(self):
+            raise ValueError("values_ibz.shape[%d] = %d while len(self) = %d" % (axis, values_ibz.shape[axis], len(self)))
+
+        return self.ktab.symmetrize(values_ibz, axis=axis)
+
+    def plane_cut(self, values_ibz, z0=0, ishift=0):
+        """
+        Symmetrize values in the IBZ to have them on the full BZ, then
+        select the slice with the third reduced coordinate given by (z0 + shift_z) / mpdivs[2].
+
+        Args:
+            values_ibz: Array with the values in the IBZ (k-points along the first axis).
+            z0: Index of the plane along the third direction.
+            ishift: Index of the shift.
+
+        Returns:
+            kx, ky, plane where kx, ky are the 2D arrays with the indices of the points
+            in the plane and plane is the array with the values, plane[x, y] = value[x, y, z0].
+        """
+        nx, ny, nz = self.mpdivs
+        values_bz = self.symmetrize(values_ibz)
+        nmesh = nx * ny * nz
+        values_bz = values_bz[ishift * nmesh:(ishift + 1) * nmesh]
+        plane = values_bz.reshape((nx, ny, nz) + values_bz.shape[1:])[:, :, z0]
+
+        kx, ky = np.meshgrid(range(nx), range(ny), indexing="ij")
+        return kx, ky, plane
 
 
 class KSamplingInfo(AttrDict):
@@ -862,7 +1265,8 @@ class KpointsReaderMixin(object):
         # is the only solution I found (changes in the ETSF-IO part of Abinit are needed)
         if ksampling.is_homogeneous or abs(sum(weights) - 1.0) < 1.e-6:
             # we have a homogeneous sampling of the BZ.
-            return IrredZone(structure.reciprocal_lattice, frac_coords, weights, ksampling)
+            return IrredZone(structure.reciprocal_lattice, frac_coords, weights, ksampling,
+                             spacegroup=getattr(structure, "spacegroup", None))
 
         elif ksampling.is_path:
             # we have a path in the BZ.
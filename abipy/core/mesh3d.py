@@ -7,7 +7,8 @@ from itertools import product as iproduct
 
 from monty.functools import lazy_property
 from numpy.random import random
-from numpy.fft import fftn, ifftn, fftshift, ifftshift, fftfreq
+from numpy.fft import fftshift, ifftshift, fftfreq
+from .fftengines import get_fft_backend
 
 __all__ = [
     "Mesh3D",
@@ -161,48 +162,52 @@ class Mesh3D(object):
         #shape = extra_dims + self.shape)
         return np.reshape(arr, (-1,) + self.shape)
 
-    def fft_r2g(self, fr, shift_fg=False):
-        """FFT of array fr given in real space."""
+    def fft_r2g(self, fr, shift_fg=False, backend=None):
+        """
+        FFT of array fr given in real space.
+
+        Args:
+            fr: Array of shape (..., nx, ny, nz). The transform is performed
+                on all the leading dimensions with a single call (e.g. a block of bands).
+            shift_fg: True if the output must be shifted with fftshift.
+            backend: Name of the FFT backend (see :mod:`abipy.core.fftengines`). None for the default one.
+        """
         ndim, shape = fr.ndim, fr.shape
 
         if ndim == 1:
             fr = np.reshape(fr, self.shape)
-            return self.fft_r2g(fr, shift_fg=shift_fg).flatten()
+            return self.fft_r2g(fr, shift_fg=shift_fg, backend=backend).flatten()
 
-        elif ndim == 3:
+        elif ndim >= 3:
             assert self.size == np.prod(shape[-3:])
-            fg = fftn(fr)
-            if shift_fg: fg = fftshift(fg)
-
-        elif ndim > 3:
-            assert self.size == np.prod(shape[-3:])
-            axes = np.arange(ndim)[-3:]
-            fg = fftn(fr, axes=axes)
-            if shift_fg: fg = fftshift(fg, axes=axes)
+            fg = get_fft_backend(backend).fftn(fr)
+            if shift_fg: fg = fftshift(fg, axes=tuple(range(ndim - 3, ndim)))
 
         else:
             raise NotImplementedError("ndim < 3 are not supported")
 
         return fg / self.size
 
-    def fft_g2r(self, fg, fg_ishifted=False):
-        """FFT of array fg given in G-space."""
+    def fft_g2r(self, fg, fg_ishifted=False, backend=None):
+        """
+        FFT of array fg given in G-space.
+
+        Args:
+            fg: Array of shape (..., nx, ny, nz). The transform is performed
+                on all the leading dimensions with a single call (e.g. a block of bands).
+            fg_ishifted: True if the input has been shifted with fftshift.
+            backend: Name of the FFT backend (see :mod:`abipy.core.fftengines`). None for the default one.
+        """
         ndim, shape = fg.ndim, fg.shape
 
         if ndim == 1:
             fg = np.reshape(fg, self.shape)
-            return self.fft_g2r(fg, fh_isshifted=fg_ishifted).flatten()
-
-        if ndim == 3:
-            assert self.size == np.prod(shape[-3:])
-            if fg_ishifted: fg = ifftshift(fg)
-            fr = ifftn(fg)
+            return self.fft_g2r(fg, fg_ishifted=fg_ishifted, backend=backend).flatten()
 
-        elif ndim > 3:
+        elif ndim >= 3:
             assert self.size == np.prod(shape[-3:])
-            axes = np.arange(ndim)[-3:]
-            if fg_ishifted: fg = ifftshift(fg, axes=axes)
-            fr = ifftn(fg, axes=axes)
+            if fg_ishifted: fg = ifftshift(fg, axes=tuple(range(ndim - 3, ndim)))
+            fr = get_fft_backend(backend).ifftn(fg)
 
         else:
             raise NotImplementedError("ndim < 3 are not supported")
@@ -213,20 +218,100 @@ class Mesh3D(object):
         """
         Fourier interpolation of data.
 
-        :param data: Input array defined on this mesh
-        :param new_mesh: Mesh where data is interpolated
-        :param inspace: string specifying if data is given in real space "r" or in reciprocal space "g".
-        :return: Numpy array in real space on the new_mesh
+        Args:
+            data: Input array defined on this mesh with shape [..., nx, ny, nz].
+                The leading dimensions (e.g. spin components) are interpolated in a single pass.
+            new_mesh: :class:`Mesh3D` where data is interpolated. It must have the same lattice vectors.
+            inspace: string specifying if data is given in real space "r" or in reciprocal space "g".
+
+        Returns:
+            numpy array in real space on new_mesh. The array is real if data is real and inspace == "r".
         """
-        raise NotImplementedError("gtransfer is missing")
-        assert inspace in ("r", "g")
+        inspace = inspace.lower()
+        if inspace not in ("r", "g"):
+            raise ValueError("Wrong inspace %s" % inspace)
+
+        data = np.asarray(data)
+        is_real = inspace == "r" and not np.iscomplexobj(data)
 
         # Insert data in the FFT box of new mesh.
-        if inspace == "r": data = self.fft_r2g(data)
-        intp_datag = new_mesh.gtransfer_from(self, data)
+        datag = self.fft_r2g(data) if inspace == "r" else data
+        intp_datag = new_mesh.gtransfer_from(self, datag)
 
         # FFT transform G --> R.
-        return new_mesh.fft_g2r(intp_datag)
+        intp_datar = new_mesh.fft_g2r(intp_datag)
+        return intp_datar.real.copy() if is_real else intp_datar
+
+    def gtransfer_from(self, other, fg):
+        """
+        Transfer the Fourier components fg defined on the mesh other to this mesh.
+        Components that are not present in this mesh are discarded (truncation), 
+        the missing ones are set to zero (zero-padding).
+        The Nyquist component of even divisions is split (summed) so that the transfer 
+        preserves the hermiticity of real fields.
+
+        Args:
+            other: :class:`Mesh3D` where fg is defined.
+            fg: Array of shape [..., other.nx, other.ny, other.nz] in reciprocal space (not shifted).
+
+        Returns:
+            Array of shape [..., nx, ny, nz]
+        """
+        if not np.allclose(self.vectors, other.vectors):
+            raise ValueError("Cannot transfer data between meshes with different lattice vectors.")
+
+        fg = np.asarray(fg)
+        if fg.shape[-3:] != other.shape:
+            raise ValueError("Wrong shape %s, expecting [..., %d, %d, %d]" % ((str(fg.shape),) + other.shape))
+
+        if self.shape == other.shape:
+            return fg.copy()
+
+        # Each call to tensordot transforms the third-last axis and moves it at the end
+        # hence (x, y, z) --> (y, z, x') --> (z, x', y') --> (x', y', z')
+        for n_old, n_new in zip(other.shape, self.shape):
+            fg = np.tensordot(fg, _gtransfer_matrix(n_old, n_new), axes=([fg.ndim - 3], [1]))
+
+        return fg
+
+    def fourier_eval(self, fg, frac_coords, chunk_size=2**22):
+        """
+        Evaluate the Fourier series with coefficients fg at arbitrary points.
+
+        This is equivalent to the Fourier interpolation on an infinitely dense mesh
+        and it is exact at the points of the mesh.
+
+        Args:
+            fg: Array of shape [..., nx, ny, nz] in reciprocal space (not shifted) e.g. the output of fft_r2g.
+            frac_coords: Reduced coordinates of the points. Array of shape [npts, 3] or [3].
+            chunk_size: Max number of elements in the temporary arrays.
+
+        Returns:
+            Complex array of shape [..., npts]
+        """
+        fg = np.asarray(fg)
+        assert fg.shape[-3:] == self.shape
+        frac_coords = np.reshape(frac_coords, (-1, 3))
+
+        nx, ny, nz = self.shape
+        leading = fg.shape[:-3]
+        nb = int(np.prod(leading))
+        npts = len(frac_coords)
+        fg = np.reshape(fg, (nb * nx * ny, nz))
+
+        out = np.empty((nb, npts), dtype=np.complex)
+        step = max(1, chunk_size // (nb * nx * ny))
+
+        for start in range(0, npts, step):
+            coords = frac_coords[start:start+step]
+            ex, ey, ez = [_fourier_phases(n, coords[:, i]) for i, n in enumerate(self.shape)]
+
+            # Sum over z with a matrix-matrix product, then over y and x.
+            t = np.reshape(np.dot(fg, ez.T), (nb, nx, ny, -1))
+            t = np.sum(t * ey.T, axis=2)
+            out[:, start:start+step] = np.sum(t * ex.T, axis=1)
+
+        return np.reshape(out, leading + (npts,))
 
     def integrate(self, fr):
         """Integrate array(s) fr."""
@@ -237,7 +322,8 @@ class Mesh3D(object):
             return fr.sum() * self.dv
 
         elif ndim > 3:
-            sums = np.sum(np.reshape(fr, shape[:-3] + (-1,)), axis=-1)
+            # Sum over the last three axes without reshaping (fr may be a non-contiguous view).
+            sums = np.sum(fr, axis=(-3, -2, -1))
             return sums * self.dv
 
         else:
@@ -246,33 +332,51 @@ class Mesh3D(object):
     @lazy_property
     def gvecs(self):
         """Array with the reduced coordinates of the G-vectors."""
-        gx_list = np.rint(fftfreq(self.nx) * self.nx)
-        gy_list = np.rint(fftfreq(self.ny) * self.ny)
-        gz_list = np.rint(fftfreq(self.nz) * self.nz)
-        #print(gz_list, gy_list, gx_list)
-                                                      
-        gvecs = np.empty((self.size,3), dtype=np.int)
-                                                      
-        idx = -1
-        for gx in gx_list:
-            for gy in gy_list:
-                for gz in gz_list:
-                    idx += 1
-                    gvecs[idx,:] = gx, gy, gz
+        gx, gy, gz = np.meshgrid(*self._gcomponents(), indexing="ij")
+
+        gvecs = np.empty((self.size, 3), dtype=np.int)
+        gvecs[:, 0], gvecs[:, 1], gvecs[:, 2] = gx.ravel(), gy.ravel(), gz.ravel()
 
         return gvecs
 
     @lazy_property
     def rpoints(self):
         """Array with the points in real space in reduced coordinates."""
-        nx, ny, nz = self.nx, self.ny, self.nz
-        rpoints = np.empty((self.size,3))
+        xs, ys, zs = [np.arange(n) / n for n in self.shape]
+        x, y, z = np.meshgrid(xs, ys, zs, indexing="ij")
 
-        for ifft, p1_fft in enumerate(iproduct(range(nx), range(ny), range(nz))):
-            rpoints[ifft,:] = p1_fft[0]/nx, p1_fft[1]/ny, p1_fft[2]/nz
+        rpoints = np.empty((self.size, 3))
+        rpoints[:, 0], rpoints[:, 1], rpoints[:, 2] = x.ravel(), y.ravel(), z.ravel()
 
         return rpoints
 
+    def _gcomponents(self):
+        """The reduced components of the G-vectors along the three directions in FFT order."""
+        return [np.rint(fftfreq(n) * n).astype(np.int) for n in self.shape]
+
+    @lazy_property
+    def gmet(self):
+        """
+        Metric of the reciprocal lattice (2 pi factor included)
+        in units of 1/length^2 where length is the unit used for the vectors.
+        """
+        gprimd = 2 * np.pi * np.linalg.inv(self.vectors).T
+        return np.dot(gprimd, gprimd.T)
+
+    @lazy_property
+    def g2(self):
+        """
+        Array of shape (nx, ny, nz) with |G|**2 for the G-vectors of the mesh (FFT order).
+        Units are 1/length^2 where length is the unit used for the vectors.
+        """
+        gmet = self.gmet
+        gx, gy, gz = self._gcomponents()
+        gx, gy, gz = gx[:, None, None], gy[None, :, None], gz[None, None, :]
+
+        # Use the metric and broadcasting instead of computing the Cartesian vectors.
+        return (gmet[0, 0] * gx**2 + gmet[1, 1] * gy**2 + gmet[2, 2] * gz**2 +
+                2 * (gmet[0, 1] * gx * gy + gmet[0, 2] * gx * gz + gmet[1, 2] * gy * gz))
+
     #def ogrid_rfft(self):
     #    return np.ogrid[0:1:1/self.nx, 
     #                    0:1:1/self.ny,
@@ -362,3 +466,44 @@ class Mesh3D(object):
         #        irot_fft == irottable[isym, ifft]
 
         return irottable
+
+
+def _gtransfer_matrix(n_old, n_new):
+    """
+    Matrix of shape [n_new, n_old] that transfers the Fourier components
+    along one direction from a mesh with n_old points to a mesh with n_new points.
+    """
+    mat = np.zeros((n_new, n_old))
+
+    # G-vectors that are present in both meshes with their opposite.
+    gmax = min((n_old - 1) // 2, (n_new - 1) // 2)
+    gs = np.arange(-gmax, gmax + 1)
+    mat[gs % n_new, gs % n_old] = 1
+
+    # Treat the Nyquist component.
+    if n_new % 2 == 0 and n_new <= n_old:
+        # +G and -G are folded onto the Nyquist component of the new mesh.
+        h = n_new // 2
+        mat[h, h % n_old] += 1
+        if n_new < n_old: mat[h, -h % n_old] += 1
+    elif n_old % 2 == 0 and n_new > n_old:
+        # The Nyquist component is split between +G and -G.
+        h = n_old // 2
+        mat[h, h] += 0.5
+        mat[-h % n_new, h] += 0.5
+
+    return mat
+
+
+def _fourier_phases(n, x):
+    """
+    Array of shape [len(x), n] with the phases exp(2 pi i g x) for the n G-vectors
+    along one direction, in the FFT order. The Nyquist term of even n is replaced by 
+    the cosine so that the interpolant of a real function is real.
+    """
+    gs = np.rint(fftfreq(n) * n)
+    phases = np.exp(2j * np.pi * np.outer(x, gs))
+    if n % 2 == 0:
+        phases[:, n // 2] = np.cos(np.pi * n * x)
+
+    return phases
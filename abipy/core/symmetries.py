@@ -88,6 +88,17 @@ def mati3inv(mat3, trans=True):
         return mit.T
 
 
+def _apply_rotations(rots, vecs):
+    """
+    Apply the stack of matrices rots [nsym, 3, 3] to the vectors vecs [..., 3].
+    Returns `ndarray` of shape [nsym, ..., 3].
+    """
+    flat = np.reshape(vecs, (-1, 3))
+    # Single matrix-matrix product: [nsym*3, 3] x [3, nvec]
+    out = np.dot(rots.reshape(-1, 3), flat.T).reshape(len(rots), 3, len(flat)).transpose(0, 2, 1)
+    return out.reshape((len(rots),) + np.shape(vecs))
+
+
 def _get_det(mat):
     """
     Return the determinant of a 3x3 rotation matrix mat.
@@ -339,12 +350,8 @@ class SymmOp(Operation):
         Returns:
             rot_gvecs: `ndarray` with shape [ng, 3] containing the result of self(G).
         """
-        rot_gvecs = np.empty_like(gvecs)
-
-        for ig, gvec in enumerate(gvecs):
-            rot_gvecs[ig] = np.dot(self.rot_g, gvec) * self.time_sign
-
-        return rot_gvecs
+        gvecs = np.asarray(gvecs)
+        return (np.dot(gvecs, self.rot_g.T) * self.time_sign).astype(gvecs.dtype)
 
 
 class OpSequence(collections.Sequence):
@@ -579,7 +586,7 @@ class SpaceGroup(OpSequence):
         self._has_timerev = has_timerev
         self._time_signs = [+1, -1] if self.has_timerev else [+1]
 
-        self._symrel, self._tnons, self._symafm = list(map(np.asarray, (symrel, tnons, symafm)))
+        self._symrel, self._tnons, self._symafm = list(map(np.array, (symrel, tnons, symafm)))
 
         if len(self.symrel) != len(self.tnons) or len(self.symrel) != len(self.symafm):
             raise ValueError("symrel, tnons and symafm must have equal shape[0]")
@@ -604,6 +611,14 @@ class SpaceGroup(OpSequence):
                                        rot_g=self.symrec[isym]))
         self._ops = tuple(all_syms)
 
+        # Stacked arrays with the operations in self._ops (used in the vectorized methods).
+        self._rot_r = np.array([op.rot_r for op in self._ops])
+        self._rotm1_r = np.array([op.rotm1_r for op in self._ops])
+        self._rot_g = np.array([op.rot_g for op in self._ops])
+        self._tau = np.array([op.tau for op in self._ops], dtype=np.float)
+        self._time_sign = np.array([op.time_sign for op in self._ops], dtype=np.int)
+        self._afm_sign = np.array([op.afm_sign for op in self._ops], dtype=np.int)
+
     @classmethod
     def from_file(cls, file, inord="F"):
         """Initialize the object from a Netcdf file."""
@@ -645,7 +660,7 @@ class SpaceGroup(OpSequence):
         finder = SymmetryFinder(structure, symprec=symprec, angle_tolerance=angle_tolerance)
         data = finder.get_symmetry_dataset()
 
-        symrel = data["rotations"],
+        symrel = data["rotations"]
 
         return cls(spgid=data["number"],
                    symrel=symrel,
@@ -694,6 +709,39 @@ class SpaceGroup(OpSequence):
     def symafm(self):
         return self._symafm
 
+    @property
+    def rot_r(self):
+        """
+        `ndarray` of shape [len(self), 3, 3] with the rotations in real space (reduced coordinates).
+        rot_r[i] is the rotation of self[i] (time-reversal is included in self).
+        """
+        return self._rot_r
+
+    @property
+    def rotm1_r(self):
+        """`ndarray` of shape [len(self), 3, 3] with the inverse of the rotations in real space."""
+        return self._rotm1_r
+
+    @property
+    def rot_g(self):
+        """`ndarray` of shape [len(self), 3, 3] with the rotations in reciprocal space (reduced coordinates)."""
+        return self._rot_g
+
+    @property
+    def tau(self):
+        """`ndarray` of shape [len(self), 3] with the fractional translations."""
+        return self._tau
+
+    @property
+    def time_sign(self):
+        """`ndarray` with the time-reversal sign of the operations."""
+        return self._time_sign
+
+    @property
+    def afm_sign(self):
+        """`ndarray` with the anti-ferromagnetic sign of the operations."""
+        return self._afm_sign
+
     @property
     def num_spatial_symmetries(self):
         fact = 2 if self.has_timerev else 1
@@ -750,6 +798,69 @@ class SpaceGroup(OpSequence):
     #        timrev = 2 if self.has_timerev else 1
     #    )
 
+    def rotate_k_all(self, frac_coords, wrap_tows=False):
+        """
+        Apply all the operations of the group to a set of k-points.
+
+        Args:
+            frac_coords: Array-like object of shape [..., 3] with the reduced coordinates of the k-points.
+                :class:`Kpoint` and :class:`KpointList` objects are accepted as well.
+            wrap_tows: True if the rotated points should be wrapped to the first Brillouin zone.
+
+        Returns:
+            `ndarray` of shape [len(self), ..., 3]. Element [isym, ...] is equal to self[isym].rotate_k(k)
+        """
+        frac_coords = np.asarray(getattr(frac_coords, "frac_coords", frac_coords))
+        krots = self.rot_g * self.time_sign[:, np.newaxis, np.newaxis]
+        sk = _apply_rotations(krots, frac_coords)
+
+        return wrap_to_ws(sk) if wrap_tows else sk
+
+    def rotate_gvecs_all(self, gvecs):
+        """
+        Apply all the operations of the group to a set of G-vectors.
+
+        Args:
+            gvecs: `ndarray` of shape [ng, 3] with the reduced coordinates of the G-vectors.
+
+        Returns:
+            `ndarray` of shape [len(self), ng, 3] with the same dtype as gvecs.
+        """
+        gvecs = np.asarray(gvecs)
+        return self.rotate_k_all(gvecs).astype(gvecs.dtype)
+
+    def rotate_r_all(self, frac_coords, in_ucell=False):
+        """
+        Apply all the operations of the group to a set of points in real space given in reduced
+        coordinates. Same convention as :meth:`SymmOp.rotate_r` i.e. symmop(r) = R^{-1} (r - tau)
+
+        Returns:
+            `ndarray` of shape [len(self), ..., 3]
+        """
+        frac_coords = np.asarray(frac_coords)
+        # R^{-1} (r - tau) = R^{-1} r - R^{-1} tau
+        rotm1_tau = np.einsum("sij,sj->si", self.rotm1_r, self.tau)
+        rotm1_rmt = _apply_rotations(self.rotm1_r, frac_coords)
+        rotm1_rmt -= rotm1_tau.reshape((-1,) + (frac_coords.ndim - 1) * (1,) + (3,))
+
+        return wrap_in_ucell(rotm1_rmt) if in_ucell else rotm1_rmt
+
+    def little_group_mask(self, frac_coords, atol=1e-8):
+        """
+        Find the operations that preserve the k-points modulo a reciprocal lattice vector.
+
+        Args:
+            frac_coords: Array-like object of shape [..., 3] with the reduced coordinates of the k-points.
+            atol: Absolute tolerance.
+
+        Returns:
+            Boolean `ndarray` of shape [len(self), ...]. Element [isym, ...] is True
+            if self[isym] preserves the k-point.
+        """
+        frac_coords = np.asarray(getattr(frac_coords, "frac_coords", frac_coords))
+        g0 = self.rotate_k_all(frac_coords) - frac_coords
+        return np.all(np.abs(g0 - np.around(g0)) <= atol, axis=-1)
+
     def find_little_group(self, kpoint):
         """
         Find the little group of the kpoint
@@ -760,19 +871,14 @@ class SpaceGroup(OpSequence):
         Returns:
             :class:`LittleGroup` object.
         """
-        frac_coords = getattr(kpoint, "frac_coords", kpoint)
-
-        to_spgrp, g0vecs = [], []
+        frac_coords = np.asarray(getattr(kpoint, "frac_coords", kpoint))
 
         # Exclude AFM operations.
-        for isym, symmop in enumerate(self.fm_symmops):
-            is_same, g0 = symmop.preserve_k(frac_coords)
-            if is_same:
-                to_spgrp.append(isym)
-                g0vecs.append(g0)
+        isyms = np.nonzero(self.little_group_mask(frac_coords) & (self.afm_sign == 1))[0]
+        g0vecs = np.array(np.round(self.rotate_k_all(frac_coords)[isyms] - frac_coords), dtype=np.int)
 
         # List with the symmetry operation that preserve the kpoint.
-        k_symmops = [self[i] for i in to_spgrp]
+        k_symmops = [self[i] for i in isyms]
         return LittleGroup(kpoint, k_symmops, g0vecs)
 
 
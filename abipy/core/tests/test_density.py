@@ -5,6 +5,7 @@ from __future__ import print_function, division
 import abipy.data as abidata 
 
 from abipy.core import Density
+from abipy.core.fields import DensityReader
 from abipy.core.testing import *
 from abipy.iotools import *
 
@@ -35,6 +36,21 @@ class TestDensity(AbipyTest):
             self.assert_almost_equal(nelect_calc, nelect_file)
             self.assert_almost_equal(rhog_tot[0,0,0] * structure.volume, nelect_file)
 
+            # Read the density by chunks and select the spin component.
+            with DensityReader(path) as r:
+                self.assert_almost_equal(r.read_rhor(chunk_size=100), den.datar)
+                for spin in range(den.nspden):
+                    self.assert_almost_equal(r.read_rhor(spin=spin)[0], den.datar[spin])
+                    self.assert_almost_equal(r.read_nelect(spin=spin)[0], den.mesh.integrate(den.datar[spin]))
+                self.assert_almost_equal(r.read_nelect(chunk_size=100).sum(), nelect_file)
+
+            # Hartree potential: the G=0 component is zero and the Hartree energy is positive.
+            vhr, vhg = den.vhartree()
+            self.assertTrue(vhr.shape == den.mesh.shape)
+            self.assert_almost_equal(vhg[0,0,0], 0)
+            self.assert_almost_equal(den.mesh.integrate(vhr), 0)
+            self.assertTrue(den.mesh.integrate(rhor_tot * vhr) > 0)
+
             if self.which("xcrysden") is not None:
                 # Export data in xsf format.
                 visu = den.export(".xsf")
@@ -31,6 +31,54 @@ class TestScalarField(AbipyTest):
         #aequal(field.datar_xyz.ndim, 4)
         #aequal(field.datar_xyz.shape[-3:], xyz_shape)
 
+    def test_interpolation(self):
+        """Testing Fourier and spline interpolation of ScalarField."""
+        structure = data.structure_from_ucell("Si")
+        mesh_shape = (12, 12, 12)
+        field = ScalarField(1, 1, 1, np.zeros((1,) + mesh_shape), structure)
+
+        # Band-limited periodic function.
+        def func(frac_coords):
+            x, y, z = frac_coords.T
+            return np.cos(2 * np.pi * x) + np.sin(2 * np.pi * (y + 2 * z))
+
+        datar = np.reshape(func(field.mesh.rpoints), (1,) + mesh_shape)
+        field = ScalarField(1, 1, 1, datar, structure)
+
+        # Fourier interpolation on a denser mesh.
+        dense_field = field.fourier_interp((16, 18, 20))
+        self.assertTrue(dense_field.mesh.shape == (16, 18, 20))
+        self.assert_almost_equal(dense_field.datar[0], np.reshape(func(dense_field.mesh.rpoints), (16, 18, 20)))
+
+        # Evaluation at arbitrary points (outside the unit cell as well).
+        points = np.array([[0.1, 0.2, 0.3], [-0.45, 1.3, 0.77]])
+        self.assert_almost_equal(field.fourier_eval(points)[0], func(points))
+        self.assert_almost_equal(field.map_coordinates(points)[0], func(points), decimal=2)
+
+        cart_coords = structure.lattice.get_cartesian_coords(points)
+        self.assert_almost_equal(field.fourier_eval(cart_coords, frac_coords=False)[0], func(points))
+
+        dist, values = field.line_profile([0, 0, 0], [1, 0, 0], num=5, method="fourier")
+        self.assert_almost_equal(dist[-1], structure.lattice.abc[0])
+        self.assert_almost_equal(values[0], np.cos(2 * np.pi * np.linspace(0, 1, 5)))
+
+    def test_vhartree(self):
+        """Testing the Hartree potential of a Density."""
+        from pymatgen.core.units import bohr_to_ang
+        structure = data.structure_from_ucell("Si")
+        mesh_shape = (12, 12, 12)
+        density = Density(1, 1, 1, np.zeros((1,) + mesh_shape), structure)
+
+        # n(r) = n0 + cos(2 pi x) --> V(r) = 4 pi cos(2 pi x) / |b1|^2
+        x = np.reshape(density.mesh.rpoints[:, 0], mesh_shape)
+        rhor = 0.1 + np.cos(2 * np.pi * x)
+        density = Density(1, 1, 1, rhor[np.newaxis], structure)
+
+        vhr, vhg = density.vhartree()
+        self.assert_almost_equal(vhg[0,0,0], 0)
+        gnorm2 = density.mesh.gmet[0, 0]
+        self.assert_almost_equal(vhr, 4 * np.pi * np.cos(2 * np.pi * x) / gnorm2 * bohr_to_ang)
+
 
 if __name__ == "__main__":
     import unittest
@@ -41,6 +41,70 @@ class TestGSphere(AbipyTest):
         gsphere.empty()
         gsphere.cempty()
 
+    def test_fftmesh_tables(self):
+        """Insertion/extraction of arrays in the FFT mesh"""
+        lattice = np.eye(3)
+        gvecs = np.array([[0,0,0], [1,0,0], [-1,0,0], [0,-2,1], [2,-1,-2]])
+        gsphere = GSphere(2, lattice, [0,0,0], gvecs, istwfk=1)
+        mesh = Mesh3D((5,6,5), lattice)
+
+        ug = np.random.random((3, len(gvecs))) + 1j
+        ug_mesh = gsphere.tofftmesh(mesh, ug)
+        self.assertTrue(ug_mesh.shape == (3,) + mesh.shape)
+
+        for ig, g in enumerate(gvecs):
+            self.assert_equal(ug_mesh[:, g[0], g[1], g[2]], ug[:, ig])
+        self.assert_equal(gsphere.fromfftmesh(mesh, ug_mesh), ug)
+
+        # Single array on the sphere.
+        self.assertTrue(gsphere.tofftmesh(mesh, ug[0]).shape == mesh.shape)
+        self.assert_equal(gsphere.fromfftmesh(mesh, ug_mesh[0].flatten()), ug[0])
+
+        # Mesh too small
+        with self.assertRaises(ValueError):
+            gsphere.tofftmesh(Mesh3D((2,2,2), lattice), ug)
+
+        # +G and -G would be mapped onto the same point of the mesh.
+        aliased = GSphere(2, lattice, [0,0,0], np.array([[0,0,0], [3,0,0], [-3,0,0]]), istwfk=1)
+        with self.assertRaises(ValueError):
+            aliased.fft_indices(Mesh3D((6,6,6), lattice))
+        self.assertEqual(len(aliased.fft_indices(Mesh3D((7,6,6), lattice))), 3)
+
+    def test_kpg2(self):
+        """|k+G|^2 on the G-sphere"""
+        from pymatgen.core.units import bohr_to_ang
+        lattice = np.array([[0., 1, 1], [1, 0, 1], [1, 1, 0]])
+        gvecs = np.array([[0,0,0], [1,0,0], [-1,2,0], [1,1,-1]])
+        kpoint = [0.5, 0.25, 0]
+        gsphere = GSphere(2, lattice, kpoint, gvecs)
+
+        kpg_cart = np.dot(gvecs + kpoint, lattice) * bohr_to_ang
+        self.assert_almost_equal(gsphere.kpg2, np.sum(kpg_cart**2, axis=1))
+
+    def test_rotation_table(self):
+        """Tables used to rotate arrays on the G-sphere"""
+        from abipy.core.symmetries import SymmOp
+        lattice = np.eye(3)
+        gvecs = np.array([[0,0,0], [1,0,0], [0,1,0], [-1,0,0], [0,-1,0], [1,1,0]])
+        gsphere = GSphere(2, lattice, [0,0,0], gvecs, istwfk=1)
+
+        # Rotation of 90 degrees around z: (1,0,0) --> (0,1,0) in reciprocal space.
+        symmop = SymmOp([[0,-1,0], [1,0,0], [0,0,1]], [0,0,0], 1, 1)
+        table = gsphere.rotation_table(symmop)
+        assert table is gsphere.rotation_table(symmop)
+
+        rot_gvecs = symmop.rotate_gvecs(gvecs)
+        for ig, jg in enumerate(table):
+            if jg == -1:
+                assert not any(np.all(g == rot_gvecs[ig]) for g in gvecs)
+            else:
+                self.assert_equal(gvecs[jg], rot_gvecs[ig])
+        assert np.count_nonzero(table == -1) == 1
+
+        # Shift by G0
+        table = gsphere.rotation_table(symmop, g0=[1,0,0])
+        self.assert_equal(gvecs[table[0]], [1,0,0])
+
     def test_fft(self):
         """FFT transforms"""
         rprimd = np.array([1.,0,0, 0,1,0, 0,0,1])
@@ -3,12 +3,15 @@
 from __future__ import print_function, division
 
 import itertools
+import pickle
 import numpy as np
 import abipy.data as data
 
 from pymatgen.core.lattice import Lattice
 from abipy.core.kpoints import (wrap_to_ws, wrap_to_bz, Kpoint, KpointList, KpointsReader, 
-                                as_kpoints, rc_list, kmesh_from_mpdivs,)
+                                as_kpoints, rc_list, kmesh_from_mpdivs, map_mesh2ibz, KSymmetryTable,
+                                KpointHashTable, ibz_from_mpdivs)
+from abipy.core.structure import Structure
 from abipy.core.testing import *
 
 class TestWrapWS(AbipyTest):
@@ -121,6 +124,28 @@ class TestKpointList(AbipyTest):
         for kpoint in klist: kpoint.set_weight(1.0)
         self.assertTrue(np.all(klist.weights == 1.0))
 
+        # Kpoint objects are views of the arrays stored in klist, created on demand.
+        self.assertTrue(klist[0] == klist[0])
+        self.assertTrue(klist[-1] == klist[2])
+        self.assertEqual(len(klist[1:]), 2)
+        self.assertEqual(klist.names, [None, None, None])
+        klist[1].set_name("L")
+        self.assertEqual(klist.names, [None, "L", None])
+        klist[2].set_name("\\Lambda")
+        self.assertEqual(klist[2].name, "$\\Lambda$")
+        self.assertTrue(type(klist[0] + klist[1]) is Kpoint)
+        with self.assertRaises(IndexError):
+            klist[3]
+
+        same_klist = pickle.loads(pickle.dumps(klist, protocol=-1))
+        self.assertEqual(same_klist.names, klist.names)
+        self.assert_equal(same_klist.weights, klist.weights)
+
+        # Latex names are fixed as in Kpoint.
+        named_klist = KpointList(lattice, [0, 0, 0, 1/2, 0, 0], names=["\\Gamma", "X"])
+        self.assertEqual(named_klist.names, ["$\\Gamma$", "X"])
+        self.assertEqual(named_klist[0].name, Kpoint([0, 0, 0], lattice, name="\\Gamma").name)
+
         frac_coords = [0, 0, 0, 1/2, 1/3, 1/3]
                                                                   
         other_klist = KpointList(lattice, frac_coords)
@@ -139,6 +164,36 @@ class TestKpointList(AbipyTest):
         self.assertTrue(len(add_klist) == 4)
         self.assertTrue(add_klist == add_klist.remove_duplicated())
 
+    def test_hash_table(self):
+        """Test the O(1) search of k-points."""
+        lattice = self.lattice
+        frac_coords = kmesh_from_mpdivs([4, 4, 4], [0, 0, 0])
+        klist = KpointList(lattice, frac_coords)
+
+        for i, k in enumerate(frac_coords):
+            self.assertEqual(klist.index(k), i)
+            # Points differing by a G-vector and within the tolerance are equal.
+            self.assertEqual(klist.find(k + [1, -2, 0]), i)
+            self.assertEqual(klist.find(k + 1e-10), i)
+            self.assertEqual(klist.find(k - 1e-10), i)
+
+        self.assertEqual(klist.find([0.1, 0, 0]), -1)
+        self.assertFalse([0.1, 0, 0] in klist)
+        with self.assertRaises(ValueError):
+            klist.index([0.1, 0, 0])
+
+        # Points close to the border of the bins used to compute the hash.
+        table = KpointHashTable([[0.5e-6 + 1e-10, 0, 0], [0.5e-6 - 1e-10, 0, 0], [1 - 1e-10, 0, 0]])
+        self.assertEqual(table.find([0.5e-6 - 2e-9, 0, 0]), 0)
+        self.assertEqual(table.find([0, 0, 0]), 2)
+        self.assertEqual(table.find([1e-10, 0, 0]), 2)
+        self.assertEqual(KpointHashTable([[0, 0, 0]], umklapp=False).find([1, 0, 0]), -1)
+
+        # Remove duplicated points.
+        dup_klist = KpointList(lattice, np.concatenate([frac_coords, frac_coords + 1, frac_coords[::-1]]))
+        self.assertTrue(dup_klist.remove_duplicated() == klist)
+        self.assertEqual(len(dup_klist.remove_duplicated()), len(klist))
+
 class TestKpointsReader(AbipyTest):
 
     def test_reading(self):
@@ -320,6 +375,92 @@ class KmeshTest(AbipyTest):
  [ 1.          0.5         0.66666667]]"""
         self.assertMultiLineEqual(str(bz_kmesh), ref_string)
 
+    def test_map_mesh2ibz(self):
+        """Testing the mapping mesh --> IBZ."""
+        # Without spacegroup, only time-reversal is used.
+        mpdivs, shift = [4, 4, 4], [0, 0, 0]
+        kmesh = kmesh_from_mpdivs(mpdivs, shift, order="unit_cell")
+        ibz = kmesh[:48]
+        bz2ibz = map_mesh2ibz(None, mpdivs, shift, ibz)
+        self.assert_equal(bz2ibz[:48], np.arange(48))
+        self.assertFalse(np.any(bz2ibz == -1))
+        for ik, ik_ibz in enumerate(bz2ibz):
+            self.assertTrue(np.allclose((kmesh[ik] + ibz[ik_ibz]) % 1, 0) or ik_ibz == ik)
+
+        bz2ibz = map_mesh2ibz(None, mpdivs, shift, kmesh[:10])
+        self.assertTrue(np.any(bz2ibz == -1))
+
+        # Silicon with the full spacegroup: the multiplicity of the IBZ points gives the weights.
+        filepath = data.ref_file("si_scf_GSR.nc")
+        structure = Structure.from_file(filepath)
+        with KpointsReader(filepath) as r:
+            ibz = r.read_kpoints()
+
+        self.assert_equal(ibz.mpdivs, [8, 8, 8])
+        self.assertEqual(ibz.len_bz, 512)
+        bz2ibz = map_mesh2ibz(structure, ibz.mpdivs, ibz.shifts, ibz.frac_coords)
+        self.assertFalse(np.any(bz2ibz == -1))
+        self.assert_almost_equal(np.bincount(bz2ibz, minlength=len(ibz)) / 512, ibz.weights)
+
+    def test_ibz_from_mpdivs(self):
+        """Testing the reduction of the mesh to the IBZ."""
+        # Identity only.
+        frac_coords, weights = ibz_from_mpdivs([2, 2, 2], [0.5, 0.5, 0.5])
+        self.assertEqual(len(frac_coords), 8)
+        self.assert_almost_equal(weights, 8 * [1/8])
+
+        # Time-reversal.
+        krots = [np.eye(3, dtype=np.int), -np.eye(3, dtype=np.int)]
+        frac_coords, weights = ibz_from_mpdivs([2, 2, 2], [0.5, 0.5, 0.5], krots=krots)
+        self.assert_almost_equal(frac_coords, [[0.25, 0.25, 0.25], [-0.25, 0.25, 0.25],
+                                               [0.25, -0.25, 0.25], [-0.25, -0.25, 0.25]])
+        self.assert_almost_equal(weights, 4 * [1/4])
+
+        # Silicon: same points, weights and order as in ABINIT.
+        filepath = data.ref_file("si_scf_GSR.nc")
+        structure = Structure.from_file(filepath)
+        with KpointsReader(filepath) as r:
+            ibz = r.read_kpoints()
+
+        spgrp = structure.spacegroup
+        krots = spgrp.rot_g * spgrp.time_sign[:, np.newaxis, np.newaxis]
+        frac_coords, weights = ibz_from_mpdivs(ibz.mpdivs, ibz.shifts, krots=krots)
+        self.assert_almost_equal(frac_coords, ibz.frac_coords)
+        self.assert_almost_equal(weights, ibz.weights)
+
+    def test_ksymmetry_table(self):
+        """Testing the symmetry tables BZ --> IBZ."""
+        filepath = data.ref_file("si_scf_GSR.nc")
+        with KpointsReader(filepath) as r:
+            ibz = r.read_kpoints()
+
+        ktab = ibz.ktab
+        self.assertTrue(ktab.is_complete)
+        self.assertEqual(len(ktab.bz2ibz), ibz.len_bz)
+        self.assert_almost_equal(ktab.bz_frac_coords, kmesh_from_mpdivs(ibz.mpdivs, ibz.shifts, order="unit_cell"))
+
+        # k_bz = S k_ibz - G0
+        rot_k = np.einsum("kij,kj->ki", ktab.krots[ktab.symop], ibz.frac_coords[ktab.bz2ibz])
+        self.assert_almost_equal(rot_k - ktab.g0, ktab.bz_frac_coords)
+        self.assert_equal(ktab.mesh_indices(ktab.bz_frac_coords + 1), np.arange(ibz.len_bz))
+
+        # Symmetrization of values with shape [nsppol, nkpt, mband].
+        values_ibz = np.arange(2 * len(ibz) * 3).reshape(2, len(ibz), 3)
+        values_bz = ibz.symmetrize(values_ibz, axis=1)
+        self.assertEqual(values_bz.shape, (2, ibz.len_bz, 3))
+        self.assert_equal(values_bz[:, ktab.bz2ibz == 0], values_ibz[:, [0]])
+
+        kx, ky, plane = ibz.plane_cut(values_ibz[0, :, 0])
+        self.assertEqual(plane.shape, (8, 8))
+        self.assertEqual(plane[0, 0], values_ibz[0, 0, 0])
+
+        # Multiple shifts
+        mpdivs, shifts = [2, 2, 2], [[0, 0, 0], [0.5, 0.5, 0.5]]
+        kmesh = kmesh_from_mpdivs(mpdivs, shifts, order="unit_cell")
+        ktab = KSymmetryTable(None, mpdivs, shifts, kmesh)
+        self.assert_equal(ktab.bz2ibz, np.arange(16))
+        self.assert_almost_equal(ktab.bz_frac_coords, kmesh)
+
 
 if __name__ == "__main__":
     import unittest
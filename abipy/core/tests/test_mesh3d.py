@@ -4,6 +4,7 @@ from __future__ import print_function, division
 import numpy as np
 
 from abipy.core.mesh3d import *
+from abipy.core.fftengines import available_fft_backends, get_fft_backend
 from abipy.core.testing import *
 
 class TestMesh3D(AbipyTest):
@@ -24,8 +25,22 @@ class TestMesh3D(AbipyTest):
 
         print(mesh_444)
 
-        mesh_444.gvecs
-        mesh_444.rpoints
+        # Compare the vectorized tables with a simple loop.
+        mesh_343 = Mesh3D((3,4,3), rprimd)
+        gvecs, rpoints = [], []
+        for i, gx in enumerate([0, 1, -1]):
+            for j, gy in enumerate([0, 1, -2, -1]):
+                for k, gz in enumerate([0, 1, -1]):
+                    gvecs.append((gx, gy, gz))
+                    rpoints.append((i / 3, j / 4, k / 3))
+
+        self.assert_equal(mesh_343.gvecs, gvecs)
+        self.assert_almost_equal(mesh_343.rpoints, rpoints)
+
+        # |G|^2 with the metric.
+        mesh = Mesh3D((5,4,3), np.array([[0., 2, 2], [2, 0, 2], [2, 2, 0]]))
+        gcart = np.dot(mesh.gvecs, 2 * np.pi * np.linalg.inv(mesh.vectors).T)
+        self.assert_almost_equal(mesh.g2.ravel(), np.sum(gcart**2, axis=1))
 
     def test_fft(self):
         """FFT transforms"""
@@ -49,6 +64,57 @@ class TestMesh3D(AbipyTest):
                 int_g = fg[...,0,0,0]
                 self.assert_almost_equal(int_r, int_g)
 
+    def test_fft_backends(self):
+        """Batched FFTs with the different backends"""
+        mesh = Mesh3D((12,3,5), np.eye(3))
+        fg = mesh.random(dtype=np.complex, extra_dims=(3,2))
+        ref_fr = mesh.fft_g2r(fg, backend="numpy")
+
+        for name in available_fft_backends():
+            backend = get_fft_backend(name, nthreads=2)
+            fr = mesh.fft_g2r(fg, backend=name)
+            self.assert_almost_equal(fr, ref_fr)
+            self.assert_almost_equal(mesh.fft_r2g(fr, backend=backend), fg)
+
+        with self.assertRaises(ValueError):
+            get_fft_backend("foobar")
+
+    def test_fourier_interp(self):
+        """Fourier interpolation and evaluation at arbitrary points"""
+        rprimd = np.array([[0., 5, 5], [5, 0, 5], [5, 5, 0]])
+        mesh = Mesh3D((8, 9, 10), rprimd)
+        dense_mesh = Mesh3D((16, 18, 15), rprimd)
+
+        # Real fields with two spin components.
+        fr = mesh.random(extra_dims=2)
+        dense_fr = mesh.fourier_interp(fr, dense_mesh)
+        self.assertFalse(np.iscomplexobj(dense_fr))
+        self.assertEqual(dense_fr.shape, (2,) + dense_mesh.shape)
+
+        # The interpolant passes through the original points
+        # and the average is preserved.
+        self.assert_almost_equal(dense_fr[:, ::2, ::2, :], mesh.fourier_interp(fr, Mesh3D((8, 9, 15), rprimd)))
+        self.assert_almost_equal(mesh.integrate(fr), dense_mesh.integrate(dense_fr))
+
+        # Going back to the initial mesh gives the initial data (the new mesh contains all the G-vectors).
+        dense_mesh = Mesh3D((16, 18, 20), rprimd)
+        dense_fr = mesh.fourier_interp(fr, dense_mesh)
+        self.assert_almost_equal(dense_fr[:, ::2, ::2, ::2], fr)
+        self.assert_almost_equal(dense_mesh.fourier_interp(dense_fr, mesh), fr)
+
+        # Interpolation from G-space.
+        self.assert_almost_equal(mesh.fourier_interp(mesh.fft_r2g(fr), dense_mesh, inspace="g").real, dense_fr)
+
+        # The Fourier series reproduces the Fourier interpolation on the dense mesh.
+        fg = mesh.fft_r2g(fr)
+        rpoints = dense_mesh.rpoints[::37]
+        values = mesh.fourier_eval(fg, rpoints, chunk_size=1000)
+        self.assertEqual(values.shape, (2, len(rpoints)))
+        self.assert_almost_equal(values, np.reshape(dense_fr, (2, -1))[:, ::37])
+
+        with self.assertRaises(ValueError):
+            mesh.fourier_interp(fr, Mesh3D((16, 18, 20), np.eye(3)))
+
     #def test_trilinear_interp(self):
     #    return
     #    rprimd = np.array([1.,0,0, 0,1,0, 0,0,1])
@@ -82,6 +82,25 @@ class TestSymmetries(AbipyTest):
 
                 self.assertFalse(err_msg)
 
+        # Test the vectorized methods.
+        self.assertEqual(spgrp.rot_r.shape, (len(spgrp), 3, 3))
+        self.assertEqual(spgrp.tau.shape, (len(spgrp), 3))
+        kpoints = np.random.rand(5, 3)
+        gvecs = np.random.randint(-4, 5, size=(10, 3))
+        rot_k, rot_r = spgrp.rotate_k_all(kpoints), spgrp.rotate_r_all(kpoints, in_ucell=True)
+        rot_g = spgrp.rotate_gvecs_all(gvecs)
+        assert rot_k.shape == (len(spgrp), 5, 3) and rot_g.shape == (len(spgrp), 10, 3)
+        for isym, symop in enumerate(spgrp):
+            self.assert_equal(spgrp.rot_g[isym], symop.rot_g)
+            self.assert_equal(rot_g[isym], [np.dot(symop.rot_g, g) * symop.time_sign for g in gvecs])
+            for ik, kpoint in enumerate(kpoints):
+                self.assert_almost_equal(rot_k[isym, ik], symop.rotate_k(kpoint))
+                self.assert_almost_equal(rot_r[isym, ik], symop.rotate_r(kpoint, in_ucell=True))
+
+        for kpoint in [[0, 0, 0], [0.5, 0, 0], [0.25, 0.25, 0], [0.1, 0.2, 0.3]]:
+            mask = spgrp.little_group_mask(kpoint)
+            self.assert_equal(mask, [symop.preserve_k(kpoint, ret_g0=False) for symop in spgrp])
+
         # Test little group.
         # TODO
         #ltg_symmops, g0vecs, isyms = spgrp.find_little_group(kpoint=[0,0,0])
@@ -149,6 +168,10 @@ class LittleGroupTest(AbipyTest):
         for kpoint in kpoints:
             ltk = spgrp.find_little_group(kpoint)
             print(ltk)
+            for symmop, g0 in ltk.iter_symmop_g0():
+                self.assert_almost_equal(symmop.rotate_k(kpoint) - kpoint, g0)
+
+        self.assertEqual(len(spgrp.find_little_group([0, 0, 0])), len(spgrp))
             #wfk_file.classify_ebands(0, kpoint, bands_range=range(0,5))
 
 
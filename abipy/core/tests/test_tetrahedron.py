@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Tests for the tetrahedron module."""
+from __future__ import print_function, division
+
+import numpy as np
+
+from abipy.core.kpoints import kmesh_from_mpdivs
+from abipy.core.tetrahedron import LinearTetrahedron
+from abipy.core.testing import *
+
+
+class LinearTetrahedronTest(AbipyTest):
+
+    def test_free_electron_dos(self):
+        """Testing the linear tetrahedron method with a free-electron band."""
+        mpdivs = [8, 8, 8]
+        tetra = LinearTetrahedron(np.eye(3), mpdivs)
+        self.assertEqual(tetra.nbz, 512)
+        self.assertEqual(tetra.ntetra, 6 * 512)
+        self.assertEqual(tetra.tetras.min(), 0)
+        self.assertEqual(tetra.tetras.max(), 511)
+
+        # Each point of the mesh belongs to 24 tetrahedra.
+        self.assert_equal(np.bincount(tetra.tetras.ravel()), 24)
+
+        kbz = kmesh_from_mpdivs(mpdivs, [0, 0, 0], order="unit_cell")
+        kbz = np.where(kbz >= 0.5, kbz - 1, kbz)
+        eigens = np.array([np.sum(kbz**2, axis=1), 1 + np.sum(kbz**2, axis=1)])
+
+        mesh, step = np.linspace(-0.1, 2, num=2001, retstep=True)
+        dos = tetra.get_dos(mesh, eigens)
+
+        # The DOS of each band integrates to one.
+        self.assert_almost_equal(dos.sum() * step, 2, decimal=2)
+
+        # Free-electron DOS: 2 pi sqrt(e) below the first sphere touching the BZ boundary.
+        e = 0.15
+        ie = np.searchsorted(mesh, e)
+        self.assertTrue(abs(dos[ie] - 2 * np.pi * np.sqrt(mesh[ie])) < 0.1 * 2 * np.pi * np.sqrt(e))
+
+        # Weights equal to one give the same DOS.
+        self.assert_almost_equal(tetra.get_dos(mesh, eigens, weights_bz=np.ones(eigens.shape)), dos)
+
+
+if __name__ == "__main__":
+    import unittest
+    unittest.main()
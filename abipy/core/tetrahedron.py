@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+Linear tetrahedron method for the integration of band-like quantities
+defined on a homogeneous mesh of the Brillouin zone.
+"""
+from __future__ import print_function, division, unicode_literals
+
+import numpy as np
+
+__all__ = [
+    "LinearTetrahedron",
+]
+
+# Tetrahedra of the sub-cell sharing the diagonal 0 --> 7.
+# Corners are labelled with the bits (x=1, y=2, z=4) of their offset in the sub-cell.
+_BASE_TETRAS = np.array([
+    [0, 1, 3, 7],
+    [0, 1, 5, 7],
+    [0, 2, 3, 7],
+    [0, 2, 6, 7],
+    [0, 4, 5, 7],
+    [0, 4, 6, 7],
+])
+
+
+class LinearTetrahedron(object):
+    """
+    Decomposition of a homogeneous mesh of the BZ in tetrahedra.
+    Each sub-cell of the mesh is split in 6 tetrahedra sharing the shortest diagonal
+    (Blöchl, Jepsen, Andersen, PRB 49, 16223 (1994)).
+
+    The points of the mesh are ordered as in `kmesh_from_mpdivs` with order="unit_cell"
+    i.e. the flat index of the point (i, j, k) is i * n2 * n3 + j * n3 + k.
+    """
+    def __init__(self, reciprocal_lattice, mpdivs):
+        """
+        Args:
+            reciprocal_lattice: :class:`Lattice` object or (3, 3) matrix with the reciprocal lattice vectors (rows).
+            mpdivs: The three divisions of the mesh.
+        """
+        self.mpdivs = np.array(mpdivs, dtype=np.int)
+        if self.mpdivs.shape != (3,) or np.any(self.mpdivs <= 0):
+            raise ValueError("Wrong value for mpdivs: %s" % str(mpdivs))
+
+        gmet = np.asarray(getattr(reciprocal_lattice, "matrix", reciprocal_lattice), dtype=np.float)
+
+        # Cartesian vectors connecting the corners of the sub-cell to the origin.
+        bits = np.array([[(c >> i) & 1 for i in range(3)] for c in range(8)])
+        corners = np.dot(bits / self.mpdivs, gmet)
+
+        # Select the shortest main diagonal (d0 --> 7 - d0) and map the base tetrahedra onto it.
+        diags = [np.linalg.norm(corners[7 - d0] - corners[d0]) for d0 in range(4)]
+        d0 = int(np.argmin(diags))
+        tetra_corners = _BASE_TETRAS ^ d0
+
+        # Indices of the 8 corners of all the sub-cells: shape [8, nbz]
+        n1, n2, n3 = self.mpdivs
+        i, j, k = np.meshgrid(np.arange(n1), np.arange(n2), np.arange(n3), indexing="ij")
+        i, j, k = i.ravel(), j.ravel(), k.ravel()
+
+        cell_inds = np.empty((8, self.nbz), dtype=np.int)
+        for c, (bx, by, bz) in enumerate(bits):
+            cell_inds[c] = np.ravel_multi_index(((i + bx) % n1, (j + by) % n2, (k + bz) % n3), self.mpdivs)
+
+        # tetras[t, :] gives the indices of the 4 vertices of tetrahedron t.
+        self.tetras = cell_inds[tetra_corners].transpose(2, 0, 1).reshape(-1, 4)
+
+    def __str__(self):
+        return "LinearTetrahedron: mpdivs = %s, ntetra = %d" % (str(self.mpdivs), self.ntetra)
+
+    @property
+    def nbz(self):
+        """Number of points in the mesh."""
+        return int(self.mpdivs.prod())
+
+    @property
+    def ntetra(self):
+        """Number of tetrahedra."""
+        return len(self.tetras)
+
+    def get_dos(self, mesh, values_bz, weights_bz=None, chunk_size=2**20):
+        """
+        Compute the density of states on a linear mesh with the linear tetrahedron method.
+
+        Args:
+            mesh: Linear mesh (sorted array) where the DOS is computed.
+            values_bz: Array of shape [nbz] or [nband, nbz] with the values (e.g. eigenvalues)
+                on the full mesh. The DOS of each band integrates to one.
+            weights_bz: Optional array with the same shape as values_bz with the weights of the
+                points e.g. occupation factors. The weight of the tetrahedron is the mean of the
+                weights of its vertices.
+            chunk_size: Max number of elements in the temporary arrays.
+
+        Returns:
+            ndarray of shape [len(mesh)] with the DOS summed over bands.
+        """
+        mesh = np.asarray(mesh, dtype=np.float)
+        values_bz = np.reshape(np.asarray(values_bz, dtype=np.float), (-1, self.nbz))
+        if weights_bz is not None:
+            weights_bz = np.reshape(np.asarray(weights_bz, dtype=np.float), values_bz.shape)
+
+        nw = len(mesh)
+        dos = np.zeros(nw)
+
+        for band, values in enumerate(values_bz):
+            # Energies at the vertices sorted in ascending order: shape [ntetra, 4]
+            eig = np.sort(values[self.tetras], axis=1)
+            if weights_bz is None:
+                wtetra = np.ones(self.ntetra)
+            else:
+                wtetra = weights_bz[band][self.tetras].mean(axis=1)
+
+            # Each tetrahedron contributes only to the points in [e1, e4].
+            lo = np.searchsorted(mesh, eig[:, 0], side="left")
+            hi = np.searchsorted(mesh, eig[:, 3], side="right")
+            nwin = (hi - lo).max() if self.ntetra else 0
+            if nwin == 0: continue
+
+            offsets = np.arange(nwin)
+            step = max(1, chunk_size // nwin)
+            for start in range(0, self.ntetra, step):
+                stop = start + step
+                inds = lo[start:stop, np.newaxis] + offsets
+                mask = inds < hi[start:stop, np.newaxis]
+                inds = np.minimum(inds, nw - 1)
+
+                e1, e2, e3, e4 = [eig[start:stop, i, np.newaxis] for i in range(4)]
+                w = mesh[inds]
+
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    g1 = 3 * (w - e1) ** 2 / ((e2 - e1) * (e3 - e1) * (e4 - e1))
+                    g2 = (3 * (e2 - e1) + 6 * (w - e2) - 3 * ((e3 - e1) + (e4 - e2)) * (w - e2) ** 2 /
+                          ((e3 - e2) * (e4 - e2))) / ((e3 - e1) * (e4 - e1))
+                    g3 = 3 * (e4 - w) ** 2 / ((e4 - e1) * (e4 - e2) * (e4 - e3))
+
+                    g = np.where(w < e2, g1, np.where(w < e3, g2, g3))
+                    g = np.where(mask & np.isfinite(g), g, 0.0)
+
+                dos += np.bincount(inds.ravel(), weights=(wtetra[start:stop, np.newaxis] * g).ravel(), minlength=nw)
+
+        return dos / self.ntetra
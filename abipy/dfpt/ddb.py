@@ -3,20 +3,28 @@
 from __future__ import print_function, division, unicode_literals
 
 import os
+import json
 import tempfile
 import numpy as np
 
+from collections import namedtuple, OrderedDict
 from monty.collections import AttrDict
 from monty.functools import lazy_property
+from pymatgen.core.units import Ha_to_eV, bohr_to_ang
 from pymatgen.io.abinitio.tasks import AnaddbTask, TaskManager
 from abipy.core.mixins import TextFile, Has_Structure
 from abipy.core.symmetries import SpaceGroup
 from abipy.core.structure import Structure
+from abipy.core.kpoints import KpointList, KpointHashTable, KSymmetryTable
+from abipy.dfpt.phonons import PhononBands
 from abipy.htc.input import AnaddbInput
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Atomic mass unit in electron masses.
+_AMU_EMASS = 1.660538782e-27 / 9.10938215e-31
+
 
 class TaskException(Exception):
     """
@@ -44,6 +52,54 @@ class TaskException(Exception):
         return "\n".join(lines)
 
 
+class DdbBlock(namedtuple("DdbBlock", "dord btype qpts nelem offset")):
+    """
+    Metadata associated to a block of derivatives stored in the DDB file.
+
+    .. attributes:
+
+        dord: Order of the derivative (0 for the total energy).
+        btype: String with the type of the block e.g. "2nd derivatives (non-stat.)"
+        qpts: List with the reduced coordinates of the q-points (already divided by the normalization factor).
+        nelem: Number of elements in the block.
+        offset: Byte offset of the first element in the file.
+    """
+    @property
+    def qpoint(self):
+        """`ndarray` with the (first) q-point of the block. None if the block does not depend on q."""
+        return np.array(self.qpts[0]) if self.qpts else None
+
+    def as_dict(self):
+        return dict(dord=self.dord, btype=self.btype, qpts=[list(q) for q in self.qpts],
+                    nelem=self.nelem, offset=self.offset)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(dord=d["dord"], btype=d["btype"], qpts=[tuple(q) for q in d["qpts"]],
+                   nelem=d["nelem"], offset=d["offset"])
+
+
+def _parse_block_header(line):
+    """
+    Parse the header of a block e.g. `2nd derivatives (non-stat.)  - # elements :      36`.
+    Returns (dord, btype, nelem) or None if line is not a block header.
+    """
+    if b"# elements" not in line:
+        return None
+
+    head, nelem = line.rsplit(b":", 1)
+    btype = head.rsplit(b"-", 1)[0].strip().decode("ascii")
+    dord = int(btype[0]) if btype[0].isdigit() else 0
+
+    return dord, btype, int(nelem)
+
+
+def _parse_floats(lines):
+    """Convert a list of lines written in Fortran format into a `ndarray` of floats."""
+    tokens = b" ".join(lines).replace(b"D", b"E").split()
+    return np.array([float(t) for t in tokens])
+
+
 class DdbFile(TextFile, Has_Structure):
     """
     This object provides an interface to the DDB file produced by ABINIT
@@ -53,10 +109,15 @@ class DdbFile(TextFile, Has_Structure):
     def structure(self):
         structure = Structure.from_abivars(**self.header)
         # Add Spacegroup (needed in guessed_ngkpt)
+        structure.set_spacegroup(self.spacegroup)
+        return structure
+
+    @lazy_property
+    def spacegroup(self):
+        """:class:`SpaceGroup` built from the symmetries reported in the header."""
         # FIXME: has_timerev is always True
         spgid, has_timerev, h = 0, True, self.header
-        structure.set_spacegroup(SpaceGroup(spgid, h.symrel, h.tnons, h.symafm, has_timerev))
-        return structure
+        return SpaceGroup(spgid, h.symrel, h.tnons, h.symafm, has_timerev)
 
     @lazy_property
     def header(self):
@@ -93,12 +154,12 @@ class DdbFile(TextFile, Has_Structure):
                 try:
                     float(tokens[0])
                     parse = float if "." in tokens[0] else int
-                    keyvals[-1][1].extend(map(parse, tokens))
+                    keyvals[-1][1].extend(list(map(parse, tokens)))
                 except ValueError:
                     # We have a new key
                     key = tokens.pop(0)
                     parse = float if "." in tokens[0] else int
-                    keyvals.append((key, map(parse, tokens)))
+                    keyvals.append((key, list(map(parse, tokens))))
 
         h = AttrDict(version=version)
         for key, value in keyvals:
@@ -132,27 +193,171 @@ class DdbFile(TextFile, Has_Structure):
 
     def _read_qpoints(self):
         """Read the list q-points from the DDB file. Returns `ndarray`"""
-        # 2nd derivatives (non-stat.)  - # elements :      36
-        # qpt  2.50000000E-01  0.00000000E+00  0.00000000E+00   1.0
+        # Since there are multiple blocks with the same q-point,
+        # we use a hash table to remove duplicates.
+        table, qpoints = KpointHashTable([], umklapp=False), []
+        for block in self.blocks:
+            if block.dord == 2 and table.find(block.qpoint) == -1:
+                table.add(block.qpoint)
+                qpoints.append(block.qpoint)
 
-        # Since there are multiple occurrences of qpt in the DDB file
-        # we use seen to remove duplicates.
-        self.seek(0)
-        tokens, seen = [], set()
+        return np.reshape(qpoints, (-1,3))
 
-        for line in self:
-            line = line.strip()
-            if line.startswith("qpt") and line not in seen:
-                seen.add(line)
-                tokens.append(line.replace("qpt", ""))
+    @property
+    def block_index_path(self):
+        """Path of the file used to cache the index of the blocks."""
+        return self.filepath + ".index.json"
+
+    @lazy_property
+    def blocks(self):
+        """
+        List of :class:`DdbBlock` with the metadata of the blocks in the DDB file.
+        The index is read from `block_index_path` if the file exists and is up-to-date
+        else it is computed by scanning the DDB file once.
+        """
+        blocks = self._read_block_index()
+        return blocks if blocks is not None else self._scan_blocks()
 
-        qpoints, weights = [], []
-        for tok in tokens:
-            nums = map(float, tok.split())
-            qpoints.append(nums[:3])
-            weights.append(nums[3])
+    def _file_signature(self):
+        stat = os.stat(self.filepath)
+        return dict(size=stat.st_size, mtime=stat.st_mtime)
 
-        return np.reshape(qpoints, (-1,3))
+    def _read_block_index(self):
+        """Read the index from `block_index_path`. Returns None if not available or obsolete."""
+        try:
+            with open(self.block_index_path, "rt") as fh:
+                d = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if d.get("signature") != self._file_signature():
+            logger.info("Ignoring obsolete index file %s" % self.block_index_path)
+            return None
+
+        return [DdbBlock.from_dict(b) for b in d["blocks"]]
+
+    def write_block_index(self, blocks=None):
+        """
+        Save the index of the blocks in `block_index_path` so that the DDB file is not scanned again.
+        blocks is the list of :class:`DdbBlock` to save, if None self.blocks is used.
+        """
+        if blocks is None: blocks = self.blocks
+        d = dict(signature=self._file_signature(), blocks=[b.as_dict() for b in blocks])
+        with open(self.block_index_path, "wt") as fh:
+            json.dump(d, fh)
+
+    def _scan_blocks(self):
+        """
+        Scan the DDB file and build the list of :class:`DdbBlock`.
+        The elements of the blocks are skipped, they are read on demand with `read_block_data`.
+        """
+        blocks = []
+        with open(self.filepath, "rb") as fh:
+            # Skip the header.
+            for line in iter(fh.readline, b""):
+                if line.strip().startswith(b"**** Database of total energy derivatives"):
+                    break
+
+            while True:
+                line = fh.readline()
+                if not line or line.strip().startswith(b"List of bloks"): break
+
+                hdr = _parse_block_header(line)
+                if hdr is None: continue
+                dord, btype, nelem = hdr
+
+                # Read the q-points (if any).
+                qpts = []
+                offset = fh.tell()
+                line = fh.readline()
+                while line.strip().startswith(b"qpt"):
+                    nums = _parse_floats([line.strip()[3:]])
+                    qpts.append(tuple(float(q) for q in nums[:3] / nums[3]))
+                    offset = fh.tell()
+                    line = fh.readline()
+
+                blocks.append(DdbBlock(dord=dord, btype=btype, qpts=qpts, nelem=nelem, offset=offset))
+
+                # Skip the elements of the block.
+                fh.seek(offset)
+                for i in range(nelem):
+                    fh.readline()
+
+        return blocks
+
+    def read_block_data(self, block):
+        """
+        Read the elements of a block. Returns `ndarray` of shape (nelem, ncols) where the
+        first columns give the indices (idir1, ipert1, idir2, ipert2 ...) and the last
+        ones the real and imaginary part of the derivative.
+
+        Args:
+            block: :class:`DdbBlock` or index of the block in self.blocks
+        """
+        if not isinstance(block, DdbBlock): block = self.blocks[block]
+
+        with open(self.filepath, "rb") as fh:
+            fh.seek(block.offset)
+            lines = [fh.readline() for i in range(block.nelem)]
+
+        return _parse_floats(lines).reshape(block.nelem, -1)
+
+    @lazy_property
+    def _qblocks_table(self):
+        """
+        Tuple (table, qblocks) where table is a :class:`KpointHashTable` with the q-points
+        of the blocks and qblocks[iq] is the list of blocks computed at the iq-th q-point.
+        """
+        table, qblocks = KpointHashTable([], umklapp=False), []
+        for block in self.blocks:
+            if not block.qpts: continue
+            iq = table.find(block.qpoint)
+            if iq == -1:
+                iq = table.add(block.qpoint)
+                qblocks.append([])
+            qblocks[iq].append(block)
+
+        return table, qblocks
+
+    def find_blocks(self, qpoint, dord=2):
+        """Returns the list of blocks with derivatives of order dord computed at the given qpoint."""
+        table, qblocks = self._qblocks_table
+        iq = table.find(qpoint)
+        if iq == -1: return []
+        return [b for b in qblocks[iq] if b.dord == dord]
+
+    def get_dynmat(self, qpoint):
+        """
+        Read the second derivatives of the energy with respect to the atomic displacements
+        at the given qpoint.
+
+        Args:
+            qpoint: Reduced coordinates of the q-point.
+
+        Returns:
+            Complex `ndarray` of shape (3, natom, 3, natom) with d2E/(du_{idir1,ipert1}* du_{idir2,ipert2})
+            in Ha (reduced coordinates, same convention as in the DDB file).
+            Elements that are not reported in the DDB file are set to nan.
+
+        Raises:
+            ValueError if the DDB file does not contain the q-point.
+        """
+        blocks = self.find_blocks(qpoint, dord=2)
+        if not blocks:
+            raise ValueError("Cannot find qpoint %s in DDB file %s" % (str(qpoint), self.filepath))
+
+        natom = self.header.natom
+        dynmat = np.empty((3, natom, 3, natom), dtype=np.complex)
+        dynmat.fill(np.nan)
+
+        # Use reversed so that the first block has precedence if the same element is reported twice.
+        for block in reversed(blocks):
+            data = self.read_block_data(block)
+            i1, p1, i2, p2 = (data[:, :4].astype(np.int) - 1).T
+            ok = (p1 < natom) & (p2 < natom)
+            dynmat[i1[ok], p1[ok], i2[ok], p2[ok]] = data[ok, 4] + 1j * data[ok, 5]
+
+        return dynmat
 
     @lazy_property
     def guessed_ngqpt(self):
@@ -166,16 +371,10 @@ class DdbFile(TextFile, Has_Structure):
             to different meshes and/or the Q-mesh is shifted.
         """
         # Build the union of the stars of the q-points.
-        all_qpoints = np.empty((len(self.qpoints) * len(self.structure.spacegroup), 3))
-        count = 0
-        for qpoint in self.qpoints:
-            for op in self.structure.spacegroup:
-                all_qpoints[count] = op.rotate_k(qpoint, wrap_tows=False)
-                count += 1
+        all_qpoints = self.spacegroup.rotate_k_all(self.qpoints).reshape(-1, 3)
 
         # Replace zeros with np.inf
-        for q in all_qpoints: 
-            q[q == 0] = np.inf
+        all_qpoints[all_qpoints == 0] = np.inf
 
         # Compute the minimum of the fractional coordinates along the 3 directions and invert
         #print(all_qpoints)
@@ -187,8 +386,47 @@ class DdbFile(TextFile, Has_Structure):
 
         return np.array(ngqpt, dtype=np.int)
 
+    @lazy_property
+    def _ifc_interpolators(self):
+        # Cache of IfcInterpolator objects indexed by (ngqpt, asr)
+        return {}
+
+    def get_ifc_interpolator(self, ngqpt=None, asr=True):
+        """
+        Returns a :class:`IfcInterpolator` built from the dynamical matrices stored in the DDB file.
+        The object is cached so that the interatomic force constants are computed only once.
+
+        Args:
+            ngqpt: Divisions of the q-mesh in the DDB file. Auto-detected if None (default)
+            asr: True if the acoustic sum rule should be imposed.
+        """
+        if ngqpt is None: ngqpt = self.guessed_ngqpt
+        key = (tuple(int(n) for n in ngqpt), bool(asr))
+        try:
+            return self._ifc_interpolators[key]
+        except KeyError:
+            ifc = self._ifc_interpolators[key] = IfcInterpolator.from_ddb(self, ngqpt=ngqpt, asr=asr)
+            return ifc
+
+    def interpolate_phbands(self, qpoints, ngqpt=None, asr=True):
+        """
+        Compute the phonon band structure on an arbitrary list of q-points by Fourier
+        interpolating the interatomic force constants. Everything is done in-process with
+        numpy, anaddb is not needed. Note that the dipole-dipole interaction is not
+        treated separately hence the LO-TO splitting of polar materials is not reproduced.
+
+        Args:
+            qpoints: Array-like object with the reduced coordinates of the q-points.
+            ngqpt: Divisions of the q-mesh in the DDB file. Auto-detected if None (default)
+            asr: True if the acoustic sum rule should be imposed.
+
+        Returns:
+            :class:`PhononBands` object.
+        """
+        return self.get_ifc_interpolator(ngqpt=ngqpt, asr=asr).get_phbands(qpoints)
+
     def calc_phmodes_at_qpoint(self, qpoint=None, asr=2, chneut=1, dipdip=1, 
-                               workdir=None, manager=None, verbose=0, ret_task=False):
+                               workdir=None, manager=None, verbose=0, ret_task=False, engine="anaddb"):
         """
         Execute anaddb to compute phonon modes at the given q-point.
 
@@ -198,6 +436,8 @@ class DdbFile(TextFile, Has_Structure):
             workdir: Working directory. If None, a temporary directory is created.
             manager: :class:`TaskManager` object. If None, the object is initialized from the configuration file
             verbose: verbosity level. Set it to a value > 0 to get more information
+            engine: "anaddb" to run anaddb, "numpy" to interpolate the force constants in-process
+                with `interpolate_phbands` (chneut and dipdip are ignored).
         """
         if qpoint is None:
             qpoint = self.qpoints[0] 
@@ -205,6 +445,11 @@ class DdbFile(TextFile, Has_Structure):
                 raise ValueError("%s contains %s qpoints and the choice is ambiguous.\n" 
                                  "Please specify the qpoint in calc_phmodes_at_qpoint" % (self, len(self.qpoints)))
 
+        if engine == "numpy":
+            return self.interpolate_phbands([qpoint], asr=asr != 0)
+        elif engine != "anaddb":
+            raise ValueError("Wrong value for engine: %s" % engine)
+
         inp = AnaddbInput.modes_at_qpoint(self.structure, qpoint, asr=asr, chneut=chneut, dipdip=dipdip)
 
         if manager is None: manager = TaskManager.from_user_config()
@@ -304,6 +549,519 @@ class DdbFile(TextFile, Has_Structure):
     #        raise TaskException(task=task, report=report)
 
 
+class IfcInterpolator(object):
+    """
+    Interatomic force constants obtained by Fourier transforming the dynamical matrices
+    computed on a homogeneous q-mesh. Used to interpolate the phonon frequencies and the
+    displacements on arbitrary q-points without calling anaddb.
+
+    The dynamical matrix is expanded as D_{kk'}(q) = sum_R C_{kk'}(R) exp(i 2pi q.R) (lattice vectors only,
+    as in the DDB file). The images of R + tau_k' - tau_k in the Wigner-Seitz cell of the supercell are used
+    to reduce the aliasing of the interpolation. The long-range dipole-dipole interaction is not
+    treated separately.
+
+    .. attribute:: ifc
+
+        `ndarray` of shape [nrpt, natom, 3, natom, 3] with the force constants in Cartesian
+        coordinates (Ha/Bohr^2). The lattice vectors are given by `rpoints`.
+    """
+    def __init__(self, structure, rprimd, xred, masses, ngqpt, ifc):
+        """
+        Args:
+            structure: :class:`Structure` object.
+            rprimd: (3, 3) matrix with the lattice vectors (rows) in Bohr.
+            xred: Reduced coordinates of the atoms.
+            masses: Atomic masses in amu.
+            ngqpt: Divisions of the q-mesh.
+            ifc: `ndarray` of shape [nrpt, natom, 3, natom, 3] with the force constants in
+                Cartesian coordinates for the lattice vectors of the supercell (C order).
+        """
+        self.structure = structure
+        self.rprimd = np.reshape(rprimd, (3, 3))
+        self.xred = np.reshape(xred, (-1, 3))
+        self.masses = np.reshape(masses, (-1,))
+        self.ngqpt = np.array(ngqpt, dtype=np.int)
+        self.natom = len(self.xred)
+
+        self.ifc = np.reshape(ifc, (self.ngqpt.prod(), self.natom, 3, self.natom, 3))
+
+        n1, n2, n3 = self.ngqpt
+        self.rpoints = np.array(np.meshgrid(np.arange(n1), np.arange(n2), np.arange(n3), indexing="ij")).reshape(3, -1).T
+
+    def __str__(self):
+        return "%s: natom = %d, ngqpt = %s" % (self.__class__.__name__, self.natom, str(self.ngqpt))
+
+    @classmethod
+    def from_ddb(cls, ddb, ngqpt=None, asr=True):
+        """
+        Build the object from a :class:`DdbFile`. The dynamical matrices in the IBZ are
+        rotated with the symmetries of the crystal to obtain the full q-mesh.
+
+        Args:
+            ddb: :class:`DdbFile` object.
+            ngqpt: Divisions of the q-mesh in the DDB file. Auto-detected if None (default)
+            asr: True if the acoustic sum rule should be imposed.
+
+        Raises:
+            ValueError if the q-mesh cannot be reconstructed from the q-points in the DDB file.
+        """
+        h = ddb.header
+        if ngqpt is None: ngqpt = ddb.guessed_ngqpt
+        ngqpt = np.array(ngqpt, dtype=np.int)
+
+        natom = h.natom
+        rprimd = np.reshape(h.acell, (3, 1)) * h.rprim
+        gprimd = np.linalg.inv(rprimd).T
+        masses = np.reshape(h.amu, (-1,))[np.reshape(h.typat, (-1,)) - 1]
+
+        symmops = ddb.spacegroup.fm_symmops
+        ktab = KSymmetryTable(symmops, ngqpt, [0, 0, 0], ddb.qpoints)
+        if not ktab.is_complete:
+            raise ValueError("The q-mesh %s cannot be reconstructed from the %d q-points in %s" %
+                             (str(ngqpt), len(ddb.qpoints), ddb.filepath))
+
+        # Dynamical matrices in the IBZ in Cartesian coordinates: shape [natom, 3, natom, 3]
+        dyn_ibz = {}
+        for iq in np.unique(ktab.bz2ibz):
+            dynmat = ddb.get_dynmat(ddb.qpoints[iq])
+            if np.any(np.isnan(dynmat)):
+                raise ValueError("The dynamical matrix at q-point %s is not complete" % str(ddb.qpoints[iq]))
+            dyn_ibz[iq] = np.einsum("ia,ikjl,jb->kalb", gprimd, dynmat, gprimd)
+
+        # The atom k is mapped onto atom indsym[k] + lattice vector L[k] by the symmetry {S|t}.
+        # Under this operation, D(Sq)_{indsym[k] indsym[k']} = exp(i 2pi Sq.(L[k'] - L[k])) S D(q)_{kk'} S^T
+        symdata = {}
+        for isym in np.unique(ktab.symop):
+            op = symmops[isym]
+            xrot = np.dot(h.xred, op.rot_r.T) + op.tau
+            diff = xrot[:, np.newaxis, :] - h.xred[np.newaxis, :, :]
+            match = np.all(np.abs(diff - np.rint(diff)) < 1e-6, axis=-1)
+            if not np.all(match.any(axis=1)):
+                raise ValueError("Cannot map the atoms with symmetry:\n%s" % str(op))
+            indsym = match.argmax(axis=1)
+            lvecs = np.rint(xrot - h.xred[indsym])
+            # Symmetry operation in Cartesian coordinates.
+            rot_cart = np.dot(rprimd.T, np.dot(op.rot_r, np.linalg.inv(rprimd.T)))
+            symdata[isym] = (op, indsym, lvecs, rot_cart)
+
+        nqbz = ktab.len_bz
+        dyn_bz = np.empty((nqbz, natom, 3, natom, 3), dtype=np.complex)
+        for iq_bz, (iq_ibz, isym) in enumerate(zip(ktab.bz2ibz, ktab.symop)):
+            op, indsym, lvecs, rot_cart = symdata[isym]
+            sq = np.dot(op.rot_g, ddb.qpoints[iq_ibz])
+            dyn = np.einsum("ab,kblc,dc->kald", rot_cart, dyn_ibz[iq_ibz], rot_cart)
+            phase = np.exp(2j * np.pi * np.dot(lvecs, sq))
+            dyn *= np.outer(phase.conj(), phase)[:, np.newaxis, :, np.newaxis]
+            dyn_bz[iq_bz][indsym[:, np.newaxis], :, indsym[np.newaxis, :], :] = dyn.transpose(0, 2, 1, 3)
+            # D(-q) = D(q)^* and D(q + G) = D(q)
+            if op.time_sign == -1: dyn_bz[iq_bz] = dyn_bz[iq_bz].conj()
+
+        # C(R) = 1/N sum_q D(q) exp(-i 2pi q.R)
+        dyn_bz = np.reshape(dyn_bz, tuple(ngqpt) + dyn_bz.shape[1:])
+        ifc = np.fft.fftn(dyn_bz, axes=(0, 1, 2)).real / nqbz
+        ifc = np.reshape(ifc, (nqbz, natom, 3, natom, 3))
+
+        if asr:
+            # sum_{R,k'} C_{kk'}(R) = 0. The correction is added to the on-site term.
+            asr_sum = ifc.sum(axis=(0, 3))
+            for iat in range(natom):
+                ifc[0, iat, :, iat, :] -= asr_sum[iat]
+
+        return cls(ddb.structure, rprimd, h.xred, masses, ngqpt, ifc)
+
+    @lazy_property
+    def _ws_images(self):
+        """
+        List of tuples (rvecs, wifc), one for each pair of atoms (k, k') in C order.
+        rvecs are the lattice vectors R + L such that R + L + tau_k' - tau_k is in the Wigner-Seitz
+        cell of the supercell, wifc the force constants multiplied by the weight of the image.
+        """
+        # Lattice vectors of the supercell.
+        ls = np.arange(-2, 3)
+        svecs = np.array(np.meshgrid(ls, ls, ls, indexing="ij")).reshape(3, -1).T * self.ngqpt
+
+        images = []
+        # Shape [nrpt, nimg, 3]
+        rl = self.rpoints[:, np.newaxis, :] + svecs[np.newaxis, :, :]
+        for iat in range(self.natom):
+            for jat in range(self.natom):
+                dist = np.sqrt(np.sum(np.dot(rl + self.xred[jat] - self.xred[iat], self.rprimd) ** 2, axis=-1))
+                dmin = dist.min(axis=1)
+                is_ws = np.abs(dist - dmin[:, np.newaxis]) < 1e-6 * np.maximum(1, dmin[:, np.newaxis])
+                weights = 1 / is_ws.sum(axis=1)
+                irpt, iimg = np.nonzero(is_ws)
+                wifc = self.ifc[irpt, iat, :, jat, :] * weights[irpt, np.newaxis, np.newaxis]
+                images.append((rl[irpt, iimg], wifc))
+
+        return images
+
+    def get_dynmat(self, qpoints, chunk_size=2**20):
+        """
+        Interpolate the dynamical matrix.
+
+        Args:
+            qpoints: Array-like object with the reduced coordinates of the q-points.
+            chunk_size: Max number of elements in the temporary arrays.
+
+        Returns:
+            Complex `ndarray` of shape [nq, 3*natom, 3*natom] with the dynamical matrices
+            in Cartesian coordinates (Ha/Bohr^2). Atoms are the slowest index.
+        """
+        qpoints = np.reshape(qpoints, (-1, 3))
+        nq, natom = len(qpoints), self.natom
+        dynmat = np.empty((nq, natom, 3, natom, 3), dtype=np.complex)
+
+        images = self._ws_images
+        step = max(1, chunk_size // max(len(rvecs) for rvecs, _ in images))
+        for start in range(0, nq, step):
+            qs = qpoints[start:start + step]
+            for ipair, (rvecs, wifc) in enumerate(images):
+                iat, jat = divmod(ipair, natom)
+                phases = np.exp(2j * np.pi * np.dot(qs, rvecs.T))
+                dynmat[start:start + step, iat, :, jat, :] = np.dot(phases, wifc.reshape(-1, 9)).reshape(-1, 3, 3)
+
+        return dynmat.reshape(nq, 3 * natom, 3 * natom)
+
+    def get_phmodes(self, qpoints):
+        """
+        Diagonalize the dynamical matrices at the given q-points.
+
+        Returns:
+            phfreqs: `ndarray` of shape [nq, 3*natom] with the frequencies in eV (negative if unstable)
+            phdispl_cart: `ndarray` of shape [nq, 3*natom, 3*natom] with the displacements
+                of the modes in Cartesian coordinates (Angstrom).
+        """
+        # Masses in electron masses
+        sqrt_mass = np.repeat(np.sqrt(self.masses * _AMU_EMASS), 3)
+
+        dynmat = self.get_dynmat(qpoints) / np.outer(sqrt_mass, sqrt_mass)
+        dynmat = 0.5 * (dynmat + np.conj(np.swapaxes(dynmat, -1, -2)))
+        w2, eigvecs = np.linalg.eigh(dynmat)
+
+        phfreqs = np.sign(w2) * np.sqrt(np.abs(w2)) * Ha_to_eV
+        phdispl_cart = np.swapaxes(eigvecs / sqrt_mass[:, np.newaxis], -1, -2) * bohr_to_ang
+
+        return phfreqs, phdispl_cart
+
+    def get_phbands(self, qpoints):
+        """
+        Interpolate the phonon band structure on the given list of q-points.
+        Returns :class:`PhononBands` object.
+        """
+        frac_coords = getattr(qpoints, "frac_coords", qpoints)
+        phfreqs, phdispl_cart = self.get_phmodes(frac_coords)
+        qpoints = KpointList(self.structure.reciprocal_lattice, frac_coords)
+
+        return PhononBands(self.structure, qpoints, phfreqs, phdispl_cart)
+
+
+def _block_key(block):
+    """Hashable key with the order, the type and the q-point(s) of a :class:`DdbBlock`."""
+    return (block.dord, block.btype, tuple(round(q, 8) + 0.0 for qpt in block.qpts for q in qpt))
+
+
+def _element_key(line, dord):
+    """Tuple with the perturbation indices (idir1, ipert1, idir2, ipert2 ...) of an element of the block."""
+    return tuple(int(t) for t in line.split()[:2 * dord])
+
+
+def _format_block_header(block, nelem):
+    """String (bytes) with the header of the block followed by the q-points (fixed format used by Abinit)."""
+    lines = ["%-30s- # elements :%8d" % (" " + block.btype, nelem)]
+    lines += [" qpt%16.8E%16.8E%16.8E%6.1f" % (q[0] + 0.0, q[1] + 0.0, q[2] + 0.0, 1.0) for q in block.qpts]
+    return ("\n".join(lines) + "\n").encode("ascii")
+
+
+def _format_nblocks(nblocks):
+    return (" Number of data blocks=%5d\n" % nblocks).encode("ascii")
+
+
+def _format_trailer(blocks):
+    """The list of blocks reported at the end of the DDB file."""
+    trailer = [b"\n List of bloks and their characteristics \n"]
+    for block in blocks:
+        trailer.extend([b"  \n", _format_block_header(block, block.nelem)])
+    return b"".join(trailer)
+
+
+def _read_raw_header(filepath, description=None):
+    """
+    Read the header of a DDB file (up to the line `**** Database of total energy derivatives ****`).
+    Returns bytes. If description is not None, the description reported in the header is replaced.
+    """
+    lines = []
+    with open(filepath, "rb") as fh:
+        for line in iter(fh.readline, b""):
+            lines.append(line)
+            if line.strip().startswith(b"**** Database of total energy derivatives"): break
+        else:
+            raise ValueError("Cannot find the database section in DDB file %s" % filepath)
+
+    if description is not None:
+        # The description follows the version and an empty line.
+        i = [j for j, line in enumerate(lines) if line.startswith(b"+DDB")][0]
+        lines[i + 2] = (" " + description.strip() + "\n").encode("ascii")
+
+    return b"".join(lines)
+
+
+class _MergedBlock(object):
+    """A block of the merged DDB file. The elements are copied from parts of the blocks of the input files."""
+    def __init__(self, block):
+        self.block = block
+        # Set with the perturbation indices of the elements.
+        self.keys = set()
+        # List of tuples (isrc, offset, nelem, keep) where keep is None if all the elements
+        # of the input block must be copied, else a list of booleans.
+        self.parts = []
+
+    @property
+    def nelem(self):
+        return len(self.keys)
+
+
+class DdbMerger(object):
+    """
+    Merge DDB files block-by-block in pure python (the mrgddb executable is not needed).
+
+    Blocks with the same type and the same q-point(s) are merged into a single block and the elements
+    that are already present (same perturbation indices) are discarded, the first occurrence has precedence.
+    The merger only stores the position of the elements in the input files: the data is copied verbatim
+    when the merged file is written so that large DDB files are never loaded in memory.
+
+    Example::
+
+        merger = DdbMerger(ddb_files)
+        merger.write("out_DDB", description="Merged DDB")
+
+        # Add the blocks produced by new perturbations to out_DDB.
+        DdbMerger(new_ddb_files).append("out_DDB")
+    """
+    def __init__(self, ddb_files=()):
+        """
+        Args:
+            ddb_files: List of paths to DDB files. Files can be also added with `add_file`.
+        """
+        self.filepaths = []
+        self._header = None
+        # OrderedDict: _block_key --> _MergedBlock
+        self._mblocks = OrderedDict()
+
+        for path in ddb_files:
+            self.add_file(path)
+
+    def __len__(self):
+        return len(self._mblocks)
+
+    def __str__(self):
+        return "DdbMerger: %d files, %d blocks" % (len(self.filepaths), len(self))
+
+    @property
+    def blocks(self):
+        """List of :class:`DdbBlock` with the merged blocks (offset is None)."""
+        return [mb.block._replace(nelem=mb.nelem, offset=None) for mb in self._mblocks.values()]
+
+    def add_file(self, filepath):
+        """
+        Add the blocks of a DDB file. The header must be compatible with the one of the first file.
+        Returns the number of new elements.
+        """
+        filepath = os.path.abspath(filepath)
+        with DdbFile(filepath) as ddb:
+            self._check_header(ddb)
+            blocks = ddb.blocks
+
+        isrc, nnew = len(self.filepaths), 0
+        self.filepaths.append(filepath)
+
+        with open(filepath, "rb") as fh:
+            for block in blocks:
+                fh.seek(block.offset)
+                keys = [_element_key(fh.readline(), block.dord) for i in range(block.nelem)]
+                nnew += self._add_block(isrc, block, keys)
+
+        return nnew
+
+    def _add_block(self, isrc, block, keys):
+        """Add the elements of block that are not already present. Returns the number of new elements."""
+        key = _block_key(block)
+        mb = self._mblocks.get(key)
+        if mb is None:
+            mb = self._mblocks[key] = _MergedBlock(block)
+
+        keep = []
+        for k in keys:
+            keep.append(k not in mb.keys)
+            mb.keys.add(k)
+
+        nkeep = sum(keep)
+        if nkeep:
+            mb.parts.append((isrc, block.offset, block.nelem, None if nkeep == block.nelem else keep))
+
+        return nkeep
+
+    def _check_header(self, ddb):
+        """Raise ValueError if the structure reported in the header of ddb differs from the one of the first file."""
+        h = ddb.header
+        if self._header is None:
+            self._header = h
+            return
+
+        for key in ("natom", "ntypat", "typat", "znucl", "acell", "rprim", "xred"):
+            ref, value = self._header.get(key), h.get(key)
+            if ref is None and value is None: continue
+            if ref is None or value is None or np.shape(ref) != np.shape(value) or not np.allclose(ref, value):
+                raise ValueError("DDB file %s is not compatible with %s: %s differs" %
+                                 (ddb.filepath, self.filepaths[0], key))
+
+    def _write_blocks(self, out, mblocks):
+        """
+        Write the merged blocks to the file object out (binary mode).
+        Returns the list of :class:`DdbBlock` with the offsets in out.
+        """
+        blocks, handles = [], {}
+        try:
+            for mb in mblocks:
+                out.write(b"  \n")
+                out.write(_format_block_header(mb.block, mb.nelem))
+                blocks.append(mb.block._replace(nelem=mb.nelem, offset=out.tell()))
+
+                for isrc, offset, nelem, keep in mb.parts:
+                    if isrc not in handles:
+                        handles[isrc] = open(self.filepaths[isrc], "rb")
+                    fh = handles[isrc]
+                    fh.seek(offset)
+                    for i in range(nelem):
+                        line = fh.readline()
+                        if keep is None or keep[i]: out.write(line)
+        finally:
+            for fh in handles.values():
+                fh.close()
+
+        return blocks
+
+    def write(self, out_ddb, description=None):
+        """
+        Write the merged DDB file. The header is taken from the first file.
+
+        Args:
+            out_ddb: Path of the output file. It can be one of the input files since
+                the data is written to a temporary file that is renamed at the end.
+            description: String with the description reported in the header.
+                If None, the description of the first file is used.
+
+        Returns:
+            List of :class:`DdbBlock` with the blocks of the output file.
+        """
+        if not self.filepaths:
+            raise ValueError("Cannot write a DDB file without input files")
+
+        tmp_path = out_ddb + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(_read_raw_header(self.filepaths[0], description=description))
+            out.write(_format_nblocks(len(self)))
+            blocks = self._write_blocks(out, self._mblocks.values())
+            out.write(_format_trailer(blocks))
+
+        if os.path.exists(out_ddb): os.remove(out_ddb)
+        os.rename(tmp_path, out_ddb)
+
+        return blocks
+
+    def append(self, out_ddb):
+        """
+        Append the merged blocks to an existing DDB file.
+
+        The elements already present in out_ddb are discarded and the new blocks are written in place
+        after the last block of out_ddb: only the header and the blocks computed at the same q-points
+        are read. The index of the blocks is saved in `DdbFile.block_index_path` so that the next call
+        does not need to scan out_ddb. The file is rewritten if some of the new elements belong to
+        blocks already present in out_ddb since the size of these blocks changes.
+
+        Returns:
+            List of :class:`DdbBlock` with the blocks of out_ddb.
+        """
+        with DdbFile(out_ddb) as ddb:
+            self._check_header(ddb)
+            old_blocks = ddb.blocks
+
+        # Select the merged blocks that are not in out_ddb.
+        old_table = dict((_block_key(b), b) for b in old_blocks)
+        new_mblocks = []
+        with open(out_ddb, "rb") as fh:
+            for key, mb in self._mblocks.items():
+                old = old_table.get(key)
+                if old is None:
+                    new_mblocks.append(mb)
+                    continue
+
+                fh.seek(old.offset)
+                old_keys = set(_element_key(fh.readline(), old.dord) for i in range(old.nelem))
+                if not mb.keys.issubset(old_keys):
+                    return self._rewrite(out_ddb)
+
+        if not new_mblocks: return old_blocks
+
+        with open(out_ddb, "r+b") as fh:
+            # Find the line with the number of blocks. It is overwritten in place at the end.
+            for line in iter(fh.readline, b""):
+                if line.strip().startswith(b"Number of data blocks"): break
+            count_pos = fh.tell() - len(line)
+            count_line = _format_nblocks(len(old_blocks) + len(new_mblocks))
+            if len(count_line) != len(line):
+                return self._rewrite(out_ddb)
+
+            # Remove the list of blocks reported after the last block and write the new blocks.
+            if old_blocks:
+                last = old_blocks[-1]
+                fh.seek(last.offset)
+                for i in range(last.nelem):
+                    fh.readline()
+            fh.seek(fh.tell())
+            fh.truncate()
+
+            blocks = old_blocks + self._write_blocks(fh, new_mblocks)
+            fh.write(_format_trailer(blocks))
+            fh.seek(count_pos)
+            fh.write(count_line)
+
+        with DdbFile(out_ddb) as ddb:
+            ddb.write_block_index(blocks)
+        return blocks
+
+    def _rewrite(self, out_ddb):
+        """Merge out_ddb with the input files and rewrite out_ddb."""
+        logger.info("Rewriting DDB file %s" % out_ddb)
+        merger = self.__class__([out_ddb] + self.filepaths)
+        blocks = merger.write(out_ddb)
+        with DdbFile(out_ddb) as ddb:
+            ddb.write_block_index(blocks)
+        return blocks
+
+
+def merge_ddb_files(ddb_files, out_ddb, description=None, append=False):
+    """
+    Merge a list of DDB files with :class:`DdbMerger`.
+
+    Args:
+        ddb_files: List of paths to DDB files.
+        out_ddb: Path of the output DDB file.
+        description: String with the description reported in the header of the output file.
+            If None, the description of the first file is used.
+        append: True if the blocks should be appended to out_ddb (if it exists) instead of overwriting it.
+
+    Returns:
+        out_ddb
+    """
+    merger = DdbMerger(ddb_files)
+    if append and os.path.exists(out_ddb):
+        merger.append(out_ddb)
+    else:
+        merger.write(out_ddb, description=description)
+
+    return out_ddb
+
+
 #class DdbConverger(object):
 #    def __init__(self, ddb, workdir=workdir, manager=None, num_cores=None):
 #        self.ddb = DdbFile(ddb)
@@ -12,9 +12,10 @@ from pymatgen.core.units import Ha_to_eV, eV_to_Ha
 from pymatgen.util.plotting_utils import add_fig_kwargs
 from abipy.core.func1d import Function1D
 from abipy.core.mixins import AbinitNcFile, Has_Structure, Has_PhononBands
-from abipy.core.kpoints import Kpoint
+from abipy.core.kpoints import Kpoint, KpointList, map_mesh2ibz
+from abipy.core.tetrahedron import LinearTetrahedron
 from abipy.iotools import ETSF_Reader
-from abipy.tools import gaussian
+from abipy.tools import gaussians_sum
 from abipy.tools.plotting_utils import Marker
 
 __all__ = [
@@ -111,10 +112,8 @@ class PhononBands(object):
             qcoords = r.read_qredcoords()
             qweights = r.read_qweights()
 
-            qpoints = []
-            for (qc, w) in zip(qcoords, qweights):
-                qpoints.append(Kpoint(qc, structure.reciprocal_lattice, weight=w))
-                                                                                   
+            qpoints = KpointList(structure.reciprocal_lattice, qcoords, weights=qweights)
+
             return cls(structure=structure,
                        qpoints=qpoints, 
                        phfreqs=r.read_phfreqs(),
@@ -365,7 +364,7 @@ class PhononBands(object):
     def qindex_qpoint(self, qpoint):
         """Returns (qindex, qpoint) from an integer or a qpoint."""
         qindex = self.qindex(qpoint)
-        qpoint = self.qpoints(qindex)
+        qpoint = self.qpoints[qindex]
         return qindex, qpoint
 
     def get_unstable_modes(self, below_mev=-5.0):
@@ -392,14 +391,33 @@ class PhononBands(object):
     #    """
     #    qindex, qpoint = self.qindex_qpoint(qpoint)
 
-    def get_phdos(self, method="gaussian", step=1.e-4, width=4.e-4):
+    def _get_wmesh(self, step):
+        """Linear mesh (eV) with the given step used to compute the phonon DOS. Returns (mesh, step)."""
+        w_min = self.minfreq
+        w_min -= 0.1 * abs(w_min)
+
+        w_max = self.maxfreq
+        w_max += 0.1 * abs(w_max)
+
+        nw = int(1 + (w_max - w_min) / step)
+
+        return np.linspace(w_min, w_max, num=nw, endpoint=True, retstep=True)
+
+    def _check_qweights(self):
+        if abs(self.qpoints.sum_weights() - 1) > 1.e-6:
+            raise ValueError("Qpoint weights should sum up to one")
+
+    def get_phdos(self, method="gaussian", step=1.e-4, width=4.e-4, ngqpt=None, shiftq=(0, 0, 0), nsigma=None):
         """
         Compute the phonon DOS on a linear mesh.
 
         Args:
-            method: String defining the method
+            method: String defining the method: "gaussian" or "tetra" (linear tetrahedron method).
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
+            ngqpt: Divisions of the homogeneous q-mesh. Required if method == "tetra".
+            shiftq: Shift of the q-mesh (used if method == "tetra").
+            nsigma: If not None, the gaussians are truncated at nsigma * width (faster for dense q-meshes).
 
         Returns:
             :class:`PhononDos` object.
@@ -408,33 +426,92 @@ class PhononBands(object):
 
             Requires a homogeneous sampling of the Brillouin zone.
         """
-        if abs(self.qpoints.sum_weights() - 1) > 1.e-6:
-            raise ValueError("Qpoint weights should sum up to one")
-
         # Compute the linear mesh for the DOS
-        w_min = self.minfreq
-        w_min -= 0.1 * abs(w_min)
+        mesh, step = self._get_wmesh(step)
 
-        w_max = self.maxfreq
-        w_max += 0.1 * abs(w_max)
+        if method == "gaussian":
+            self._check_qweights()
+            weights = np.repeat(self.qpoints.weights, self.num_branches)
+            values = gaussians_sum(mesh, self.phfreqs, width, weights=weights, nsigma=nsigma)
 
-        nw = 1 + (w_max - w_min) / step
+        elif method == "tetra":
+            if ngqpt is None:
+                raise ValueError("ngqpt must be specified when method == tetra")
 
-        mesh, step = np.linspace(w_min, w_max, num=nw, endpoint=True, retstep=True)
+            qfrac_coords = np.array([q.frac_coords for q in self.qpoints])
+            bz2ibz = map_mesh2ibz(self.structure, ngqpt, shiftq, qfrac_coords)
+            if np.any(bz2ibz == -1):
+                raise ValueError("Cannot reconstruct the full q-mesh from the q-points. %d points are missing" %
+                                 np.count_nonzero(bz2ibz == -1))
 
-        values = np.zeros(nw)
-        if method == "gaussian":
-            for (q, qpoint) in enumerate(self.qpoints):
-                weight = qpoint.weight
-                for nu in self.branches:
-                    w = self.phfreqs[q, nu]
-                    values += weight * gaussian(mesh, width, center=w)
+            tetra = LinearTetrahedron(self.structure.reciprocal_lattice, ngqpt)
+            values = tetra.get_dos(mesh, np.asarray(self.phfreqs)[bz2ibz].T)
 
         else:
             raise ValueError("Method %s is not supported" % method)
 
         return PhononDos(mesh, values)
 
+    @lazy_property
+    def atom_weights(self):
+        """
+        `ndarray` of shape (nqpt, 3*natom, natom) with the weights of the atoms in the phonon modes i.e.
+        the squared modulus of the components of the eigenvectors obtained from phdispl_cart
+        (the weights of each mode sum up to one).
+        """
+        masses = np.array([float(site.specie.atomic_mass) for site in self.structure])
+        displ = np.reshape(self.phdispl_cart, (self.num_qpoints, self.num_branches, self.num_atoms, 3))
+
+        weights = masses * (np.abs(displ) ** 2).sum(axis=-1)
+        norm = weights.sum(axis=-1)[..., np.newaxis]
+
+        return np.where(norm > 0, weights / np.where(norm > 0, norm, 1), 0.0)
+
+    def get_pjdos_atom(self, step=1.e-4, width=4.e-4, nsigma=None):
+        """
+        Compute the phonon DOS projected over atoms with the gaussian method.
+        The projections use the weights of the atoms in the eigenvectors (see `atom_weights`),
+        the sum of the projections gives the DOS computed by `get_phdos`.
+
+        Args:
+            step: Energy step (eV) of the linear mesh.
+            width: Standard deviation (eV) of the gaussian.
+            nsigma: If not None, the gaussians are truncated at nsigma * width (faster for dense q-meshes).
+
+        Returns:
+            List of :class:`PhononDos` objects, one for each atom in the structure.
+        """
+        self._check_qweights()
+        mesh, step = self._get_wmesh(step)
+
+        # weights[iatom, iq * num_branches + nu]
+        weights = self.qpoints.weights[:, np.newaxis, np.newaxis] * self.atom_weights
+        weights = np.reshape(weights, (-1, self.num_atoms)).T
+        values = gaussians_sum(mesh, self.phfreqs, width, weights=weights, nsigma=nsigma)
+
+        return [PhononDos(mesh, v) for v in values]
+
+    def get_pjdos_type(self, step=1.e-4, width=4.e-4, nsigma=None):
+        """
+        Compute the phonon DOS projected over atom types with the gaussian method.
+        Same arguments as `get_pjdos_atom`.
+
+        Returns:
+            :class:`OrderedDict` mapping the chemical symbol to the :class:`PhononDos` object.
+        """
+        pjdos_atom = self.get_pjdos_atom(step=step, width=width, nsigma=nsigma)
+
+        pjdos_type = collections.OrderedDict()
+        for site, pjdos in zip(self.structure, pjdos_atom):
+            symbol = site.specie.symbol
+            if symbol not in pjdos_type:
+                pjdos_type[symbol] = pjdos.dos.values.copy()
+            else:
+                pjdos_type[symbol] += pjdos.dos.values
+
+        mesh = pjdos_atom[0].dos.mesh
+        return collections.OrderedDict((symbol, PhononDos(mesh, values)) for symbol, values in pjdos_type.items())
+
     def create_xyz_vib(self, iqpt, filename, pre_factor=200, do_real=True, scale_matrix=None, max_supercell=None):
         """
         Create vibration XYZ file for visualization of phonons
@@ -931,9 +1008,10 @@ class PhononDos(object):
         fig = plt.gcf()
         return fig
 
-    def harmonic_thermo(self, tstart, tstop, num=50):
+    def harmonic_thermo(self, tstart, tstop, num=50, chunk_size=2**20):
         """
         Compute thermodinamic properties from the phonon DOS within the harmonic approximation.
+        All the temperatures are computed at once with array operations.
 
         start: scalar
             The starting value (in Kelvin) of the temperature mesh. 
@@ -941,12 +1019,11 @@ class PhononDos(object):
             The end value (in Kelvin) of the mesh.
         num: int, optional
             Number of samples to generate. Default is 50.
+        chunk_size: int, optional
+            Max number of elements in the temporary arrays of shape (num, len(mesh)).
         """
         tmesh = np.linspace(tstart, tstop, num=num)
 
-        coth = lambda x: 1.0 / np.tanh(x)
-        csch2 = lambda x: 1.0 / (np.sinh(x) ** 2)
-
         # Boltzmann constant in Ha/K
         kb_HaK = 8.617343e-5 / Ha_to_eV 
 
@@ -958,23 +1035,28 @@ class PhononDos(object):
         w =  self.dos.mesh[i:] * eV_to_Ha
         gw = self.dos.values[i:] * Ha_to_eV
 
-        from scipy.integrate import cumtrapz
         def integrate(values):
-            return cumtrapz(values, x=w)[-1]
+            return np.trapz(values, x=w, axis=-1)
 
         #w, gw = w[i:], gw[i:]
         # TODO
         # Check for possible numerical instabilities when w ~ 0 or negative
         # Prefactors are missing!
         df, de, cv, s = map(np.empty, 4 * (len(tmesh),))
-        for i, temp in enumerate(tmesh):
-            # Equations in Xavier's paper.
-            kt = kb_HaK * temp
+        step = max(1, chunk_size // len(w))
+        for start in range(0, len(tmesh), step):
+            sl = slice(start, start + step)
+
+            # Equations in Xavier's paper. Arrays of shape (ntemp, len(w))
+            kt = kb_HaK * tmesh[sl, np.newaxis]
             wd2kt = w / (2 * kt)
-            df[i] = kt * integrate(np.log(2 * np.sinh(wd2kt)) * gw)
-            de[i] = integrate(w * coth(wd2kt) * gw)
-            cv[i] = integrate(wd2kt * wd2kt * csch2(wd2kt) * gw)
-            s[i] = integrate((wd2kt * coth(wd2kt) - np.log(2 * np.sinh(wd2kt))) * gw)
+            log2sinh = np.log(2 * np.sinh(wd2kt))
+            coth = 1.0 / np.tanh(wd2kt)
+
+            df[sl] = kt[:, 0] * integrate(log2sinh * gw)
+            de[sl] = integrate(w * coth * gw)
+            cv[sl] = integrate(wd2kt * wd2kt / np.sinh(wd2kt) ** 2 * gw)
+            s[sl] = integrate((wd2kt * coth - log2sinh) * gw)
 
         locvars = locals()
         return HarmonicThermo(**{name: Function1D(tmesh, locvars[name]) for name in ("df", "de", "cv", "s")})
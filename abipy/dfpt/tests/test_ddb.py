@@ -2,14 +2,51 @@
 from __future__ import print_function, division
 
 import os
+import shutil
+import tempfile
 import numpy as np
 
+import abipy.data as abidata
+
 from abipy.core.testing import *
-from abipy.dfpt.ddb import DdbFile
+from abipy.dfpt.ddb import DdbFile, DdbMerger, merge_ddb_files
+from abipy.dfpt.phonons import PhononBands
 
 
 test_dir = os.path.join(os.path.dirname(__file__), "..", "..", 'test_files')
 
+
+def _write_partial_ddb(path, ref, selections):
+    """
+    Write a DDB file with the header of the DdbFile ref and a subset of its elements.
+    selections is a list of tuples (iblock, slice) with the elements of the blocks of ref to be written.
+    """
+    with open(ref.filepath, "rb") as fh:
+        header = []
+        for line in iter(fh.readline, b""):
+            header.append(line)
+            if b"Database of total energy derivatives" in line: break
+
+        data, heads = [], []
+        for iblock, sl in selections:
+            block = ref.blocks[iblock]
+            fh.seek(block.offset)
+            lines = [fh.readline() for i in range(block.nelem)][sl]
+            q = block.qpoint
+            heads.append((" 2nd derivatives (non-stat.)  - # elements :%8d\n" % len(lines) +
+                          " qpt%16.8E%16.8E%16.8E   1.0\n" % (q[0], q[1], q[2])).encode("ascii"))
+            data.append(b"".join(lines))
+
+    with open(path, "wb") as out:
+        out.write(b"".join(header))
+        out.write((" Number of data blocks=%5d\n" % len(heads)).encode("ascii"))
+        for head, lines in zip(heads, data):
+            out.write(b"  \n" + head + lines)
+        out.write(b"\n List of bloks and their characteristics \n")
+        for head in heads:
+            out.write(b"  \n" + head)
+
+
 class DdbTest(AbipyTest):
 
     def test_ddb_methods(self):
@@ -35,11 +72,155 @@ class DdbTest(AbipyTest):
             print(struct)
             assert struct.formula == "Al1 As1"
 
+            # Test the index of the blocks and the dynamical matrix.
+            self.assertEqual(len(ddb.blocks), 1)
+            block = ddb.blocks[0]
+            assert block.dord == 2 and block.nelem == 36
+            self.assert_equal(block.qpoint, [0.25, 0, 0])
+
+            data = ddb.read_block_data(block)
+            assert data.shape == (36, 6)
+
+            dynmat = ddb.get_dynmat([0.25, 0, 0])
+            assert dynmat.shape == (3, 2, 3, 2) and not np.any(np.isnan(dynmat))
+            self.assert_almost_equal(dynmat[0, 0, 0, 0], 0.80977066582497E+01 - 0.46347282336361E-16j)
+            self.assert_almost_equal(dynmat[1, 0, 0, 0], 0.32248812604158E+01 - 0.24812764873953E+00j)
+            # The dynamical matrix is hermitian.
+            self.assert_almost_equal(dynmat.reshape(6, 6), dynmat.reshape(6, 6).T.conj())
+
+            with self.assertRaises(ValueError):
+                ddb.get_dynmat([0, 0, 0])
+
             #ncfile = ddb.get_phmodes_at_qpoint()
             #print(ncfile)
             #ncfile = ddb.get_phbands_and_dos(ngqpt=(4,4,4))
             #print(ncfile)
 
+    def test_block_index_cache(self):
+        """Test the cache of the index of the blocks."""
+        workdir = tempfile.mkdtemp()
+        ddb_fname = os.path.join(workdir, "AlAs_1qpt_DDB")
+        shutil.copy(os.path.join(test_dir, "AlAs_1qpt_DDB"), ddb_fname)
+
+        with DdbFile(ddb_fname) as ddb:
+            ddb.write_block_index()
+            assert os.path.exists(ddb.block_index_path)
+
+        with DdbFile(ddb_fname) as ddb:
+            self.assertEqual(ddb._read_block_index(), ddb._scan_blocks())
+            self.assert_equal(ddb.qpoints, np.reshape([0.25, 0, 0], (-1,3)))
+
+        shutil.rmtree(workdir)
+
+    def test_merge_ddb_files(self):
+        """Test the merge of partial DDB files in pure python."""
+        workdir = tempfile.mkdtemp()
+        ref_path = os.path.join(os.path.dirname(abidata.ref_file("trf2_5.out_PHBST.nc")), "trf2_3.ddb.out")
+        ref = DdbFile(ref_path)
+        assert len(ref.blocks) == 8
+
+        # Partial files. The same elements are reported in different files.
+        paths = [os.path.join(workdir, "p%d_DDB" % i) for i in range(4)]
+        _write_partial_ddb(paths[0], ref, [(i, slice(0, 20)) for i in range(4)])
+        _write_partial_ddb(paths[1], ref, [(i, slice(10, None)) for i in range(4)] + [(4, slice(None))])
+        _write_partial_ddb(paths[2], ref, [(i, slice(None)) for i in range(4, 8)])
+        _write_partial_ddb(paths[3], ref, [(i, slice(0, 20)) for i in range(4)])
+
+        def check_merged(path):
+            with DdbFile(path) as ddb:
+                self.assertEqual([(b.nelem, b.qpts) for b in ddb.blocks], [(b.nelem, b.qpts) for b in ref.blocks])
+                self.assert_equal(ddb.qpoints, ref.qpoints)
+                for qpoint in ref.qpoints:
+                    self.assert_equal(ddb.get_dynmat(qpoint), ref.get_dynmat(qpoint))
+
+        merger = DdbMerger(paths)
+        self.assertEqual(len(merger), 8)
+        self.assertEqual(merger.add_file(paths[2]), 0)
+
+        out_ddb = os.path.join(workdir, "out_DDB")
+        merge_ddb_files(paths, out_ddb, description="Merged DDB")
+        check_merged(out_ddb)
+        with open(out_ddb, "rt") as fh:
+            assert "Merged DDB" in fh.read()
+
+        # Append new blocks in place.
+        out_ddb = os.path.join(workdir, "append_DDB")
+        merge_ddb_files(paths[:2], out_ddb)
+        with DdbFile(out_ddb) as ddb:
+            self.assertEqual(len(ddb.blocks), 5)
+        merge_ddb_files(paths[2:], out_ddb, append=True)
+        check_merged(out_ddb)
+        with DdbFile(out_ddb) as ddb:
+            # The index of the blocks has been updated.
+            self.assertEqual(ddb._read_block_index(), ddb._scan_blocks())
+
+        # Nothing is added if the elements are already present.
+        mtime = os.path.getmtime(out_ddb)
+        DdbMerger(paths[3:]).append(out_ddb)
+        self.assertEqual(os.path.getmtime(out_ddb), mtime)
+
+        # New elements in blocks already present require a rewrite of the file.
+        out_ddb = os.path.join(workdir, "rewrite_DDB")
+        merge_ddb_files(paths[:1], out_ddb)
+        merge_ddb_files(paths[1:], out_ddb, append=True)
+        check_merged(out_ddb)
+
+        # Files with different structures cannot be merged.
+        with open(paths[0], "rt") as fh:
+            text = fh.read().replace("0.25000000000000D+00  0.25000000000000D+00  0.25000000000000D+00",
+                                     "0.26000000000000D+00  0.25000000000000D+00  0.25000000000000D+00")
+        with open(paths[3], "wt") as fh:
+            fh.write(text)
+        with self.assertRaises(ValueError):
+            DdbMerger(paths)
+
+        ref.close()
+        shutil.rmtree(workdir)
+
+    def test_interpolate_phbands(self):
+        """Test the in-process interpolation of the force constants."""
+        phbst_fname = abidata.ref_file("trf2_5.out_PHBST.nc")
+        ddb_fname = os.path.join(os.path.dirname(phbst_fname), "trf2_3.ddb.out")
+        ref_phbands = PhononBands.from_file(phbst_fname)
+
+        with DdbFile(ddb_fname) as ddb:
+            self.assert_equal(ddb.guessed_ngqpt, [4, 4, 4])
+            ifc = ddb.get_ifc_interpolator()
+            assert ifc is ddb.get_ifc_interpolator(ngqpt=[4, 4, 4], asr=True)
+
+            # The interpolation is exact on the q-points of the DDB file.
+            h = ddb.header
+            gprimd = np.linalg.inv(np.reshape(h.acell, (3, 1)) * h.rprim).T
+            for qpoint, dynmat in zip(ddb.qpoints, ifc.get_dynmat(ddb.qpoints)):
+                ref_dynmat = np.einsum("ia,ikjl,jb->kalb", gprimd, ddb.get_dynmat(qpoint), gprimd)
+                self.assert_almost_equal(dynmat, ref_dynmat.reshape(6, 6), decimal=5)
+
+            # Compare with anaddb at X, L and W (anaddb used a different q-mesh and the dipole-dipole term).
+            qcoords = ref_phbands.qpoints.frac_coords
+            iqs = [i for i, q in enumerate(qcoords) if any(np.allclose(q, ref) for ref in
+                   ([0.5, 0.5, 1], [0.5, 0.5, 0.5], [0.5, 0.25, 0.75]))]
+            assert len(iqs) == 4
+            phbands = ddb.interpolate_phbands(qcoords[iqs])
+            self.assert_almost_equal(phbands.phfreqs, ref_phbands.phfreqs[iqs], decimal=5)
+            self.assert_equal(phbands.qpoints.frac_coords, qcoords[iqs])
+            assert phbands.phdispl_cart.shape == (4, 6, 6)
+            self.assert_almost_equal(np.linalg.norm(phbands.phdispl_cart, axis=-1),
+                                     np.linalg.norm(ref_phbands.phdispl_cart[iqs], axis=-1), decimal=5)
+
+            # Acoustic modes at Gamma.
+            freqs, displ = ifc.get_phmodes([[0, 0, 0], [1, 0, 0]])
+            assert np.all(np.abs(freqs[:, :3]) < 1e-6)
+            freqs, displ = ddb.get_ifc_interpolator(asr=False).get_phmodes([0, 0, 0])
+            assert np.any(np.abs(freqs[0, :3]) > 1e-6)
+
+            # The dynamical matrix is hermitian.
+            dynmat = ifc.get_dynmat(np.random.rand(10, 3))
+            self.assert_almost_equal(dynmat, np.conj(np.swapaxes(dynmat, -1, -2)))
+
+            # The q-mesh cannot be reconstructed.
+            with self.assertRaises(ValueError):
+                ddb.get_ifc_interpolator(ngqpt=[8, 8, 8])
+
 
 if __name__ == "__main__": 
     import unittest
@@ -2,9 +2,11 @@
 from __future__ import print_function, division
 
 import tempfile
+import numpy as np
 import abipy.data as abidata
 
-from abipy.dfpt.phonons import PhononBands
+from abipy.core.kpoints import KpointList
+from abipy.dfpt.phonons import PhononBands, PhdosReader
 from abipy.core.testing import *
 
 
@@ -28,6 +30,42 @@ class PhononBandsTest(AbipyTest):
         _, filename = tempfile.mkstemp(text=True)
         phbands.create_xyz_vib(iqpt=0, filename=filename, max_supercell=[4,4,4])
 
+    def test_phdos_and_projections(self):
+        """Test the phonon DOS, the projected DOS and the thermodynamic properties."""
+        path_phbands = PhononBands.from_file(abidata.ref_file("trf2_5.out_PHBST.nc"))
+        # The q-points of the path are used as a (fake) sampling of the BZ.
+        structure, nq = path_phbands.structure, path_phbands.num_qpoints
+        qpoints = KpointList(structure.reciprocal_lattice, path_phbands.qpoints.frac_coords, weights=np.ones(nq) / nq)
+        phbands = PhononBands(structure, qpoints, path_phbands.phfreqs, path_phbands.phdispl_cart)
+
+        phdos = phbands.get_phdos(step=1.e-4, width=4.e-4)
+        self.assert_almost_equal(phdos.dos.integral().values[-1], phbands.num_branches, decimal=1)
+        phdos_nsigma = phbands.get_phdos(step=1.e-4, width=4.e-4, nsigma=6)
+        self.assert_almost_equal(phdos_nsigma.dos.values / phdos.dos.values.max(),
+                                 phdos.dos.values / phdos.dos.values.max(), decimal=6)
+
+        # The weights of the atoms in each mode sum up to one.
+        self.assert_almost_equal(phbands.atom_weights.sum(axis=-1), 1.0)
+
+        pjdos_atom = phbands.get_pjdos_atom()
+        self.assertEqual(len(pjdos_atom), len(phbands.structure))
+        self.assert_almost_equal(sum(p.dos.values for p in pjdos_atom), phdos.dos.values)
+
+        pjdos_type = phbands.get_pjdos_type()
+        self.assertEqual(list(pjdos_type.keys()), ["Al", "As"])
+        self.assert_almost_equal(sum(p.dos.values for p in pjdos_type.values()), phdos.dos.values)
+
+        # Thermodynamic properties: the result does not depend on the size of the chunks.
+        with PhdosReader(abidata.ref_file("trf2_5.out_PHDOS.nc")) as r:
+            phdos = r.read_phdos()
+
+        thermo = phdos.harmonic_thermo(5, 800, num=200)
+        thermo_chunks = phdos.harmonic_thermo(5, 800, num=200, chunk_size=1000)
+        for name in ("de", "cv"):
+            assert thermo[name].values.shape == (200,)
+            self.assert_almost_equal(thermo[name].values, thermo_chunks[name].values)
+            assert np.all(np.isfinite(thermo[name].values))
+
 
 if __name__ == "__main__":
     import unittest
@@ -14,11 +14,14 @@ from collections import OrderedDict, namedtuple, Iterable
 from monty.collections import AttrDict
 from monty.functools import lazy_property
 from monty.bisect import find_le, find_gt
+from monty.string import is_string
 from pymatgen.util.plotting_utils import add_fig_kwargs
 from abipy.core.func1d import Function1D
-from abipy.core.kpoints import Kpoint, Kpath, IrredZone, KpointsReaderMixin, kmesh_from_mpdivs
+from abipy.core.kpoints import (Kpoint, Kpath, IrredZone, KpointsReaderMixin, kmesh_from_mpdivs,
+                                KSymmetryTable, map_mesh2ibz)
+from abipy.core.tetrahedron import LinearTetrahedron
 from abipy.iotools import ETSF_Reader, Visualizer, bxsf_write
-from abipy.tools import gaussian
+from abipy.tools import gaussians_sum
 from abipy.tools.animator import FilesAnimator
 
 import logging
@@ -218,6 +221,186 @@ class Smearing(AttrDict):
         return self.occopt in [3,4,5,6,7,8]
 
 
+# Occupation functions f(x) with x = (e - mu) / tsmear and f(-inf) = 1, f(+inf) = 0.
+# xmax is the value of |x| beyond which the function is equal to 0 or 1 in double precision.
+def _occ_gaussian(x):
+    from scipy.special import erfc
+    return 0.5 * erfc(x)
+
+
+def _occ_fermi_dirac(x):
+    # 1 / (1 + exp(x)) written in terms of tanh to avoid overflows.
+    return 0.5 * (1.0 - np.tanh(0.5 * x))
+
+
+def _occ_marzari_vanderbilt(x):
+    from scipy.special import erfc
+    u = x + 1.0 / np.sqrt(2)
+    return 0.5 * erfc(u) + np.exp(-u**2) / np.sqrt(2 * np.pi)
+
+
+def _occ_methfessel_paxton(x):
+    # First order Hermite expansion.
+    from scipy.special import erfc
+    return 0.5 * erfc(x) - x * np.exp(-x**2) / (2 * np.sqrt(np.pi))
+
+
+_OCC_FUNCTIONS = {
+    # scheme: (function, xmax)
+    "gaussian": (_occ_gaussian, 8.0),
+    "fermi-dirac": (_occ_fermi_dirac, 40.0),
+    "marzari-vanderbilt": (_occ_marzari_vanderbilt, 8.0),
+    "methfessel-paxton": (_occ_methfessel_paxton, 8.0),
+}
+
+# Abinit occopt --> smearing scheme.
+# Note that the cold smearing of Abinit (occopt 4 and 5) is approximated with Marzari-Vanderbilt.
+_OCCOPT2SCHEME = {
+    3: "fermi-dirac",
+    4: "marzari-vanderbilt",
+    5: "marzari-vanderbilt",
+    6: "methfessel-paxton",
+    7: "gaussian",
+}
+
+
+def _get_occfunc(scheme):
+    """
+    Return (function, xmax) for the given smearing scheme.
+    scheme can be a string, the value of occopt or a :class:`Smearing` object.
+    """
+    if isinstance(scheme, Smearing): scheme = scheme.occopt
+    if not is_string(scheme):
+        try:
+            scheme = _OCCOPT2SCHEME[int(scheme)]
+        except KeyError:
+            raise ValueError("occopt %s does not correspond to a smearing scheme" % scheme)
+
+    try:
+        return _OCC_FUNCTIONS[scheme.lower()]
+    except KeyError:
+        raise ValueError("Unknown smearing scheme %s. Choose among %s" % (scheme, list(_OCC_FUNCTIONS.keys())))
+
+
+def occupation_factors(eigens, fermie, tsmear, scheme="gaussian"):
+    """
+    Compute the occupation factors (between 0 and 1, spin degeneracy not included).
+
+    Args:
+        eigens: Array with the eigenvalues.
+        fermie: Fermi level (same units as eigens).
+        tsmear: Smearing width (same units as eigens).
+        scheme: Smearing scheme: "gaussian", "fermi-dirac", "marzari-vanderbilt", "methfessel-paxton".
+            The value of occopt or a :class:`Smearing` object are accepted as well.
+
+    Returns:
+        Array with the same shape as eigens.
+    """
+    occfunc, _ = _get_occfunc(scheme)
+    return occfunc((np.asarray(eigens) - fermie) / tsmear)
+
+
+def find_fermie(eigens, kweights, nelect, tsmear, scheme="gaussian", spin_factor=None, nbins=2**16):
+    """
+    Compute the Fermi level from the eigenvalues with smearing.
+
+    A weighted histogram of the eigenvalues gives the energy window where the Fermi level 
+    can be found. The states below the window are fully occupied, the ones above are empty.
+    The equation for the number of electrons is first solved on the histogram and the solution
+    is then refined with Brent's method using only the eigenvalues close to it.
+    This works for metals and insulators (the Fermi level is placed in the middle of the gap)
+    and the cost is dominated by a couple of passes over the full array of eigenvalues.
+
+    Args:
+        eigens: Array of shape [nsppol, nkpt, nband] or [nkpt, nband] with the eigenvalues.
+        kweights: Array of shape [nkpt] with the weights of the k-points (normalized to one).
+            An array with the same shape as eigens is accepted as well (e.g. with zero weights for
+            the bands that are not computed).
+        nelect: Number of electrons.
+        tsmear: Smearing width (same units as eigens).
+        scheme: Smearing scheme (see :func:`occupation_factors`).
+        spin_factor: Max occupation of a state. Defaults to 2 if eigens is [nkpt, nband] or nsppol == 1, else 1.
+            The Fermi level is common to the two spin channels.
+        nbins: Number of bins used for the histogram.
+
+    Returns:
+        The Fermi level.
+    """
+    from scipy.optimize import brentq
+    occfunc, xmax = _get_occfunc(scheme)
+    if tsmear <= 0:
+        raise ValueError("tsmear must be positive while it is %s" % tsmear)
+
+    eigens = np.asarray(eigens, dtype=np.float)
+    if spin_factor is None:
+        spin_factor = 2.0 if eigens.ndim == 2 or eigens.shape[0] == 1 else 1.0
+
+    # Weights of each state.
+    kweights = np.asarray(kweights, dtype=np.float)
+    if kweights.shape != eigens.shape:
+        full_weights = np.empty(eigens.shape)
+        full_weights[...] = kweights[:, np.newaxis]
+        kweights = full_weights
+    ene, wts = eigens.ravel(), kweights.ravel()
+
+    target = nelect / spin_factor
+    tol = 1.e-8 * max(1.0, target)
+    if target > wts.sum() + tol:
+        raise ValueError("Not enough bands to accomodate %s electrons" % nelect)
+
+    emin, emax = ene.min(), ene.max()
+    width = xmax * tsmear
+    if target >= wts.sum() - tol:
+        # All the bands are filled: N(mu) - nelect never changes sign.
+        # Return the smallest mu for which all the states are fully occupied.
+        return emax + width
+
+    # Cumulative number of states from the weighted histogram.
+    de = max(emax - emin, tsmear) / nbins
+    ibins = np.minimum(((ene - emin) / de).astype(np.int), nbins - 1)
+    hist = np.bincount(ibins, weights=wts, minlength=nbins)
+    cumsum = np.cumsum(hist)
+
+    # The states in the bins [ia, ib] are partially occupied at T = 0. 
+    # The Fermi level is in [lo, hi] and only the states in [lo - width, hi + width] must be considered.
+    ia = min(np.searchsorted(cumsum, target - tol), nbins - 1)
+    ib = min(np.searchsorted(cumsum, target + tol, side="right"), nbins - 1)
+    lo, hi = emin + ia * de - width, emin + (ib + 1) * de + width
+
+    def get_func(lo, hi, ene, wts):
+        """N(mu) - nelect computed with the states in [lo - width, hi + width] for mu in [lo, hi]."""
+        inside = (ene > lo - width) & (ene < hi + width)
+        nbelow = wts[ene <= lo - width].sum()
+        e_win, w_win = ene[inside], wts[inside]
+        return lambda mu: nbelow + np.dot(w_win, occfunc((e_win - mu) / tsmear)) - target
+
+    if ib > ia and abs(cumsum[ia] - target) < tol:
+        # Insulator: N(mu) is constant inside the gap hence mu is not unique. Use the middle of the gap.
+        vbm_bin, cbm_bin = ene[ibins == ia], ene[ibins == ib]
+        if vbm_bin.size and cbm_bin.size:
+            mid = 0.5 * (vbm_bin.max() + cbm_bin.min())
+            if abs(get_func(mid, mid, ene, wts)(mid)) < tol: return mid
+
+    # Solve the equation with the centers of the bins, the error is of the order of the bin width.
+    centers = emin + (np.arange(nbins) + 0.5) * de
+    hfunc = get_func(lo, hi, centers, hist)
+    if hfunc(lo) > 0 or hfunc(hi) < 0:
+        # Should not happen, but Methfessel-Paxton and Marzari-Vanderbilt give negative occupations.
+        lo, hi = emin - width, emax + width
+        hfunc = get_func(lo, hi, centers, hist)
+    mu = brentq(hfunc, lo, hi, xtol=0.01 * de)
+
+    # Refine the solution with the eigenvalues in a small interval around mu.
+    delta = de
+    while True:
+        a, b = max(mu - delta, lo), min(mu + delta, hi)
+        func = get_func(a, b, ene, wts)
+        if func(a) <= 0 <= func(b) or (a == lo and b == hi): break
+        delta *= 8
+
+    return brentq(func, a, b, xtol=1.e-12 * max(1.0, abs(a), abs(b)))
+
+
 class StatParams(namedtuple("StatParams", "mean stdev min max")):
     """Named tuple with statistical parameters."""
     def __str__(self):
@@ -664,22 +847,17 @@ class ElectronBands(object):
         #if self.use_metallic_scheme or self.from_scfrun: return
     
         # FXME This won't work if ferromagnetic semi-conductor.
-        try:
-            occfact = 2 if self.nsppol == 1 else 1
-            esb_levels = []
-            for k in self.kidxs:
-                esb_view = self.eigens[:,k,:].T.ravel()
-                for i, esb in enumerate(esb_view):
-                    if (i+1) * occfact == self.nelect:
-                        esb_levels.append(esb)
-                        break
-                else:
-                    raise ValueError("Not enough bands to compute the position of the Fermi level!")
+        occfact = 2 if self.nsppol == 1 else 1
+        nocc = self.nelect / occfact
 
-        except ValueError:
+        # Eigenvalues at each k-point with the spin index running fastest: [nkpt, mband * nsppol]
+        esb_levels = np.asarray(self.eigens).transpose(1, 2, 0).reshape(self.nkpt, -1)
+        if nocc != int(nocc) or not 1 <= nocc <= esb_levels.shape[1]:
+            # Not enough bands to compute the position of the Fermi level!
             return
+        esb_levels = esb_levels[:, int(nocc) - 1]
 
-        new_fermie = max(esb_levels)
+        new_fermie = esb_levels.max()
         if abs(new_fermie - self.fermie) > 0.2:
             print("old_fermie %s, new fermie %s" % (self.fermie, new_fermie))
 
@@ -692,6 +870,62 @@ class ElectronBands(object):
         #self._eigens = self._eigens - new_fermie 
         #self.fermie = 0.0
 
+    def _get_smearing_params(self, tsmear, scheme):
+        """Return (tsmear, scheme) using the values stored in self.smearing if the arguments are None."""
+        if tsmear is None:
+            if not self.smearing or not self.smearing.has_metallic_scheme:
+                raise ValueError("tsmear must be specified when the bands are not computed with a metallic scheme")
+            tsmear = float(self.smearing.tsmear_ev)
+
+        if scheme is None:
+            if not self.smearing or self.smearing.occopt not in _OCCOPT2SCHEME:
+                raise ValueError("Cannot detect the smearing scheme from self.smearing, use scheme")
+            scheme = self.smearing.occopt
+
+        return tsmear, scheme
+
+    def find_fermie(self, tsmear=None, scheme=None, nelect=None):
+        """
+        Compute the Fermi level from the eigenvalues and the weights of the k-points.
+        Valid for metals and insulators. The Fermi level is common to the two spin channels.
+
+        Args:
+            tsmear: Smearing width in eV. If None, the value stored in self.smearing is used.
+            scheme: Smearing scheme ("gaussian", "fermi-dirac", "marzari-vanderbilt", "methfessel-paxton")
+                or occopt. If None, the scheme is taken from self.smearing.
+            nelect: Number of electrons. Defaults to self.nelect
+
+        Returns:
+            Fermi level in eV.
+        """
+        self._check_kweights()
+        tsmear, scheme = self._get_smearing_params(tsmear, scheme)
+        nelect = self.nelect if nelect is None else nelect
+
+        # Bands that are not computed have zero weight.
+        nband_sk = np.reshape(self.nband_sk, (self.nsppol, self.nkpt))
+        weights = self.kpoints.weights[:, np.newaxis] * (np.arange(self.mband) < nband_sk[..., np.newaxis])
+
+        return find_fermie(np.asarray(self.eigens), weights, nelect, tsmear, scheme=scheme,
+                           spin_factor=2.0 if self.nsppol == 1 else 1.0)
+
+    def get_occupations(self, tsmear=None, scheme=None, nelect=None):
+        """
+        Compute the Fermi level and the occupation factors with the given smearing.
+        Arguments have the same meaning as in find_fermie.
+
+        Returns:
+            (fermie, occfacts) where occfacts has shape [nsppol, nkpt, mband] and includes
+            the spin degeneracy (as self.occfacts).
+        """
+        tsmear, scheme = self._get_smearing_params(tsmear, scheme)
+        fermie = self.find_fermie(tsmear=tsmear, scheme=scheme, nelect=nelect)
+
+        spin_factor = 2.0 if self.nsppol == 1 else 1.0
+        occfacts = spin_factor * occupation_factors(np.asarray(self.eigens), fermie, tsmear, scheme=scheme)
+
+        return fermie, occfacts
+
     @property
     def lomos(self):
         """lomo states for each spin channel as a list of nsppol :class:`Electron`."""
@@ -894,25 +1128,49 @@ class ElectronBands(object):
                           max=ediff.max(axis=axis)
                           )
 
-    def get_edos(self, method="gaussian", step=0.1, width=0.2):
+    def _check_kweights(self):
+        """Raise ValueError if the k-point weights do not represent a homogeneous sampling of the BZ."""
+        wsum = self.kpoints.sum_weights()
+        if abs(wsum - 1) > 1.e-6:
+            err_msg =  "Kpoint weights should sum up to one while sum_weights is %.3f\n" % wsum
+            err_msg += "The list of kpoints does not represent a homogeneous sampling of the BZ\n" 
+            err_msg += str(type(self.kpoints)) + "\n" + str(self.kpoints)
+            raise ValueError(err_msg)
+
+    @lazy_property
+    def _tetra_bzmap(self):
+        """
+        Tuple (tetra, bz2ibz) where tetra is the :class:`LinearTetrahedron` object associated
+        to the k-mesh and bz2ibz gives the index of the IBZ point associated to each point of the mesh.
+        """
+        if not self.has_bzmesh or self.kpoints.mpdivs is None:
+            raise ValueError("The tetrahedron method requires a homogeneous k-mesh with mpdivs")
+        if self.kpoints.num_shifts != 1:
+            raise ValueError("The tetrahedron method does not support k-meshes with multiple shifts")
+
+        bz2ibz = map_mesh2ibz(self.structure, self.kpoints.mpdivs, self.kpoints.shifts, self.kpoints.frac_coords)
+        if np.any(bz2ibz == -1):
+            raise ValueError("Cannot reconstruct the full k-mesh from the IBZ. %d points are missing" %
+                             np.count_nonzero(bz2ibz == -1))
+
+        tetra = LinearTetrahedron(self.reciprocal_lattice, self.kpoints.mpdivs)
+        return tetra, bz2ibz
+
+    def get_edos(self, method="gaussian", step=0.1, width=0.2, nsigma=None):
         """
         Compute the electronic DOS on a linear mesh.
 
         Args:
-            method: String defining the method
+            method: String defining the method: "gaussian" or "tetra" (linear tetrahedron method).
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
+            nsigma: If not None, the gaussians are truncated at nsigma * width (faster for dense k-meshes).
 
         Returns:
             :class:`ElectronDOS` object.
         """
         # Weights must be normalized to one.
-        wsum = self.kpoints.sum_weights()
-        if abs(wsum - 1) > 1.e-6:
-            err_msg = "Kpoint weights should sum up to one while sum_weights is %.3f\n" % wsum
-            err_msg += "The list of kpoints does not represent a homogeneous sampling of the BZ\n" 
-            err_msg += str(type(self.kpoints)) + "\n" + str(self.kpoints)
-            raise ValueError(err_msg)
+        self._check_kweights()
 
         # Compute the linear mesh.
         e_min = self.enemin()
@@ -927,20 +1185,42 @@ class ElectronBands(object):
         dos = np.zeros((self.nsppol, nw))
 
         if method == "gaussian":
+            eigens, kweights = np.asarray(self.eigens), self.kpoints.weights
+            for spin in self.spins:
+                # Select the bands treated at each k-point: mask[k, band]
+                mask = np.arange(self.mband) < self.nband_sk[spin][:, np.newaxis]
+                weights = (kweights[:, np.newaxis] * np.ones(self.mband))[mask]
+                dos[spin] = gaussians_sum(mesh, eigens[spin][mask], width, weights=weights, nsigma=nsigma)
+
+        elif method == "tetra":
+            tetra, bz2ibz = self._tetra_bzmap
+            eigens = np.asarray(self.eigens)
             for spin in self.spins:
-                for (k, kpoint) in enumerate(self.kpoints):
-                    weight = kpoint.weight
-                    for band in range(self.nband_sk[spin,k]):
-                        e = self.eigens[spin,k,band]
-                        dos[spin] += weight * gaussian(mesh, width, center=e)
+                # Only the bands computed at all the k-points can be used.
+                nband = self.nband_sk[spin].min()
+                dos[spin] = tetra.get_dos(mesh, eigens[spin][bz2ibz, :nband].T)
 
         else:
             raise ValueError("Method %s is not supported" % method)
 
         return ElectronDOS(mesh, dos)
 
+    def _ejdos_mesh(self, spin, valence, conduction, step):
+        """Linear mesh enclosing the transition energies from valence to conduction."""
+        eigens = np.asarray(self.eigens)
+        ev, ec = eigens[spin][:, valence], eigens[spin][:, conduction]
+
+        e_min = ec.min() - ev.max()
+        e_min -= 0.1 * abs(e_min)
+
+        e_max = ec.max() - ev.min()
+        e_max += 0.1 * abs(e_max)
+
+        nw = int(1 + (e_max - e_min) / step)
+        return np.linspace(e_min, e_max, num=nw, endpoint=True)
+
     def get_ejdos(self, spin, valence, conduction,
-                  method="gaussian", step=0.1, width=0.2, mesh=None):
+                  method="gaussian", step=0.1, width=0.2, mesh=None, nsigma=None):
         """
         Compute the join density of states at q==0
             :math:`\sum_{kbv} f_{vk} (1 - f_{ck}) \delta(\omega - E_{ck} - E_{vk})`
@@ -949,67 +1229,75 @@ class ElectronBands(object):
             spin: Spin index.
             valence: Int or iterable with the valence indices.
             conduction: Int or iterable with the conduction indices.
-            method: String defining the method.
+            method: String defining the method: "gaussian" or "tetra" (linear tetrahedron method).
             step: Energy step (eV) of the linear mesh.
             width: Standard deviation (eV) of the gaussian.
             mesh: Frequency mesh to use. If None, the mesh is computed automatically from the eigenvalues.
+            nsigma: If not None, the gaussians are truncated at nsigma * width.
 
         Returns:
             :class:`Function1D` object.
         """
-        wsum = self.kpoints.sum_weights()
-        if abs(wsum - 1) > 1.e-6:
-            err_msg =  "Kpoint weights should sum up to one while sum_weights is %.3f\n" % wsum
-            err_msg += "The list of kpoints does not represent a homogeneous sampling of the BZ\n" 
-            err_msg += str(type(self.kpoints)) + "\n" + str(self.kpoints)
-            raise ValueError(err_msg)
+        jdos_vc = self.get_ejdos_vc(spin, valence, conduction, method=method, step=step,
+                                    width=width, mesh=mesh, nsigma=nsigma)
+
+        mesh = list(jdos_vc.values())[0].mesh
+        return Function1D(mesh, np.sum([jdos.values for jdos in jdos_vc.values()], axis=0))
+
+    def get_ejdos_vc(self, spin, valence, conduction,
+                     method="gaussian", step=0.1, width=0.2, mesh=None, nsigma=None):
+        """
+        Compute the contributions to the joint density of states at q==0 
+        for all the (valence, conduction) pairs with a single call.
+        Arguments have the same meaning as in get_ejdos.
+
+        Returns:
+            `OrderedDict` mapping the tuple (v, c) to the :class:`Function1D` with the JDOS 
+            associated to this pair. All the functions are defined on the same mesh.
+        """
+        self._check_kweights()
 
         if not isinstance(valence, Iterable): valence = [valence]
         if not isinstance(conduction, Iterable): conduction = [conduction]
+        valence, conduction = list(valence), list(conduction)
 
         if mesh is None:
-            # Compute the linear mesh.
-            cmin, cmax = +np.inf, -np.inf
-            vmin, vmax = +np.inf, -np.inf
-            for c in conduction:
-                cmin = min(cmin, self.eigens[spin,:,c].min())
-                cmax = max(cmax, self.eigens[spin,:,c].max())
-            for v in valence:
-                vmin = min(vmin, self.eigens[spin,:,v].min())
-                vmax = max(vmax, self.eigens[spin,:,v].max())
-
-            e_min = cmin - vmax
-            e_min -= 0.1 * abs(e_min)
-
-            e_max = cmax - vmin
-            e_max += 0.1 * abs(e_max)
-
-            nw = int(1 + (e_max - e_min) / step)
-            mesh, step = np.linspace(e_min, e_max, num=nw, endpoint=True, retstep=True)
-        else:
-            nw = len(mesh)
-
-        jdos = np.zeros(nw)
+            mesh = self._ejdos_mesh(spin, valence, conduction, step)
 
         # Normalize the occupation factors.
         full = 2.0 if self.nsppol == 1 else 1.0
+        eigens, kweights = np.asarray(self.eigens), self.kpoints.weights
 
         if method == "gaussian":
-            for (k, kpoint) in enumerate(self.kpoints):
-                weight = kpoint.weight
-                for c in conduction:
-                    ec = self.eigens[spin,k,c]
-                    fc = 1 - self.occfacts[spin,k,c] / full
-                    for v in valence:
-                        ev = self.eigens[spin,k,v]
-                        fv = self.occfacts[spin,k,v] / full
-                        fact = weight * fv * fc
-                        jdos += fact * gaussian(mesh, width, center=ec-ev)
+            # Arrays of shape [nkpt, nv] and [nkpt, nc]
+            ev, ec = eigens[spin][:, valence], eigens[spin][:, conduction]
+            fv = self.occfacts[spin][:, valence] / full
+            fc = 1 - self.occfacts[spin][:, conduction] / full
+
+            jdos_vc = OrderedDict()
+            for iv, v in enumerate(valence):
+                for ic, c in enumerate(conduction):
+                    weights = kweights * fv[:, iv] * fc[:, ic]
+                    values = gaussians_sum(mesh, ec[:, ic] - ev[:, iv], width, weights=weights, nsigma=nsigma)
+                    jdos_vc[(v, c)] = Function1D(mesh, values)
+
+        elif method == "tetra":
+            # Transition energies and occupation factors in the full BZ.
+            tetra, bz2ibz = self._tetra_bzmap
+            ev, ec = eigens[spin][bz2ibz][:, valence], eigens[spin][bz2ibz][:, conduction]
+            fv = self.occfacts[spin][bz2ibz][:, valence] / full
+            fc = 1 - self.occfacts[spin][bz2ibz][:, conduction] / full
+
+            jdos_vc = OrderedDict()
+            for iv, v in enumerate(valence):
+                for ic, c in enumerate(conduction):
+                    values = tetra.get_dos(mesh, ec[:, ic] - ev[:, iv], weights_bz=fv[:, iv] * fc[:, ic])
+                    jdos_vc[(v, c)] = Function1D(mesh, values)
 
         else:
             raise ValueError("Method %s is not supported" % method)
 
-        return Function1D(mesh, jdos)
+        return jdos_vc
 
     @add_fig_kwargs
     def plot_ejdosvc(self, vrange, crange, method="gaussian", step=0.1, width=0.2, cumulative=True, **kwargs):
@@ -1036,14 +1324,10 @@ class ElectronBands(object):
         for s in self.spins:
             ax = fig.add_subplot(1, self.nsppol, s+1)
 
-            # Get total JDOS
-            tot_jdos = self.get_ejdos(s, vrange, crange, method=method, step=step, width=width)
-
-            jdos_vc = OrderedDict()
-            for v in vrange:
-                for c in crange:
-                    jd = self.get_ejdos(s, v, c, method=method, step=step, width=width, mesh=tot_jdos.mesh)
-                    jdos_vc[(v, c)] = jd
+            # Get the (v, c) contributions and the total JDOS
+            jdos_vc = self.get_ejdos_vc(s, vrange, crange, method=method, step=step, width=width)
+            mesh = list(jdos_vc.values())[0].mesh
+            tot_jdos = Function1D(mesh, np.sum([jd.values for jd in jdos_vc.values()], axis=0))
 
             # Plot data for this spin.
             if cumulative:
@@ -1089,18 +1373,14 @@ class ElectronBands(object):
         qp_energies = np.zeros(self.shape)
 
         # Calculate Quasi-particle energies with the scissors operator.
-        for spin in self.spins:
-            sciss = scissors[spin]
-            for k in self.kidxs:
-                for band in range(self.nband_sk[spin,k]):
-                    e0 = self.eigens[spin,k,band]
-                    try:
-                        qp_ene = e0 + sciss.apply(e0)
-                    except sciss.Error:
-                        raise
+        # Only the bands treated at each (spin, kpoint) are corrected.
+        eigens = np.asarray(self.eigens)
+        nband_sk = np.reshape(self.nband_sk, (self.nsppol, self.nkpt))
+        bmask = np.arange(self.mband) < nband_sk[..., np.newaxis]
 
-                    # Update the energy.
-                    qp_energies[spin,k,band] = qp_ene
+        for spin in self.spins:
+            e0 = eigens[spin][bmask[spin]]
+            qp_energies[spin][bmask[spin]] = e0 + scissors[spin].apply(e0)
 
         # Change the energies (NB: occupations and fermie are left unchanged).
         return ElectronBands(
@@ -1911,11 +2191,11 @@ class EBands3D(object):
         self.bz_arr = kmesh_from_mpdivs(self.ndivs, shifts, pbc=pbc, order=order)
 
         # Compute the mapping bz --> ibz
-        from abipy.extensions.klib import map_bz2ibz
-        self.bz2ibz = map_bz2ibz(structure, self.bz_arr, self.ibz_arr)
-
-        #for ik_bz, ik_ibz in enumerate(self.bz2ibz):
-        #   print(ik_bz, ">>>", ik_ibz)
+        spacegroup = getattr(structure, "spacegroup", None)
+        ktab = KSymmetryTable(spacegroup.fm_symmops if spacegroup is not None else None,
+                              self.ndivs, self.shifts, self.ibz_arr)
+        inds = ktab.mesh_indices(self.bz_arr)
+        self.bz2ibz = np.where(inds != -1, ktab.bz2ibz[inds], -1)
 
         if np.any(self.bz2ibz == -1):
             raise ValueError("-1 found")
@@ -1939,28 +2219,15 @@ class EBands3D(object):
         """
         Returns a `ndarray` with shape [nsppol, nband, len_bz] with the eigevanalues in the full zone.
         """
-        emesh_sbk = np.empty((self.nsppol, self.nband, self.len_bz))
-
-        for spin in self.spins:
-            for band in self.bands:
-                emesh_sbk[spin,band,:] = self.get_emesh_k(spin, band)
-
-        return emesh_sbk
+        # e_{Sk} = e_{k}
+        return self.ene_ibz[:, self.bz2ibz, :].transpose(0, 2, 1).copy()
 
     def get_emesh_k(self, spin, band):
         """
         Return a `ndarray` with shape [len_bz] with the energies in the full zone for given spin and band.
         """
-        emesh_k = np.empty(self.len_bz)
-
-        ene_ibz = self.ene_ibz[spin,:,band]
         # e_{Sk} = e_{k}
-        for ik_bz in range(self.len_bz):
-           ik_ibz = self.bz2ibz[ik_bz]
-           #print(ik_bz, ">>>", ik_ibz)
-           emesh_k[ik_bz] = self.ene_ibz[spin,ik_ibz,band]
-
-        return emesh_k
+        return self.ene_ibz[spin, self.bz2ibz, band]
 
     #def plane_cut(self, values_ibz):
     #    """
@@ -2023,24 +2290,26 @@ class ElectronDOS(object):
             return self.spin_dos[spin], self.spin_idos[spin]
 
     def find_mu(self, nelect, spin=None, num=500, atol=1.e-5):
-        """Finds the chemical potential given the number of electrons."""
+        """
+        Finds the chemical potential given the number of electrons.
+        num is not used anymore and it is kept for backward compatibility.
+        """
+        from scipy.optimize import brentq
         idos = self.tot_idos if spin is None else self.spin_idos[spin]
 
-        # Cannot use bisection because DOS might be negative due to smearing.
-        # This one is safer albeit slower.
-        for i, (ene, intg) in enumerate(idos):
-            if intg > nelect:
-                break
-        else:
+        # Cannot use bisection on the full mesh because DOS might be negative due to smearing.
+        # Select the first point where I(e) > nelect.
+        above = idos.values > nelect
+        if not above.any():
             raise ValueError("Cannot find I(e) such that I(e) > nelect")
+        i = max(int(np.argmax(above)), 1)
 
-        # Now use spline to get a more accurate mu (useful if mesh is coarse)
+        # Now use the spline to get a more accurate mu (useful if mesh is coarse)
         e0, e1 = idos.mesh[i-1], idos.mesh[i]
         idos_spline = idos.spline
-        for mu in np.linspace(e0, e1, num=num):
-            if abs(idos_spline(mu) - nelect) < atol:
-                return mu
-        else:
+        try:
+            return brentq(lambda mu: idos_spline(mu) - nelect, e0, e1, xtol=0.1 * atol)
+        except ValueError:
             raise RuntimeError("Cannot find mu, try to increase num and/or atol")
 
     def plot_ax(self, ax, spin=None, what="d", exchange_xy=False, *args, **kwargs):
@@ -17,8 +17,7 @@ from six.moves import cStringIO
 from abipy.core.func1d import Function1D
 from abipy.core.kpoints import Kpoint, KpointList
 from abipy.core.mixins import AbinitNcFile, Has_Structure, Has_ElectronBands
-from abipy.iotools import ETSF_Reader
-from abipy.electrons.ebands import ElectronBands
+from abipy.electrons.ebands import ElectronBands, ElectronsReader
 from abipy.electrons.scissors import Scissors
 
 import logging
@@ -184,6 +183,15 @@ class QPList(list):
 
     def get_field(self, field):
         """`ndarray` containing the values of field."""
+        if field == "qpeme0":
+            return self.get_field("qpe") - self.get_field("e0")
+
+        if field in QPState._fields:
+            # Index the namedtuples directly to avoid the attribute lookup.
+            idx = QPState._fields.index(field)
+            return np.array([qp[idx] for qp in self])
+
+        # Properties of QPState e.g. skb.
         return np.array([getattr(qp, field) for qp in self])
 
     def get_value(self, skb_tup, field):
@@ -308,7 +316,7 @@ class QPList(list):
             scissors = qplist_spin[0].build_scissors(domains)
 
             # Compute list of interpolated QP energies.
-            qp_enes = [scissors.apply(e0) for e0 in ks_energies]
+            qp_enes = ks_energies + scissors.apply(ks_energies)
         """
         # Sort QP corrections according to the initial KS energy.
         qps = self.sort_by_e0()
@@ -360,7 +368,7 @@ class QPList(list):
             for dom in domains[:]:
                 plt.plot(2*[dom[0]], [min(qpcorrs), max(qpcorrs)])
                 plt.plot(2*[dom[1]], [min(qpcorrs), max(qpcorrs)])
-            intp_qpc = [sciss.apply(e0) for e0 in e0mesh]
+            intp_qpc = sciss.apply(e0mesh)
             plt.plot(e0mesh, intp_qpc, label="scissor")
             plt.legend(bbox_to_anchor=(0.9, 0.2))
             plt.show()
@@ -831,7 +839,7 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
         # Keep a reference to the SigresReader.
         self.reader = reader = SigresReader(self.filepath)
 
-        self._structure = reader.read_structure()
+        self._structure = reader.structure
         self.gwcalctyp = reader.gwcalctyp
         self.ibz = reader.ibz
         self.gwkpoints = reader.gwkpoints
@@ -847,24 +855,13 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
 
         self._ebands = ebands = reader.ks_bands
 
-        qplist_spin = self.qplist_spin
-
         # Add QPState markers to the KS band structure.
         # Each marker is a list of tuple(x,y,value)
+        # The columns of the QP table are already aligned so no loop over the states is needed.
+        table = self.qp_table
         for qpattr in QPState.get_fields(exclude=("spin", "band", "kpoint",)):
-            x, y, s = [], [], []
-
-            for spin in range(self.nsppol):
-                for qp in qplist_spin[spin]:
-                    ik = self.ebands.kpoints.index(qp.kpoint)
-                    x.append(ik)
-                    y.append(qp.e0)
-                    size = getattr(qp, qpattr)
-                    # Handle complex quantities
-                    if np.iscomplex(size): size = size.real
-                    s.append(size)
-
-            ebands.set_marker(qpattr, (x, y, s))
+            # Handle complex quantities
+            ebands.set_marker(qpattr, (table.ikibz.tolist(), table.e0.tolist(), table[qpattr].real.tolist()))
 
         # TODO handle the case in which nkptgw < nkibz
         self.qpgaps = reader.read_qpgaps()
@@ -894,6 +891,14 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
         """Tuple of :class:`QPList` objects indexed by spin."""
         return self.reader.read_allqps()
 
+    @property
+    def qp_table(self):
+        """
+        :class:`AttrDict` with the QP results stored in aligned arrays (one entry per state).
+        See :meth:`SigresReader.read_qp_table`.
+        """
+        return self.reader.qp_table
+
     def get_qplist(self, spin, kpoint):
         qplist = self.reader.read_qplist_sk(spin, kpoint)
         return qplist
@@ -983,22 +988,40 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
         fig = self.ebands.plot(marker=with_marker, band_range=gwband_range, **kwargs)
         return fig
 
+    def get_dataframe(self, index=None):
+        """
+        Returns pandas DataFrame with the QP results for all the states computed in the run.
+        The columns are the :class:`QPState` fields followed by the parameters of the calculation.
+
+        Args:
+            index: Label used for the rows. If None, the rows are labelled with the band index.
+        """
+        return self._get_dataframe(np.ones(len(self.qp_table.band), dtype=np.bool), index=index)
+
     def get_dataframe_sk(self, spin, kpoint, index=None):
-        """Returns pandas DataFrame"""
-        rows, bands = [], []
-        # FIXME start and stop should depend on k
-        for band in range(self.min_gwbstart, self.max_gwbstop):
-            bands.append(band)
-            # Build dictionary with the QP results.
-            qpstate = self.reader.read_qp(spin, kpoint, band)
-            d = qpstate.as_dict()
-            # Add other entries that may be useful when comparing different calculations.
-            d.update(self.params)
-            rows.append(d)
+        """Returns pandas DataFrame with the QP results for the given spin and k-point."""
+        table = self.qp_table
+        ik = self.reader.gwkpt2seqindex(kpoint)
+        return self._get_dataframe((table.spin == spin) & (table.ikgw == ik), index=index)
+
+    def _get_dataframe(self, mask, index=None):
+        """Build the DataFrame from the rows of the QP table selected by the boolean array mask."""
+        table = self.qp_table
+        columns = OrderedDict()
+        for field in QPState.get_fields():
+            if field == "kpoint":
+                columns[field] = [self.gwkpoints[ik] for ik in table.ikgw[mask]]
+            else:
+                columns[field] = table[field][mask]
+
+        # Add other entries that may be useful when comparing different calculations.
+        nrows = np.count_nonzero(mask)
+        for pname, pvalue in self.params.items():
+            columns[pname] = nrows * [pvalue]
 
         import pandas as pd
-        index = len(bands) * [index] if index is not None else bands
-        return pd.DataFrame(rows, index=index, columns=rows[0].keys())
+        index = nrows * [index] if index is not None else table.band[mask]
+        return pd.DataFrame(columns, index=index, columns=list(columns.keys()))
 
     #def plot_matrix_elements(self, mel_name, spin, kpoint, *args, **kwargs):
     #   matrix = self.reader.read_mel(mel_name, spin, kpoint):
@@ -1009,7 +1032,7 @@ class SigresFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
     #    return plot_matrix(matrix, *args, **kwargs)
 
 
-class SigresReader(ETSF_Reader):
+class SigresReader(ElectronsReader):
     """This object provides method to read data from the SIGRES file produced ABINIT.
     # See 70gw/m_sigma_results.F90
 
@@ -1158,11 +1181,12 @@ class SigresReader(ETSF_Reader):
     ! Frequencies used to evaluate the Derivative of Sigma.
     """
     def __init__(self, path):
-        self.ks_bands = ElectronBands.from_file(path)
-        self.nsppol = self.ks_bands.nsppol
-
         super(SigresReader, self).__init__(path)
 
+        # The KS bands are read from the same file handle.
+        self.ks_bands = self.read_ebands()
+        self.nsppol = self.ks_bands.nsppol
+
         try:
             self.nomega_r = self.read_dimvalue("nomega_r")
         except self.Error:
@@ -1171,7 +1195,7 @@ class SigresReader(ETSF_Reader):
         #self.nomega_i = self.read_dim("nomega_i")
 
         # Save important quantities needed to simplify the API.
-        self.structure = self.read_structure()
+        self.structure = self.ks_bands.structure
 
         self.gwcalctyp = self.read_value("gwcalctyp")
         self.usepawu = self.read_value("usepawu")
@@ -1203,8 +1227,6 @@ class SigresReader(ETSF_Reader):
         self._vxcme = self.read_value("vxcme")
         self._sigxme = self.read_value("sigxme")
 
-        self._hhartree = self.read_value("hhartree", cmode="c")
-
         self._vUme = self.read_value("vUme")
         #if self.usepawu == 0: self._vUme.fill(0.0)
 
@@ -1216,17 +1238,44 @@ class SigresReader(ETSF_Reader):
         if self.has_spfunc:
             self._omega_r = self.read_value("omega_r")
 
-            self._sigcme = self.read_value("sigcme", cmode="c")
-            self._sigxcme = self.read_value("sigxcme", cmode="c")
-
         # Self-consistent case
         self._en_qp_diago = self.read_value("en_qp_diago")
 
-        # <KS|QPState>
-        self._eigvec_qp = self.read_value("eigvec_qp", cmode="c")
+        # The arrays depending on nomega_r or on nbnds**2 (sigcme, sigxcme, hhartree, eigvec_qp)
+        # are read on first access. The methods returning the data for a single (s, k, b) read
+        # the hyperslab from file unless the full array has been already loaded.
 
         #self._mlda_to_qp
 
+    @lazy_property
+    def _hhartree(self):
+        return self.read_value("hhartree", cmode="c")
+
+    @lazy_property
+    def _sigcme(self):
+        return self.read_value("sigcme", cmode="c")
+
+    @lazy_property
+    def _sigxcme(self):
+        return self.read_value("sigxcme", cmode="c")
+
+    @lazy_property
+    def _eigvec_qp(self):
+        """<KS|QPState>"""
+        return self.read_value("eigvec_qp", cmode="c")
+
+    def _read_cslab(self, varname, index):
+        """
+        Return the hyperslab index of the complex variable varname.
+        Use the array in memory if already loaded else read the slab from file.
+        """
+        try:
+            return self.__dict__["_" + varname][index]
+        except KeyError:
+            # Real and imaginary part are stored in the last dimension.
+            slab = np.asarray(self.read_variable(varname)[index + (slice(None),)])
+            return slab[..., 0] + 1j * slab[..., 1]
+
     #def is_selfconsistent(self, mode):
     #    return self.gwcalctyp
 
@@ -1269,17 +1318,73 @@ class SigresReader(ETSF_Reader):
     def read_redc_gwkpoints(self):
         return self.read_value("kptgw")
 
+    @lazy_property
+    def gwk2ibz(self):
+        """
+        ndarray with the index of the GW k-points in the IBZ (i.e. the index used in the netcdf arrays).
+        """
+        return np.array([self.kpt2fileindex(kpoint) for kpoint in self.gwkpoints], dtype=np.int)
+
+    @lazy_property
+    def qp_table(self):
+        """Cached version of :meth:`read_qp_table`."""
+        return self.read_qp_table()
+
+    def read_qp_table(self):
+        """
+        Read the QP results of all the (spin, kpoint, band) states at once.
+
+        Returns:
+            :class:`AttrDict` of aligned arrays with one entry per state.
+            The states are ordered by spin, GW k-point and band as in :meth:`read_allqps`.
+            Besides the :class:`QPState` fields (with the exception of kpoint), the dict contains:
+
+                - ikgw: index of the k-point in `gwkpoints`.
+                - ikibz: index of the k-point in the IBZ.
+        """
+        # Number of bands computed for each (spin, kpoint) and offset of the first state.
+        start, stop = self.gwbstart_sk, self.gwbstop_sk
+        counts = (stop - start).ravel()
+        offsets = np.cumsum(counts) - counts
+
+        spin, ikgw = np.meshgrid(range(self.nsppol), range(len(self.gwkpoints)), indexing="ij")
+        spin, ikgw = np.repeat(spin.ravel(), counts), np.repeat(ikgw.ravel(), counts)
+
+        # Position of the band in the (spin, kpoint) block.
+        ib = np.arange(counts.sum()) - np.repeat(offsets, counts)
+        band = np.repeat(start.ravel(), counts) + ib
+        ikibz = self.gwk2ibz[ikgw]
+
+        table = AttrDict(
+            spin=spin,
+            ikgw=ikgw,
+            ikibz=ikibz,
+            band=band,
+            e0=self.ks_bands.eigens[spin, ikibz, band],
+            qpe=self._egw[spin, ikibz, band],
+            qpe_diago=self._en_qp_diago[spin, ikibz, band],
+            vxcme=self._vxcme[spin, ikibz, ib],
+            sigxme=self._sigxme[spin, ikibz, ib],
+            sigcmee0=self._sigcmee0[spin, ikibz, ib],
+            vUme=self._vUme[spin, ikibz, ib],
+            ze0=self._ze0[spin, ikibz, ib],
+        )
+        table["qpeme0"] = table.qpe - table.e0
+
+        return table
+
     def read_allqps(self):
-        qps_spin = self.nsppol * [None]
+        """Tuple of :class:`QPList` objects indexed by spin. Built from :meth:`read_qp_table`."""
+        table = self.qp_table
+        fields = [f for f in QPState._fields if f not in ("spin", "kpoint")]
+        gwkpoints = [self.gwkpoints[ik] for ik in range(len(self.gwkpoints))]
 
+        qps_spin = self.nsppol * [None]
         for spin in range(self.nsppol):
-            qps = []
-            for gwkpoint in self.gwkpoints:
-                ik = self.gwkpt2seqindex(gwkpoint)
-                bands = range(self.gwbstart_sk[spin,ik], self.gwbstop_sk[spin,ik])
-                for band in bands:
-                    qps.append(self.read_qp(spin, gwkpoint, band))
-
+            mask = table.spin == spin
+            # Integer columns are converted to python ints, the other entries are numpy scalars as in read_qp.
+            columns = [table.band[mask].tolist()] + [table[f][mask] for f in fields[1:]]
+            qps = [QPState(spin, gwkpoints[ik], *values) for ik, values in zip(table.ikgw[mask].tolist(), zip(*columns))]
             qps_spin[spin] = QPList(qps)
 
         return tuple(qps_spin)
@@ -1327,7 +1432,7 @@ class SigresReader(ETSF_Reader):
 
         ik = self.kpt2fileindex(kpoint)
 
-        return self._omega_r, self._sigxcme[spin,:,ik,band]
+        return self._omega_r, self._read_cslab("sigxcme", (spin, slice(None), ik, band))
 
     def read_spfunc(self, spin, kpoint, band):
         """
@@ -1343,12 +1448,12 @@ class SigresReader(ETSF_Reader):
         ik = self.kpt2fileindex(kpoint)
         ib = band - self.gwbstart_sk[spin, self.gwkpt2seqindex(kpoint)]
 
-        aim_sigc = np.abs(self._sigcme[spin,:,ik,ib].imag)
+        sigcme = self._read_cslab("sigcme", (spin, slice(None), ik, ib))
+        sigxcme = self._read_cslab("sigxcme", (spin, slice(None), ik, ib))
+        hhartree = self._read_cslab("hhartree", (spin, ik, ib, ib))
 
-        den = np.zeros(self.nomega_r)
-        for (io, omega) in enumerate(self._omega_r):
-            den[io] = (omega - self._hhartree[spin,ik,ib,ib].real - self._sigxcme[spin,io,ik,ib].real) ** 2 + \
-                self._sigcme[spin,io,ik,ib].imag ** 2
+        aim_sigc = np.abs(sigcme.imag)
+        den = (self._omega_r - hhartree.real - sigxcme.real) ** 2 + sigcme.imag ** 2
 
         return self._omega_r, 1./np.pi * (aim_sigc/den)
 
@@ -1358,9 +1463,9 @@ class SigresReader(ETSF_Reader):
         """
         ik = self.kpt2fileindex(kpoint)
         if band is not None:
-            return self._eigvec_qp[spin,ik,:,band]
+            return self._read_cslab("eigvec_qp", (spin, ik, slice(None), band))
         else:
-            return self._eigvec_qp[spin,ik,:,:]
+            return self._read_cslab("eigvec_qp", (spin, ik, slice(None), slice(None)))
 
     def read_params(self):
         """
@@ -64,23 +64,24 @@ class Scissors(object):
         if bounds is not None:
             blow, bhigh = bounds[0][0], bounds[0][1]
 
+        # NB: the constant is computed here so that errors in bounds are caught by the try block.
         if blow.lower() == "c":
             try:
-                self.func_low = lambda x: float(bounds[0][1])
+                fx_low = float(bounds[0][1])
             except:
                 x_low = self.domains[0,0]
-                fx_low = func_list[0](x_low)
-                self.func_low = lambda x: fx_low
+                fx_low = float(func_list[0](x_low))
+            self.func_low = lambda x: fx_low
         else:
             raise NotImplementedError("Only constant boundaries are implemented")
 
         if bhigh.lower() == "c":
             try:
-                self.func_high = lambda x: float(bounds[1][1])
+                fx_high = float(bounds[1][1])
             except:
-                x_high = self.domains[1, -1]
-                fx_high = func_list[-1](x_high)
-                self.func_high = lambda x: fx_high
+                x_high = self.domains[-1, -1]
+                fx_high = float(func_list[-1](x_high))
+            self.func_high = lambda x: fx_high
         else:
             raise NotImplementedError("Only constant boundaries are implemented")
 
@@ -88,32 +89,58 @@ class Scissors(object):
         self.out_bounds = np.zeros(3, np.int)
 
     def apply(self, eig):
-        """Correct the eigenvalue eig (eV units)."""
+        """
+        Correct the eigenvalues (eV units).
+
+        Args:
+            eig: Scalar or array-like object with the eigenvalues.
+
+        Returns:
+            The corrections to be added to eig. A scalar if eig is a scalar else
+            an array with the same shape as eig.
+
+        Raises:
+            `ScissorsError` if one of the eigenvalues falls inside a hole of the domains.
+        """
+        eigs = np.asarray(eig, dtype=np.float)
+        flat = eigs.ravel()
+        corr = np.empty(flat.shape)
+
         # Get the list of domains.
         domains = self.domains
 
-        if eig < domains[0,0]:
-            # Eig is below the first point of the first domain.
-            # Call func_low
-            print("left ", eig, " < ", domains[0,0])
-            self.out_bounds[0] += 1
-            return self.func_low(eig)
+        # Points below the first point of the first domain are treated with func_low,
+        # points above the last point of the last domain with func_high.
+        low = flat < domains[0,0]
+        high = flat > domains[-1,1]
+        inside = ~(low | high)
+        self.out_bounds[0] += np.count_nonzero(low)
+        self.out_bounds[1] += np.count_nonzero(high)
+
+        if low.any(): corr[low] = self.func_low(flat[low])
+        if high.any(): corr[high] = self.func_high(flat[high])
+
+        # Find the first domain whose upper bound is >= eig (so that points on the
+        # boundary between two domains are assigned to the first one). The point is inside
+        # a hole if the lower bound of this domain is > eig.
+        idx = np.searchsorted(domains[:,1], flat, side="left")
+        idx[~inside] = 0
+        hole = inside & (domains[idx,0] > flat)
+
+        if hole.any():
+            self.out_bounds[2] += np.count_nonzero(hole)
+            raise self.Error("Cannot find location of eigenvalues %s in domains:\n%s" % (flat[hole], domains))
 
-        if eig > domains[-1,1]:
-            # Eig is above the last point of the last domain.
-            # Call func_high
-            print("right ", eig, " > ", domains[-1,1])
-            self.out_bounds[1] += 1
-            return self.func_high(eig)
+        # Call the function of each domain once with all its points.
+        for i, func in enumerate(self.func_list):
+            mask = inside & (idx == i)
+            if mask.any():
+                corr[mask] = func(flat[mask])
 
-        # eig is inside the domains: find the domain 
-        # and call the corresponding function.
-        for idx, dms in enumerate(domains):
-            if dms[1] >= eig >= dms[0]:
-                return self.func_list[idx](eig)
+        if eigs.ndim == 0:
+            return corr[0]
 
-        self.out_bounds[2] += 1
-        raise self.Error("Cannot find location of eigenvalue %s in domains:\n%s" % (eig, domains))
+        return corr.reshape(eigs.shape)
 
 
 class ScissorsBuilder(object):
@@ -284,7 +311,7 @@ class ScissorsBuilder(object):
 
             plt.plot(e0mesh, qpcorrs, label="Input QP corrections, spin %s" % spin)
             scissors = self._scissors_spin[spin]
-            intp_qpc = [scissors.apply(e0) for e0 in e0mesh]
+            intp_qpc = scissors.apply(e0mesh)
             plt.plot(e0mesh, intp_qpc, label="Scissors operator, spin %s" % spin)
 
         plt.legend(loc="best")
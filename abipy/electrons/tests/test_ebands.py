@@ -1,10 +1,11 @@
 """Tests for electrons.ebands module"""
 from __future__ import print_function, division
 
+import numpy as np
 import abipy.data as data
 
 from abipy.core.kpoints import KpointList
-from abipy.electrons.ebands import ElectronsReader, ElectronBands
+from abipy.electrons.ebands import ElectronsReader, ElectronBands, find_fermie, occupation_factors
 from abipy.core.testing import *
 
 
@@ -51,6 +52,76 @@ class ElectronBandsTest(AbipyTest):
 
         self.serialize_with_pickle(dos, protocols=[-1], test_eq=False)
 
+        # Truncated gaussians.
+        same_dos = gs_bands.get_edos(nsigma=10)
+        self.assert_almost_equal(same_dos.tot_dos.values, dos.tot_dos.values)
+
+        # Linear tetrahedron method.
+        tetra_dos = gs_bands.get_edos(method="tetra")
+        mu = tetra_dos.find_mu(8, atol=1.e-4)
+        imu = tetra_dos.tot_idos.find_mesh_index(mu)
+        self.assert_almost_equal(tetra_dos.tot_idos[imu][1], 8, decimal=1)
+
+    def test_occupations(self):
+        """Test the Fermi level and the occupations computed with smearing."""
+        gs_bands = ElectronBands.from_file(data.ref_file("si_scf_GSR.nc"))
+
+        # Insulator: the Fermi level is in the middle of the gap.
+        homo, lumo = max(h.eig for h in gs_bands.homos), min(l.eig for l in gs_bands.lumos)
+        fermie, occfacts = gs_bands.get_occupations(tsmear=0.01, scheme="gaussian")
+        self.assert_almost_equal(fermie, 0.5 * (homo + lumo))
+        self.assert_almost_equal(occfacts, gs_bands.occfacts)
+
+        # Metallic occupations with less electrons and all the schemes.
+        kweights = gs_bands.kpoints.weights
+        for scheme in ("gaussian", "fermi-dirac", "marzari-vanderbilt", "methfessel-paxton", 3, 4, 6, 7):
+            fermie, occfacts = gs_bands.get_occupations(tsmear=0.2, scheme=scheme, nelect=7.5)
+            self.assertTrue(homo - 2 < fermie < homo + 0.5)
+            self.assert_almost_equal(np.sum(kweights[:, np.newaxis] * occfacts), 7.5)
+
+        # Fully occupied insulator: nelect equals the number of states.
+        nelect = 2 * gs_bands.mband
+        fermie, occfacts = gs_bands.get_occupations(tsmear=0.01, scheme="gaussian", nelect=nelect)
+        self.assertTrue(fermie > gs_bands.enemax())
+        self.assert_almost_equal(occfacts, 2 * np.ones(occfacts.shape))
+
+        with self.assertRaises(ValueError):
+            gs_bands.get_occupations(tsmear=0.2, scheme="foo")
+
+    def test_find_fermie(self):
+        """Test the Fermi level solver with random eigenvalues."""
+        from scipy.optimize import brentq
+        nsppol, nkpt, nband = 2, 20, 8
+        eigens = np.sort(np.random.normal(size=(nsppol, nkpt, nband)), axis=-1)
+        kweights = np.random.random(nkpt)
+        kweights /= kweights.sum()
+        nelect, tsmear = 7.3, 0.1
+
+        for scheme in ("gaussian", "fermi-dirac", "marzari-vanderbilt", "methfessel-paxton"):
+            fermie = find_fermie(eigens, kweights, nelect, tsmear, scheme=scheme)
+            occ = occupation_factors(eigens, fermie, tsmear, scheme=scheme)
+            self.assert_almost_equal(np.sum(kweights[:, np.newaxis] * occ), nelect)
+
+            # Compare with a simple bisection on the full set of eigenvalues.
+            func = lambda mu: np.sum(kweights[:, np.newaxis] * occupation_factors(eigens, mu, tsmear, scheme)) - nelect
+            self.assert_almost_equal(fermie, brentq(func, -10, 10, xtol=1e-14))
+
+        # Spin-unpolarized case with a weight for each eigenvalue.
+        weights = kweights[:, np.newaxis] * np.ones(nband)
+        fermie = find_fermie(eigens[0], weights, 2 * nelect, tsmear)
+        self.assert_almost_equal(fermie, find_fermie(eigens[:1], kweights, 2 * nelect, tsmear))
+
+        # All the bands are filled (distinct and degenerate eigenvalues).
+        for eigs in (eigens, np.ones(eigens.shape)):
+            for scheme in ("gaussian", "fermi-dirac", "marzari-vanderbilt", "methfessel-paxton"):
+                fermie = find_fermie(eigs, kweights, nsppol * nband, tsmear, scheme=scheme)
+                self.assertTrue(fermie > eigs.max())
+                occ = occupation_factors(eigs, fermie, tsmear, scheme=scheme)
+                self.assert_almost_equal(occ, np.ones(eigs.shape))
+
+        with self.assertRaises(ValueError):
+            find_fermie(eigens, kweights, 2 * nsppol * nband + 1, tsmear)
+
     def test_jdos(self):
         """Test JDOS methods."""
         bands = ElectronBands.from_file(data.ref_file("si_scf_GSR.nc"))
@@ -65,6 +136,15 @@ class ElectronBandsTest(AbipyTest):
 
         self.serialize_with_pickle(jdos, protocols=[-1])
 
+        # All the (v, c) contributions with a single call.
+        jdos_vc = bands.get_ejdos_vc(spin, valence, conduction)
+        self.assertEqual(list(jdos_vc.keys()), [(v, 4) for v in valence])
+        self.assert_almost_equal(sum(jd.values for jd in jdos_vc.values()), jdos.values)
+
+        # Linear tetrahedron method.
+        tetra_jdos = bands.get_ejdos(spin, valence, conduction, method="tetra")
+        self.assert_almost_equal(tetra_jdos.integral()[-1][-1], len(conduction) * len(valence), decimal=2)
+
         nscf_bands = ElectronBands.from_file(data.ref_file("si_nscf_GSR.nc"))
 
         # Test the detection of denerate states.
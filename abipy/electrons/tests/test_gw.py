@@ -56,6 +56,26 @@ class TestQPList(AbipyTest):
         self.assertAlmostEqual(qp.qpe.imag, -0.011501666037697)
         self.assertAlmostEqual(qp.sigxme, -16.549383605401)
 
+    def test_scissors(self):
+        """Test the application of the scissors operator to arrays."""
+        qplist = self.sigres.qplist_spin[0]
+        e0mesh = qplist.sort_by_e0().get_e0mesh()
+        emid = 0.5 * (e0mesh[0] + e0mesh[-1])
+        sciss = qplist.build_scissors([[e0mesh[0], emid], [emid, e0mesh[-1]]], k=1)
+
+        # Array and scalar versions must agree, including out-of-bounds values.
+        enes = np.linspace(e0mesh[0] - 2, e0mesh[-1] + 2, num=50).reshape(5, 10)
+        corrs = sciss.apply(enes)
+        self.assertEqual(corrs.shape, enes.shape)
+        self.assert_almost_equal(corrs.ravel(), [sciss.apply(e) for e in enes.ravel()])
+        self.assertEqual(corrs[0, 0], corrs[0, 1])
+        self.assertEqual(corrs[-1, -1], corrs[-1, -2])
+
+        # Eigenvalues falling inside a hole raise.
+        sciss = qplist.build_scissors([[e0mesh[0], emid - 0.1], [emid + 0.1, e0mesh[-1]]], k=1)
+        with self.assertRaises(sciss.Error):
+            sciss.apply([e0mesh[0], emid])
+
 
 class TestSigresFile(AbipyTest):
 
@@ -92,6 +112,59 @@ class TestSigresFile(AbipyTest):
 
         self.assert_almost_equal(sigres.qpgaps, np.reshape(qpgaps, (1,6)))
 
+    def test_qp_table(self):
+        """Test the columnar access to the QP results."""
+        sigres = abiopen(data.ref_file("tgw1_9o_DS4_SIGRES.nc"))
+        table = sigres.qp_table
+
+        # The table is aligned with the list of QPState objects.
+        qplist = sigres.qplist_spin[0]
+        self.assertEqual(len(table.band), len(qplist))
+        for qp, ik, band in zip(qplist, table.ikgw, table.band):
+            self.assertEqual(qp.kpoint, sigres.gwkpoints[ik])
+            self.assertEqual(qp.band, band)
+            self.assertEqual(qp, sigres.get_qpcorr(qp.spin, qp.kpoint, qp.band))
+
+        for field in QPState.get_fields(exclude=("spin", "kpoint")):
+            self.assert_equal(qplist.get_field(field), table[field])
+
+        self.assert_almost_equal(table.qpeme0, table.qpe - table.e0)
+
+        # Properties of QPState are accessible as well.
+        self.assertEqual(len(qplist.get_field("skb")), len(qplist))
+
+        # DataFrame for a single k-point
+        kpoint = sigres.gwkpoints[1]
+        frame = sigres.get_dataframe_sk(0, kpoint)
+        self.assertEqual(len(frame), len(sigres.get_qplist(0, kpoint)))
+        self.assertTrue(all(k == kpoint for k in frame["kpoint"]))
+        self.assert_almost_equal(frame["qpeme0"].values, sigres.get_qplist(0, kpoint).get_qpeme0())
+        self.assertEqual(len(sigres.get_dataframe(index="foo")), len(qplist))
+
+    def test_lazy_spfunc(self):
+        """Test the lazy loading of the arrays used for the spectral function."""
+        sigres = abiopen(data.ref_file("al_g0w0_sigmaw_SIGRES.nc"))
+        reader = sigres.reader
+        self.assertTrue(reader.has_spfunc)
+
+        # The large arrays are not loaded when the file is opened.
+        for aname in ("_sigcme", "_sigxcme", "_hhartree", "_eigvec_qp"):
+            self.assertFalse(aname in reader.__dict__)
+
+        spin, kpoint = 0, sigres.gwkpoints[0]
+        band = sigres.gwbstart_sk[spin, 0]
+        wmesh, spf_slab = reader.read_spfunc(spin, kpoint, band)
+        wmesh, sigxc_slab = reader.read_sigmaw(spin, kpoint, band)
+        eigvec_slab = reader.read_eigvec_qp(spin, kpoint)
+        self.assertFalse("_sigcme" in reader.__dict__)
+        self.assertEqual(len(spf_slab), reader.nomega_r)
+
+        # Hyperslabs and full arrays must give the same results.
+        ik = reader.kpt2fileindex(kpoint)
+        self.assert_almost_equal(sigxc_slab, reader._sigxcme[spin, :, ik, band])
+        self.assert_almost_equal(eigvec_slab, reader._eigvec_qp[spin, ik])
+        self.assert_almost_equal(reader.read_spfunc(spin, kpoint, band)[1], spf_slab)
+
 
 if __name__ == "__main__":
     import unittest
@@ -11,6 +11,7 @@ import warnings
 import tempfile
 import itertools
 import copy
+import numbers
 import six
 import abc
 import numpy as np
@@ -25,6 +26,8 @@ from pymatgen.io.abinitio.tasks import TaskManager, AbinitTask
 from pymatgen.io.abinitio.netcdf import NetcdfReader
 from abipy.core.structure import Structure
 from abipy.core.mixins import Has_Structure
+from abipy.core.symmetries import SpaceGroup
+from abipy.core.kpoints import KpointHashTable, ibz_from_mpdivs
 from abipy.htc.variable import InputVariable
 from abipy.htc.abivars import is_abivar, is_anaddb_var
 
@@ -40,6 +43,11 @@ __all__ = [
     "AnaddbInput",
 ]
 
+# Cache used by AbiInput.get_ibz with the native method.
+# key: (lattice, rotations, ngkpt, shiftk), value: (points, weights)
+_NATIVE_IBZ_CACHE = {}
+_NATIVE_IBZ_CACHE_MAXSIZE = 4096
+
 # Variables that must have a unique value throughout all the datasets.
 _ABINIT_NO_MULTI = [
     "jdtset",
@@ -239,7 +247,7 @@ class AbiInput(Input, Has_Structure):
             # We don't want to specify ndtset here since abinit will start to add DS# to 
             # the input and output files thus complicating the algorithms we have to use
             # to locate the files.
-            d = self[0].deepcopy()
+            d = self[0]._cow_copy(dt0=None)
             d.update(self[1])
             s = d.to_string(post="")
 
@@ -249,6 +257,11 @@ class AbiInput(Input, Has_Structure):
         return self._datasets[key]
 
     def __getattr__(self, varname):
+        # Private attributes are never Abinit variables. This check avoids infinite recursion
+        # when _datasets is not defined yet (e.g. deepcopy and pickle look for __deepcopy__, __setstate__).
+        if varname.startswith("_"):
+            raise AttributeError("%s object has no attribute %s" % (self.__class__.__name__, varname))
+
         try:
             return super(AbiInput, self).__geattr__(self, varname)
         except AttributeError:
@@ -337,6 +350,25 @@ class AbiInput(Input, Has_Structure):
         new.set_vars(*args, **kwargs)
         return new
 
+    def _cow_copy(self, rendered=None):
+        """
+        Copy-on-write copy of the input. The datasets of the new input store only the variables
+        that are set or removed, the other variables and the pseudos are shared with self.
+        self must not be changed while the copy is alive (see `input_gen`).
+
+        Args:
+            rendered: Optional list with one dictionary per dataset used to cache
+                the string representation of the shared variables.
+        """
+        if rendered is None: rendered = len(self._datasets) * [None]
+
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+
+        dt0 = self[0]._cow_copy(dt0=None, rendered=rendered[0])
+        new._datasets = [dt0] + [dt._cow_copy(dt0=dt0, rendered=r) for dt, r in zip(self[1:], rendered[1:])]
+        return new
+
     def generate(self, **kwargs):
         """
         Generate new inputs by replacing the variables specified in kwargs.
@@ -459,7 +491,7 @@ class AbiInput(Input, Has_Structure):
     #    assert format in ["angdeg", "rprim"]
     #    self._geoformat = format
 
-    def get_ibz(self, ngkpt=None, shiftk=None, kptopt=None, qpoint=None, workdir=None, manager=None):
+    def get_ibz(self, ngkpt=None, shiftk=None, kptopt=None, qpoint=None, workdir=None, manager=None, method="native"):
         """
         This function, computes the list of points in the IBZ and the corresponding weights.
         It should be called with an input file that contains all the mandatory variables required by ABINIT.
@@ -470,6 +502,8 @@ class AbiInput(Input, Has_Structure):
             qpoint: qpoint in reduced coordinates. Used to shift the k-mesh (default None i.e no shift)
             workdir: Working directory of the fake task used to compute the ibz. Use None for temporary dir.
             manager: TaskManager of the task. If None, the :class:`TaskManager` is initialized from the config file.
+            method: "native" to compute the IBZ in-process with the symmetries of the structure,
+                "abinit" to run ABINIT, "check" to use both methods and compare the results.
 
         Returns:
             `namedtuple` with attributes:
@@ -479,7 +513,86 @@ class AbiInput(Input, Has_Structure):
         .. warning::
 
             Multiple datasets are ignored. Only the list of k-points for dataset 1 are returned.
-        """
+            The native method supports only meshes specified with ngkpt and kptopt in [1, 2, 3, 4].
+        """
+        if method == "native":
+            return self._get_native_ibz(ngkpt=ngkpt, shiftk=shiftk, kptopt=kptopt, qpoint=qpoint)
+
+        elif method == "abinit":
+            return self._get_abinit_ibz(ngkpt=ngkpt, shiftk=shiftk, kptopt=kptopt, qpoint=qpoint,
+                                        workdir=workdir, manager=manager)
+
+        elif method == "check":
+            ibz = self._get_native_ibz(ngkpt=ngkpt, shiftk=shiftk, kptopt=kptopt, qpoint=qpoint)
+            ref = self._get_abinit_ibz(ngkpt=ngkpt, shiftk=shiftk, kptopt=kptopt, qpoint=qpoint,
+                                       workdir=workdir, manager=manager)
+
+            # The two sets must contain the same points, possibly in a different order.
+            table = KpointHashTable(ibz.points, umklapp=True)
+            inds = [table.find(k) for k in ref.points]
+            if len(ibz.points) != len(ref.points) or -1 in inds or not np.allclose(ibz.weights[inds], ref.weights):
+                raise self.Error("Native IBZ differs from the one computed by ABINIT:\nnative: %s\nabinit: %s" %
+                                 (str(ibz), str(ref)))
+            return ref
+
+        raise ValueError("Wrong value for method: %s" % method)
+
+    def _get_native_ibz(self, ngkpt=None, shiftk=None, kptopt=None, qpoint=None):
+        """Compute the IBZ with the symmetries of the structure. See get_ibz."""
+        dtvars = self[1].allvars
+        if ngkpt is None: ngkpt = dtvars.get("ngkpt", None)
+        if ngkpt is None:
+            raise self.Error("ngkpt must be specified to compute the IBZ with the native method")
+        # ABINIT defaults.
+        if shiftk is None: shiftk = dtvars.get("shiftk", [0.5, 0.5, 0.5])
+        if kptopt is None: kptopt = dtvars.get("kptopt", 1)
+        if kptopt not in (1, 2, 3, 4):
+            raise self.Error("kptopt %s is not supported by the native method" % kptopt)
+
+        ngkpt = np.array(ngkpt, dtype=np.int).ravel()
+        shiftk = np.reshape(shiftk, (-1, 3))
+
+        structure = self.structure
+        if "symrel" in dtvars:
+            nsym = dtvars.get("nsym", len(np.reshape(dtvars["symrel"], (-1, 9))))
+            spacegroup = SpaceGroup(spgid=0, symrel=np.reshape(dtvars["symrel"], (nsym, 3, 3)),
+                                    tnons=np.reshape(dtvars.get("tnons", np.zeros(3 * nsym)), (nsym, 3)),
+                                    symafm=dtvars.get("symafm", nsym * [1]), has_timerev=True, inord="F")
+        elif dtvars.get("nsym", 0) == 1:
+            spacegroup = SpaceGroup(spgid=0, symrel=[np.eye(3, dtype=np.int)], tnons=[[0, 0, 0]],
+                                    symafm=[1], has_timerev=True)
+        else:
+            spacegroup = SpaceGroup.from_structure(structure, has_timerev=True)
+
+        # Select the operations according to kptopt (4 --> no time-reversal, 2 --> only time-reversal).
+        ops = spacegroup.afm_sign == 1
+        if kptopt == 4: ops &= spacegroup.time_sign == 1
+        if kptopt in (2, 3): ops &= np.all(spacegroup.rot_r == np.eye(3, dtype=np.int), axis=(1, 2))
+        if kptopt == 3: ops &= spacegroup.time_sign == 1
+
+        if qpoint is not None:
+            # k+q mesh: only the operations of the little group of q are compatible with the mesh.
+            qpoint = np.reshape(qpoint, (3,))
+            ops &= spacegroup.little_group_mask(qpoint)
+            shiftk = shiftk + qpoint * ngkpt
+            shiftk -= np.rint(shiftk)
+
+        krots = spacegroup.rot_g[ops] * spacegroup.time_sign[ops, np.newaxis, np.newaxis]
+
+        key = (tuple(np.round(structure.lattice.matrix, 8).ravel()), tuple(krots.ravel()),
+               tuple(ngkpt), tuple(np.round(shiftk, 8).ravel()))
+
+        try:
+            points, weights = _NATIVE_IBZ_CACHE[key]
+        except KeyError:
+            if len(_NATIVE_IBZ_CACHE) >= _NATIVE_IBZ_CACHE_MAXSIZE: _NATIVE_IBZ_CACHE.clear()
+            points, weights = _NATIVE_IBZ_CACHE[key] = ibz_from_mpdivs(ngkpt, shiftk, krots=krots)
+
+        ibz = collections.namedtuple("ibz", "points weights")
+        return ibz(points=points.copy(), weights=weights.copy())
+
+    def _get_abinit_ibz(self, ngkpt=None, shiftk=None, kptopt=None, qpoint=None, workdir=None, manager=None):
+        """Compute the IBZ by running ABINIT. See get_ibz."""
         #assert self.ndtset == 1
         # Avoid modifications in self.
         inp = self.split_datasets()[0].deepcopy()
@@ -578,17 +691,13 @@ class AbiInput(Input, Has_Structure):
         if len(varnames) != len(values):
             raise self.Error("The number of variables must equal the number of lists")
 
-        varnames = [ [varnames[i]] * len(values[i]) for i in range(len(values))]
-        varnames = itertools.product(*varnames)
-        values = itertools.product(*values)
+        # Check the number of configurations before changing the datasets.
+        nconf = int(np.prod([len(v) for v in values]))
+        if nconf != self.ndtset:
+            raise self.Error("The number of configurations must equal ndtset while %d != %d" % (nconf, self.ndtset))
 
-        idt = 0
-        for names, values in zip(varnames, values):
-            idt += 1
-            self[idt].set_vars(**{k: v for k, v in zip(names, values)})
-        
-        if idt != self.ndtset:
-            raise self.Error("The number of configurations must equal ndtset while %d != %d" % (idt, self.ndtset))
+        for idt, prod_values in enumerate(itertools.product(*values)):
+            self[idt+1].set_vars(**dict(zip(varnames, prod_values)))
 
     def set_structure(self, structure, dtset=0):
         """Set the :class:`Structure` object for the specified dtset."""
@@ -654,6 +763,114 @@ class AbiInput(Input, Has_Structure):
             self[idt].set_kptgw(kptgw, bdgw)
 
 
+class _OverlayVars(collections.MutableMapping):
+    """
+    Copy-on-write mapping used to store the variables of the inputs generated by `input_gen`.
+    Read operations fall back to the base mapping that is shared by all the copies and never
+    modified while the variables that are set or removed are stored in the overlay.
+    Mutable values of the base (lists, arrays) are copied to the overlay when they are accessed
+    so that in-place modifications do not propagate to the base and to the other copies.
+    The order of the keys is the one of an `OrderedDict` to which the same operations are applied.
+    """
+    def __init__(self, base, rendered=None):
+        """
+        Args:
+            base: Mapping with the shared variables.
+            rendered: Optional dictionary used to cache the string representation
+                of the variables of base (shared by all the copies of base).
+        """
+        self._base = base
+        self._rendered = rendered
+        self._over = OrderedDict()
+        self._removed = set()
+
+    def __getitem__(self, key):
+        value = self._peek(key)
+        if key in self._over or _is_immutable(value):
+            return value
+
+        # Copy-on-read: the caller may modify the object in place.
+        value = self._over[key] = copy.deepcopy(value)
+        return value
+
+    def _peek(self, key):
+        """Value of key. Shared objects are returned without copying them and must not be modified."""
+        if key in self._over:
+            return self._over[key]
+        if key in self._removed:
+            raise KeyError(key)
+        if isinstance(self._base, _OverlayVars):
+            return self._base._peek(key)
+        return self._base[key]
+
+    def __setitem__(self, key, value):
+        # Keys that are removed and set again are moved to the end as in OrderedDict.
+        self._over[key] = value
+
+    def __delitem__(self, key):
+        found = key in self._over
+        if found: del self._over[key]
+
+        if key in self._base and key not in self._removed:
+            self._removed.add(key)
+            found = True
+
+        if not found: raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._over or (key in self._base and key not in self._removed)
+
+    def __iter__(self):
+        for key in self._base:
+            if key not in self._removed: yield key
+
+        for key in self._over:
+            if key not in self._base or key in self._removed: yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __deepcopy__(self, memo):
+        # The base is never modified hence it can be shared.
+        new = self.__class__(self._base, rendered=self._rendered)
+        new._over = copy.deepcopy(self._over, memo)
+        new._removed = set(self._removed)
+        return new
+
+    def copy(self):
+        """Shallow copy (`OrderedDict`)."""
+        return OrderedDict(self.items())
+
+    def to_string(self, key, varname):
+        """
+        String representation of the variable key with name varname.
+        The strings of the shared variables are computed once and cached.
+        """
+        if key in self._over:
+            return str(InputVariable(varname, self._over[key]))
+
+        if isinstance(self._base, _OverlayVars):
+            return self._base.to_string(key, varname)
+
+        if self._rendered is None:
+            return str(InputVariable(varname, self._base[key]))
+
+        try:
+            return self._rendered[varname]
+        except KeyError:
+            line = self._rendered[varname] = str(InputVariable(varname, self._base[key]))
+            return line
+
+
+def _is_immutable(value):
+    """True if value cannot be modified in place."""
+    if value is None or isinstance(value, (six.string_types, numbers.Number, np.generic)):
+        return True
+    if isinstance(value, tuple):
+        return all(_is_immutable(v) for v in value)
+    return False
+
+
 class Dataset(mixins.MappingMixin, Has_Structure):
     """
     This object stores the ABINIT variables for a single dataset.
@@ -704,6 +921,20 @@ class Dataset(mixins.MappingMixin, Has_Structure):
         """Deepcopy of the `Dataset`"""
         return copy.deepcopy(self)
 
+    def _cow_copy(self, dt0, rendered=None):
+        """
+        Copy-on-write copy of the `Dataset` whose variables are stored in a :class:`_OverlayVars`.
+
+        Args:
+            dt0: Dataset with the global variables of the new dataset.
+            rendered: Optional dictionary used to cache the string representation of the shared variables.
+        """
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._mapping_mixin_ = _OverlayVars(self.vars, rendered=rendered)
+        new._dt0 = dt0
+        return new
+
     #@property
     #def geoformat(self):
     #    """
@@ -753,8 +984,11 @@ class Dataset(mixins.MappingMixin, Has_Structure):
         else:
             raise ValueError("Unsupported value for sortmode %s" % str(sortmode))
 
+        overlay = self.vars if isinstance(self.vars, _OverlayVars) else None
+
         for var in keys:
-            value = self[var]
+            # Don't copy the variables shared with the template.
+            value = self[var] if overlay is None else overlay._peek(var)
             # Do not print NO_MULTI variables except for dataset 0.
             if self.index != 0 and var in _ABINIT_NO_MULTI:
                 continue
@@ -766,8 +1000,12 @@ class Dataset(mixins.MappingMixin, Has_Structure):
                 continue
 
             varname = var + post
-            variable = InputVariable(varname, value)
-            app(str(variable))
+            if overlay is not None:
+                # Reuse the strings of the variables shared with the template.
+                app(overlay.to_string(var, varname))
+            else:
+                variable = InputVariable(varname, value)
+                app(str(variable))
 
         return "\n".join(lines)
 
@@ -1111,9 +1349,21 @@ def input_gen(inp, **kwargs):
         # To generate four input files with all the possible combinations of ecut and nsppol:
         for inp_ecut in input_gen(gs_inp, ecut=[10, 20], nsppol=[1, 2]):
             print("do something with inp_ecut %s" % inp_ecut)
+
+    .. note::
+
+        The new inputs share the pseudos and the variables that are not changed
+        with a private copy of inp. Lists and arrays are copied when they are accessed
+        so the inputs can be modified independently as if they were deep copies of inp.
     """
-    for new_vars in product_dict(kwargs):
-        new_inp = inp.deepcopy()
+    # The new inputs are copy-on-write copies of a private deep copy of inp so that they share
+    # the pseudos and the variables that are not changed, and the strings of the shared variables
+    # are computed only once.
+    template = inp.deepcopy()
+    rendered = [{} for dt in template]
+
+    for new_vars in iproduct_dict(kwargs):
+        new_inp = template._cow_copy(rendered=rendered)
         # Remove the variable names to avoid annoying warnings.
         # if the variable is overwritten.
         new_inp.remove_vars(new_vars.keys())
@@ -1122,6 +1372,28 @@ def input_gen(inp, **kwargs):
         yield new_inp
 
 
+def iproduct_dict(d):
+    """
+    Generator version of `product_dict`. The dictionaries are produced one at a time.
+
+    >>> d = OrderedDict([("foo", [2, 4]), ("bar", 1)])
+    >>> list(iproduct_dict(d)) == product_dict(d)
+    True
+    """
+    keys, vals = list(d.keys()), d.values()
+
+    # Each item in vals must be iterable.
+    values = []
+
+    for v in vals:
+        if not isinstance(v, collections.Iterable): v = [v]
+        values.append(v)
+
+    # Use ordered dicts so that we preserve the order when d is an OrderedDict.
+    for prod_values in itertools.product(*values):
+        yield OrderedDict(zip(keys, prod_values))
+
+
 def product_dict(d):
     """
     This function receives a dictionary d where each key defines a list of items or a simple scalar.
@@ -1144,24 +1416,7 @@ def product_dict(d):
         the order of the keys in the output equals the one used to loop.
         If the order is important, one should pass a `OrderedDict` in input
     """
-    keys, vals = d.keys(), d.values()
-
-    # Each item in vals must be iterable.
-    values = []
-
-    for v in vals:
-        if not isinstance(v, collections.Iterable): v = [v]
-        values.append(v)
-
-    # Build list of dictionaries. Use ordered dicts so that 
-    # we preserve the order when d is an OrderedDict.
-    vars_prod = [] 
-
-    for prod_values in itertools.product(*values):
-        dprod = OrderedDict(zip(keys, prod_values))
-        vars_prod.append(dprod)
-
-    return vars_prod
+    return list(iproduct_dict(d))
 
 
 class AnaddbInput(mixins.MappingMixin, Has_Structure):
@@ -4,17 +4,25 @@ from __future__ import print_function, division, unicode_literals
 
 import sys
 import os
+import multiprocessing
 import pandas as pd
 
+from six.moves import cPickle as pickle
 from collections import OrderedDict, deque 
 from monty.string import is_string
+from monty.collections import AttrDict
 from pymatgen.io.abinitio.eos import EOS
 from pymatgen.io.abinitio.flows import Flow
 from pymatgen.io.abinitio.netcdf import NetcdfReaderError
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 __all__ = [
     "abirobot",
+    "RobotSummary",
+    "SummaryCache",
 ]
 
 
@@ -43,6 +51,82 @@ def abirobot(obj, ext, nids=None):
                      [cls.EXT for cls in Robot.__subclasses__()])
 
 
+class RobotSummary(AttrDict):
+    """
+    Dictionary with the most important results extracted from a file by :meth:`Robot.get_summary`.
+    The keys have the same names as the attributes of the file object so that
+    the methods of the robot can use summaries and files interchangeably.
+    """
+
+
+class SummaryCache(object):
+    """
+    On-disk cache (pickle file) with the :class:`RobotSummary` objects extracted by the robots.
+    The entries are indexed by the absolute path of the file and are discarded if the
+    modification time of the file has changed.
+    """
+    def __init__(self, filepath):
+        """
+        Args:
+            filepath: Path of the pickle file. The file is created by `save` if it does not exist.
+        """
+        self.filepath = os.path.abspath(filepath)
+        self._entries, self._changed = {}, False
+
+        if os.path.exists(self.filepath):
+            try:
+                with open(self.filepath, "rb") as fh:
+                    self._entries = pickle.load(fh)
+            except Exception as exc:
+                # Corrupted or incompatible cache. Start from scratch.
+                logger.warning("Cannot read summary cache %s: %s" % (self.filepath, str(exc)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path):
+        """Return the summary of the file path, None if not cached or if the file has been modified."""
+        path = os.path.abspath(path)
+        try:
+            mtime, summary = self._entries[path]
+        except KeyError:
+            return None
+
+        return summary if mtime == os.path.getmtime(path) else None
+
+    def set(self, path, summary):
+        """Add the summary of the file path to the cache."""
+        path = os.path.abspath(path)
+        self._entries[path] = (os.path.getmtime(path), summary)
+        self._changed = True
+
+    def save(self):
+        """Write the cache to disk (only if new entries have been added)."""
+        if not self._changed: return
+
+        # Write to a temporary file first so that an interrupted write does not corrupt the cache.
+        tmp_path = self.filepath + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            pickle.dump(self._entries, fh, protocol=-1)
+        if os.path.exists(self.filepath): os.remove(self.filepath)
+        os.rename(tmp_path, self.filepath)
+        self._changed = False
+
+
+def _extract_summary(args):
+    """
+    Open the file with abiopen and return (summary, None) or (None, error_string).
+    Executed by the workers of the pool (must be picklable).
+    """
+    cls, filepath = args
+    from abipy.abilab import abiopen
+    try:
+        with abiopen(filepath) as ncfile:
+            return cls.get_summary(ncfile), None
+    except Exception as exc:
+        return None, "%s: %s" % (filepath, str(exc))
+
+
 class Robot(object):
     """
     The main function of a `Robot` is facilitating the extraction of the output data produced by
@@ -55,6 +139,11 @@ class Robot(object):
 
         with Robot([("label1", "file1"), (label2, "file2")]) as robot:
             # Do something with robot. files are automatically closed when we exit.
+
+    In summary mode (see :meth:`open`), the robot stores the :class:`RobotSummary` objects returned
+    by :meth:`get_summary` instead of the file objects. The files are read by a pool of processes
+    and the summaries can be cached on disk so that only new or modified files are read again.
+    Methods that need the full file (e.g. plotters) are not available in summary mode.
     """
     def __init__(self, *args):
         """args is a list of tuples (label, filepath)"""
@@ -65,6 +154,7 @@ class Robot(object):
             self.add_file(label, ncfile)
 
     def add_file(self, label, ncfile):
+        """Add a file (object, filepath or :class:`RobotSummary`) to the robot."""
         if is_string(ncfile):
             from abipy.abilab import abiopen
             ncfile = abiopen(ncfile)
@@ -109,10 +199,90 @@ class Robot(object):
                     pass
 
     @classmethod
-    def open(cls, obj, nids=None, **kwargs):
+    def get_summary(cls, ncfile):
+        """
+        Extract the data used by the robot from the file object ncfile.
+        Returns a picklable :class:`RobotSummary`. Subclasses should extend this method.
+        """
+        return RobotSummary(filepath=ncfile.filepath, structure=ncfile.structure)
+
+    def add_summaries(self, items, nprocs=None, cache=None):
+        """
+        Extract the summaries of the files and add them to the robot.
+
+        Args:
+            items: List of tuples (label, filepath).
+            nprocs: Number of processes used to read the files. None to use all the CPUs.
+            cache: :class:`SummaryCache` or path of the cache file. None to disable the cache.
+        """
+        if cache is not None and not isinstance(cache, SummaryCache):
+            cache = SummaryCache(cache)
+
+        # Read only the files that are not in the cache.
+        summaries = OrderedDict()
+        for label, path in items:
+            summaries[label] = cache.get(path) if cache is not None else None
+        todo = [(label, path) for label, path in items if summaries[label] is None]
+
+        if todo:
+            args = [(self.__class__, path) for label, path in todo]
+            if nprocs is None: nprocs = multiprocessing.cpu_count()
+            nprocs = min(nprocs, len(todo))
+
+            if nprocs > 1:
+                pool = multiprocessing.Pool(nprocs)
+                try:
+                    results = pool.map(_extract_summary, args, chunksize=max(1, len(args) // (4 * nprocs)))
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                results = list(map(_extract_summary, args))
+
+            for (label, path), (summary, error) in zip(todo, results):
+                if error is not None:
+                    self._exceptions.append(error)
+                    continue
+                summaries[label] = summary
+                if cache is not None: cache.set(path, summary)
+
+            if cache is not None: cache.save()
+
+        for label, summary in summaries.items():
+            if summary is not None: self.add_file(label, summary)
+
+    @classmethod
+    def _find_filepaths(cls, obj, nids=None):
+        """
+        List of tuples (label, filepath) with the files produced by the Flow obj
+        or found in the directory obj.
+        """
+        items = []
+        if isinstance(obj, Flow):
+            for task in obj.iflat_tasks(nids=nids):
+                path = task.outdir.has_abiext(cls.EXT)
+                if path: items.append((task.pos_str, path))
+        else:
+            if nids is not None: raise ValueError("nids cannot be used when obj is a directory.")
+            for dirpath, dirnames, filenames in os.walk(obj):
+                for f in sorted(filenames):
+                    if f.endswith(cls.EXT + ".nc"):
+                        path = os.path.join(dirpath, f)
+                        items.append((path, path))
+
+        return items
+
+    @classmethod
+    def open(cls, obj, nids=None, summary=False, nprocs=None, cache=None, **kwargs):
         """
         Flexible constructor. obj can be a :class:`Flow` or a string with the directory containing the Flow.
         nids is an optional list of :class:`Node` identifiers used to filter the set of :class:`Task` in the Flow.
+
+        Args:
+            summary: True to open the robot in summary mode i.e. keep in memory
+                only the data returned by `get_summary` instead of the file objects.
+            nprocs: Number of processes used to read the files in summary mode. None to use all the CPUs.
+            cache: Path of the on-disk cache used in summary mode. None to disable the cache.
         """
         has_dirpath = False
         if is_string(obj): 
@@ -121,6 +291,13 @@ class Robot(object):
             except:
                 has_dirpath = True
 
+        if summary:
+            new = cls()
+            new.add_summaries(cls._find_filepaths(obj, nids=nids), nprocs=nprocs, cache=cache)
+            new._initial_object = obj
+            new._open_kwargs = dict(summary=summary, nprocs=nprocs, cache=cache)
+            return new
+
         items = []
 
         if not has_dirpath:
@@ -140,7 +317,7 @@ class Robot(object):
             for dirpath, dirnames, filenames in os.walk(obj):
                 filenames = [f for f in filenames if f.endswith(cls.EXT + ".nc")]
                 for f in filenames:
-                    ncfile = abiopen(f)
+                    ncfile = abiopen(os.path.join(dirpath, f))
                     if ncfile is not None: items.append((ncfile.filepath, ncfile))
 
         new = cls(*items)
@@ -150,7 +327,7 @@ class Robot(object):
 
     def reload(self):
         """Reload data. Return new :class:`Robot` object."""
-        return self.__class__.open(self._initial_object)
+        return self.__class__.open(self._initial_object, **getattr(self, "_open_kwargs", {}))
 
     @staticmethod
     def _get_geodict(structure):
@@ -162,6 +339,21 @@ class Robot(object):
             formula=structure.formula,
         )
 
+    @staticmethod
+    def _get_attrs(obj, attrs):
+        """
+        Dictionary with the attributes attrs of obj (file object or :class:`RobotSummary`).
+        Attributes that cannot be read from file or that are not stored in the summary are ignored.
+        """
+        d = {}
+        for aname in attrs:
+            if isinstance(obj, RobotSummary) and aname not in obj: continue
+            try:
+                d[aname] = getattr(obj, aname)
+            except NetcdfReaderError:
+                pass
+        return d
+
     def _exec_funcs(self, funcs, arg):
         """Execute list of callables funcs. Each func receives arg as argument."""
         if not isinstance(funcs, (list, tuple)): funcs = [funcs]
@@ -196,6 +388,19 @@ class GsrRobot(Robot):
     """This robot analyzes the results contained in multiple GSR files."""
     EXT = "GSR"
 
+    # Attributes of the GsrFile reported in the DataFrame and stored in the summary.
+    _ATTRS = [
+        "nsppol", "ecut", "pawecutdg", #"nspinor", "nspden",
+        "tsmear", "nkpts", "energy", "magnetization", "pressure", "max_force",
+    ]
+
+    @classmethod
+    def get_summary(cls, gsr):
+        """Summary with the attributes used in `get_dataframe` and `eos_fit`."""
+        summary = super(GsrRobot, cls).get_summary(gsr)
+        summary.update(cls._get_attrs(gsr, cls._ATTRS))
+        return summary
+
     def get_dataframe(self, **kwargs):
         """
         Return a pandas DataFrame with the most important GS results.
@@ -211,21 +416,12 @@ class GsrRobot(Robot):
         """
         # TODO add more columns
         # Add attributes specified by the users
-        attrs = [
-            "nsppol", "ecut", "pawecutdg", #"nspinor", "nspden",
-            "tsmear", "nkpts", "energy", "magnetization", "pressure", "max_force",
-        ] + kwargs.pop("attrs", [])
+        attrs = self._ATTRS + kwargs.pop("attrs", [])
 
         rows, row_names = [], []
         for label, gsr in self:
             row_names.append(label)
-            #d = {aname: getattr(gsr, aname) for aname in attrs}
-            d = {}
-            for aname in attrs:
-                try:
-                    d[aname] = getattr(gsr, aname)
-                except NetcdfReaderError:
-                    pass
+            d = self._get_attrs(gsr, attrs)
 
             # Add info on structure.
             if kwargs.get("with_geo", True):
@@ -277,15 +473,41 @@ class SigresRobot(Robot):
     """This robot analyzes the results contained in multiple SIGRES files."""
     EXT = "SIGRES"
 
+    @classmethod
+    def get_summary(cls, sigr):
+        """Summary with the QP gaps and the parameters of the calculation."""
+        summary = super(SigresRobot, cls).get_summary(sigr)
+        summary.update(
+            nsppol=sigr.nsppol,
+            params=sigr.params,
+            qpgaps=sigr.qpgaps,
+            gwk2ibz=sigr.reader.gwk2ibz,
+        )
+        return summary
+
+    @staticmethod
+    def _get_qpgap(sigr, spin, kpoint):
+        """QP gap for the given spin and kpoint. Summaries support only the index of the GW k-point."""
+        if isinstance(sigr, RobotSummary):
+            if not isinstance(kpoint, int):
+                raise ValueError("kpoint must be an integer in summary mode, got %s" % str(kpoint))
+            return sigr.qpgaps[spin, sigr.gwk2ibz[kpoint]]
+
+        return sigr.get_qpgap(spin, kpoint)
+
     def merge_dataframes_sk(self, spin, kpoint, **kwargs):
-        for i, (label, sigr) in enumerate(self):
-            frame = sigr.get_dataframe_sk(spin, kpoint, index=label)
-            if i == 0:
-                table = frame
-            else:
-                table = table.append(frame)
-        
-        return table
+        """
+        Returns pandas DataFrame with the QP results for the given spin and k-point
+        extracted from all the SIGRES files. The rows are labelled with the file label.
+        """
+        return pd.concat([sigr.get_dataframe_sk(spin, kpoint, index=label) for label, sigr in self])
+
+    def merge_dataframes(self, **kwargs):
+        """
+        Returns pandas DataFrame with the QP results for all the states in all the SIGRES files.
+        The rows are labelled with the file label.
+        """
+        return pd.concat([sigr.get_dataframe(index=label) for label, sigr in self])
 
     def get_qpgaps_dataframe(self, spin=None, kpoint=None, **kwargs):
         # TODO: Ideally one should select the k-point for which we have the fundamental gap for the given spin
@@ -300,8 +522,8 @@ class SigresRobot(Robot):
         rows, row_names = [], []
         for label, sigr in self:
             row_names.append(label)
-            d = {aname: getattr(sigr, aname) for aname in attrs}
-            d.update({"qpgap": sigr.get_qpgap(spin, kpoint)})
+            d = self._get_attrs(sigr, attrs)
+            d.update({"qpgap": self._get_qpgap(sigr, spin, kpoint)})
 
             # Add convergence parameters
             d.update(sigr.params)
@@ -336,6 +558,18 @@ class MdfRobot(Robot):
     """This robot analyzes the results contained in multiple MDF files."""
     EXT = "MDF"
 
+    @classmethod
+    def get_summary(cls, mdf):
+        """Summary with the macroscopic dielectric functions and the parameters of the calculation."""
+        summary = super(MdfRobot, cls).get_summary(mdf)
+        summary.update(
+            exc_mdf=mdf.exc_mdf,
+            rpanlf_mdf=mdf.rpanlf_mdf,
+            gwnlf_mdf=mdf.gwnlf_mdf,
+            params=mdf.params,
+        )
+        return summary
+
     def get_mdf_plotter(self):
         from abipy.electrons.bse import MdfPlotter
         plotter = MdfPlotter()
@@ -6,6 +6,7 @@ import abipy.data as abidata
 
 from abipy.core.testing import AbipyTest
 from abipy.htc.input import *
+from abipy.htc.input import iproduct_dict, product_dict
 
 
 class AbiInputTest(AbipyTest):
@@ -59,6 +60,23 @@ class AbiInputTest(AbipyTest):
         # To print the input to stdout use:
         print(inp)
 
+        # IBZ computed in-process with the symmetries of the structure.
+        ibz = inp.get_ibz(ngkpt=[4, 4, 4], shiftk=[[0.5, 0.5, 0.5], [0.5, 0, 0], [0, 0.5, 0], [0, 0, 0.5]])
+        aequal(len(ibz.points), 10)
+        self.assert_almost_equal(ibz.weights.sum(), 1)
+
+        ibz = inp.get_ibz()
+        self.assert_almost_equal(ibz.points, [[0, 0, 0], [0.5, 0, 0], [0.5, 0.5, 0]])
+        self.assert_almost_equal(ibz.weights, [1/8, 4/8, 3/8])
+
+        ibz = inp.get_ibz(ngkpt=[4, 4, 4])
+        aequal(len(ibz.points), 8)
+        self.assert_almost_equal(64 * ibz.weights, [1, 8, 4, 6, 24, 12, 3, 6])
+        # Only time-reversal.
+        aequal(len(inp.get_ibz(ngkpt=[4, 4, 4], kptopt=2).points), 36)
+        # No symmetry
+        aequal(len(inp.get_ibz(ngkpt=[4, 4, 4], kptopt=3).points), 64)
+
         # To create a new input with a different variable.
         new = inp.new_with_vars(kptopt=3)
         assert new.kptopt == 3 and inp.kptopt == 1
@@ -154,6 +172,49 @@ class AbiInputTest(AbipyTest):
         with self.assertRaises(inp.Error):
             inp.set_vars(foobar=10)
 
+    def test_input_gen(self):
+        """Testing input_gen and the copy-on-write inputs."""
+        inp = AbiInput(pseudos=abidata.pseudos("14si.pspnc"), ndtset=1)
+        inp.set_structure(abidata.cif_file("si.cif"))
+        inp.set_vars(ecut=10, nband=8, tsmear=0.01, ngkpt=[4, 4, 4], shiftk=[[0.5, 0.5, 0.5]])
+        inp_string = str(inp)
+
+        kwargs = dict(ecut=[10, 20, 30], ngkpt=[[2, 2, 2], [4, 4, 4]])
+        inputs = list(input_gen(inp, **kwargs))
+        self.assertEqual(len(inputs), 6)
+
+        # Same results as deep copies.
+        for new_vars, new_inp in zip(iproduct_dict(kwargs), inputs):
+            ref_inp = inp.deepcopy()
+            ref_inp.remove_vars(new_vars.keys())
+            ref_inp.set_vars(**new_vars)
+            self.assertEqual(str(new_inp), str(ref_inp))
+            self.assertTrue(new_inp.pseudos is inputs[0].pseudos)
+
+        # Changing one input does not affect the others and the initial input.
+        inputs[0].set_vars(nband=20)
+        inputs[0].remove_vars("tsmear")
+        self.assertEqual(inputs[1][0]["nband"], 8)
+        self.assertTrue("tsmear" in inputs[1][0])
+        self.assertEqual(str(inp), inp_string)
+
+        # In-place modifications of the shared lists and arrays are not propagated.
+        inputs[2][0]["shiftk"][0][0] = 0.0
+        self.assertEqual(inputs[2][0]["shiftk"], [[0.0, 0.5, 0.5]])
+        self.assertEqual(inputs[3][0]["shiftk"], [[0.5, 0.5, 0.5]])
+        self.assertEqual(str(inp), inp_string)
+        ref_inp = inputs[3].deepcopy()
+        ref_inp.set_vars(shiftk=[[0.0, 0.5, 0.5]], ecut=inputs[2][0]["ecut"], ngkpt=inputs[2][0]["ngkpt"])
+        self.assertEqual(str(inputs[2]), str(ref_inp))
+
+        ecut = inputs[1][0]["ecut"]
+        copy_inp = inputs[1].deepcopy()
+        copy_inp.set_vars(ecut=50)
+        self.assertEqual(inputs[1][0]["ecut"], ecut)
+
+        self.serialize_with_pickle(inputs[0], test_eq=False)
+        self.assertEqual(list(iproduct_dict(kwargs)), product_dict(kwargs))
+
 
 class LdauLexxTest(AbipyTest):
 
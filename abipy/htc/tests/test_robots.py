@@ -0,0 +1,55 @@
+"""Tests for htc.robots module."""
+from __future__ import print_function, division
+
+import os
+import shutil
+import tempfile
+import abipy.data as abidata
+
+from abipy.core.testing import AbipyTest
+from abipy.htc.robots import GsrRobot, RobotSummary, SummaryCache
+
+
+class GsrRobotTest(AbipyTest):
+
+    def setUp(self):
+        # Directory with two GSR files.
+        self.workdir = tempfile.mkdtemp()
+        for basename in ("si_scf_GSR.nc", "si_nscf_GSR.nc"):
+            shutil.copy(abidata.ref_file(basename), self.workdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_summary_mode(self):
+        """Testing GsrRobot in summary mode."""
+        with GsrRobot.open(self.workdir) as robot:
+            self.assertEqual(len(robot.ncfiles), 2)
+            energies = {os.path.basename(label): gsr.energy for label, gsr in robot}
+            frame = robot.get_dataframe()
+
+        cache_path = os.path.join(self.workdir, "robot_cache.pickle")
+        robot = GsrRobot.open(self.workdir, summary=True, nprocs=1, cache=cache_path)
+        self.assertEqual(len(robot.ncfiles), 2)
+        self.assertFalse(robot.exceptions)
+
+        for label, summary in robot:
+            self.assertTrue(isinstance(summary, RobotSummary))
+            self.assertEqual(summary.energy, energies[os.path.basename(label)])
+
+        self.assertEqual(list(robot.get_dataframe().columns), list(frame.columns))
+
+        # The summaries are now in the cache.
+        cache = SummaryCache(cache_path)
+        self.assertEqual(len(cache), 2)
+        for label, summary in robot:
+            self.assertEqual(cache.get(summary.filepath).energy, summary.energy)
+
+        # Entries are invalidated when the file is modified.
+        path = robot.ncfiles[0].filepath
+        mtime = os.path.getmtime(path)
+        os.utime(path, (mtime + 10, mtime + 10))
+        self.assertTrue(cache.get(path) is None)
+
+        new_robot = GsrRobot.open(self.workdir, summary=True, nprocs=2, cache=cache_path)
+        self.assertEqual(sorted(s.energy for s in new_robot.ncfiles), sorted(energies.values()))
@@ -2,6 +2,7 @@
 from __future__ import print_function, division, unicode_literals
 
 from .xsf import *
+from .cube import *
 from .visualizer import *
 
 import pymatgen.io.abinitio.netcdf as ionc 
@@ -0,0 +1,58 @@
+# coding: utf-8
+"""Tools for writing Gaussian cube files."""
+from __future__ import print_function, division, unicode_literals
+
+import numpy as np
+
+from pymatgen.core.units import bohr_to_ang
+from abipy.iotools.xsf import _select_cplx_mode
+
+__all__ = [
+    "cube_write_data",
+]
+
+
+def cube_write_data(file, structure, data, cplx_mode=None, comment="Generated by abipy"):
+    """
+    Write the structure and data in the Gaussian cube format.
+    Lengths are in Bohr and data is written without the periodic replicas.
+
+    Args:
+        file: file-like object.
+        structure: :class:`Structure` object.
+        data: array-like object in C-order, i.e data[nx,ny,nz]. An array of shape [1,nx,ny,nz] is accepted as well.
+        cplx_mode: string defining the data to print when data is a complex array.
+            Possible choices are (case-insensitive): "re", "im", "abs". See `xsf_write_data`.
+        comment: String written in the first line of the file.
+    """
+    data = np.asarray(data)
+    if data.ndim == 4 and data.shape[0] == 1:
+        data = data[0]
+    if data.ndim != 3:
+        raise ValueError("cube format supports only one 3D grid while data has shape %s" % str(data.shape))
+
+    data = _select_cplx_mode(data, cplx_mode)
+
+    fwrite = file.write
+    nx, ny, nz = data.shape
+
+    fwrite(comment.strip() + "\n")
+    fwrite("Outer loop: x, middle loop: y, inner loop: z\n")
+
+    cell = structure.lattice_vectors(space="r") / bohr_to_ang
+    cart_coords = np.reshape(structure.cart_coords, (-1, 3)) / bohr_to_ang
+    atomic_numbers = structure.atomic_numbers
+
+    fwrite("%5d %12.6f %12.6f %12.6f\n" % (len(cart_coords), 0, 0, 0))
+    for n, vec in zip(data.shape, cell):
+        fwrite("%5d %12.6f %12.6f %12.6f\n" % ((n,) + tuple(vec / n)))
+
+    for z, xyz in zip(atomic_numbers, cart_coords):
+        fwrite("%5d %12.6f %12.6f %12.6f %12.6f\n" % ((z, z) + tuple(xyz)))
+
+    # Six values per line, a new line is started for each (x, y).
+    # A whole x-plane is formatted with a single call.
+    row_fmt = "".join(" %12.5E" + ("\n" if i % 6 == 5 or i == nz - 1 else "") for i in range(nz))
+    plane_fmt = row_fmt * ny
+    for plane in data:
+        fwrite(plane_fmt % tuple(plane.ravel().tolist()))
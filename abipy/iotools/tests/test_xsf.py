@@ -8,6 +8,7 @@ import abipy.data as data
 
 from abipy.core.testing import *
 from abipy.iotools.xsf import *
+from abipy.iotools.cube import cube_write_data
 
 class TestXsfUtils(AbipyTest):
     """Unit tests for Density."""
@@ -86,6 +87,27 @@ END_BLOCK_DATAGRID_3D
         tmp_file.seek(0)
         self.assertMultiLineEqual(tmp_file.read(), xsf_string)
 
+    def test_cube_write_data(self):
+        """Testing Gaussian cube files."""
+        data = np.reshape(np.arange(24, dtype=np.float), (2, 3, 4))
+        tmp_file = tempfile.TemporaryFile(mode="w+")
+        cube_write_data(tmp_file, self.mgb2, data)
+
+        tmp_file.seek(0)
+        lines = tmp_file.readlines()
+        natom = len(self.mgb2)
+        self.assertEqual(int(lines[2].split()[0]), natom)
+        self.assertEqual([int(l.split()[0]) for l in lines[3:6]], [2, 3, 4])
+        self.assertEqual([int(l.split()[0]) for l in lines[6:6+natom]], [12, 5, 5])
+
+        # Values are written with the z index running fastest.
+        values = np.array(" ".join(lines[6+natom:]).split(), dtype=np.float)
+        self.assert_almost_equal(values.reshape(data.shape), data)
+
+        # Complex arrays require cplx_mode.
+        with self.assertRaises(TypeError):
+            cube_write_data(tmp_file, self.mgb2, np.array(data, dtype=np.complex))
+
     def test_bxsf_write(self):
         tmp_file = tempfile.TemporaryFile(mode="w+")
 
@@ -208,6 +208,7 @@ class Vesta(Visualizer):
         
     EXTS = [
         ("xsf", ""),
+        ("cube", ""),
     ]
 
 #class Avogadro(Visualizer):
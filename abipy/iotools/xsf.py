@@ -80,18 +80,7 @@ def xsf_write_data(file, structure, data, add_replicas=True, cplx_mode=None):
     if add_replicas:
         data = add_periodic_replicas(data)
 
-    if np.iscomplexobj(data):
-        if cplx_mode is None:
-            raise TypeError("cplx_mode must be specified when data is a complex array.")
-        cplx_mode = cplx_mode.lower()
-        if cplx_mode == "re":
-            data = data.real
-        elif cplx_mode == "im":
-            data = data.imag
-        elif cplx_mode == "abs":
-            data = np.abs(data)
-        else:
-            raise ValueError("Wrong value for cplx_mode: %s" % cplx_mode)
+    data = _select_cplx_mode(data, cplx_mode)
 
     shape = data.shape
     ndim = data.ndim
@@ -123,17 +112,37 @@ def xsf_write_data(file, structure, data, add_replicas=True, cplx_mode=None):
         for i in range(3):
             fwrite('%f %f %f\n' % tuple(cell[i]))
 
-        for z in range(fgrid[0]):
-            for y in range(fgrid[1]):
-                slice_x = fdata[dg,z,y]
-                fwrite(' '.join(['%f' % d for d in slice_x]) )
-                fwrite('\n')
-            fwrite('\n')
+        # One line for each (z, y) and an empty line after each z-plane.
+        # A whole plane is formatted with a single call.
+        plane_fmt = (" ".join(fgrid[2] * ["%f"]) + "\n") * fgrid[1] + "\n"
+        for plane in fdata[dg]:
+            fwrite(plane_fmt % tuple(plane.ravel().tolist()))
 
         fwrite(' END_DATAGRID_3D\n')
     fwrite('END_BLOCK_DATAGRID_3D\n')
 
 
+def _select_cplx_mode(data, cplx_mode):
+    """
+    Return the real array to be written when data is complex.
+    cplx_mode is one of "re", "im", "abs" (case-insensitive).
+    """
+    if not np.iscomplexobj(data):
+        return data
+
+    if cplx_mode is None:
+        raise TypeError("cplx_mode must be specified when data is a complex array.")
+    cplx_mode = cplx_mode.lower()
+    if cplx_mode == "re":
+        return data.real
+    elif cplx_mode == "im":
+        return data.imag
+    elif cplx_mode == "abs":
+        return np.abs(data)
+    else:
+        raise ValueError("Wrong value for cplx_mode: %s" % cplx_mode)
+
+
 def bxsf_write(file, structure, nsppol, nband, ndivs, emesh_sbk, fermie, unit="eV"):
     """
     Write band structure data in the Xcrysden format (XSF)
@@ -199,7 +208,8 @@ def bxsf_write(file, structure, nsppol, nband, ndivs, emesh_sbk, fermie, unit="e
             idx += 1
             enebz = emesh_sbk[spin, band, :]
             fw(" BAND: %d\n" % idx)
-            np.savetxt(file, enebz)
+            # Same format as np.savetxt but a single write for all the k-points.
+            fw(("%.18e\n" * len(enebz)) % tuple(np.asarray(enebz).tolist()))
 
     fw(' END_BANDGRID_3D\n')
     fw('END_BLOCK_BANDGRID_3D\n')
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-"""This script wraps the Fortran executable mrgddb."""
+"""This script merges DDB files in pure python or with the Fortran executable mrgddb."""
 from __future__ import print_function, division, unicode_literals
 
 import os
@@ -7,6 +7,7 @@ import sys
 import argparse
 
 from pymatgen.io.abinitio.wrappers import Mrgddb
+from abipy.dfpt.ddb import merge_ddb_files
 
 def main():
 
@@ -16,6 +17,8 @@ def main():
             "mrgddb -o output_DDB file1_DDB file2_DDB\n"
             "mrgddb -o output_DDB -d 'String with description' file1_DDB file2_DDB\n"
             "mrgddb -o output_DDB  *_DDB\n"
+            "mrgddb -a -o output_DDB new1_DDB new2_DDB  # Add the blocks of new1_DDB and new2_DDB to output_DDB\n"
+            "mrgddb -e mrgddb -o output_DDB  *_DDB     # Use the Fortran executable\n"
         )
         return examples
 
@@ -34,7 +37,11 @@ def main():
     parser.add_argument('-v', '--verbose', default=0, action='count', # -vv --> verbose=2
                         help='verbose, can be supplied multiple times to increase verbosity.')  
 
-    parser.add_argument('-e', '--executable', metavar='STRING', type=str, default="mrgddb", help="Path to the mrgddb executable.")
+    parser.add_argument('-e', '--executable', metavar='STRING', type=str, default=None,
+                        help="Path to the mrgddb executable. If not given, the files are merged in pure python.")
+
+    parser.add_argument('-a', '--append', default=False, action="store_true",
+                        help="Append the new blocks to out_ddb instead of overwriting it (pure python mode only).")
 
     parser.add_argument('-d', '--description', metavar='STRING', type=str, default="No description available", 
                         help="Description added to the merged DDB file.")
@@ -52,8 +59,11 @@ def main():
     if not options.out_ddb:
         raise ValueError("out_ddb must be specified")
 
-    mrgddb = Mrgddb(executable=options.executable, verbose=options.verbose)
+    if options.executable is None:
+        merge_ddb_files(options.ddb_files, options.out_ddb, description=options.description, append=options.append)
+        return 0
 
+    mrgddb = Mrgddb(executable=options.executable, verbose=options.verbose)
 
     try:
         mrgddb.merge(options.ddb_files, options.out_ddb, options.description, cwd=None)
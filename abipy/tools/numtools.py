@@ -45,15 +45,10 @@ def add_periodic_replicas(arr):
         oshape[-3:] = oshape[-3:] + 1
         oarr = np.empty(oshape, dtype=arr.dtype)
 
-        for x in range(ishape[-3]):
-            for y in range(ishape[-2]):
-                oarr[..., x, y, :-1] = arr[..., x, y, :]
-                oarr[..., x, y, -1] = arr[..., x, y, 0]
-
-            oarr[..., x, y + 1, :-1] = arr[..., x, 0, :]
-            oarr[..., x, y + 1, -1] = arr[..., x, 0, 0]
-
-        oarr[..., x + 1, :, :] = oarr[..., 0, :, :]
+        oarr[..., :-1, :-1, :-1] = arr
+        oarr[..., -1, :-1, :-1] = arr[..., 0, :, :]
+        oarr[..., :, -1, :-1] = oarr[..., :, 0, :-1]
+        oarr[..., :, :, -1] = oarr[..., :, :, 0]
 
     return oarr
 
@@ -165,6 +160,73 @@ def gaussian(x, width, center=0.0, height=None):
 
     return height * np.exp(-((x - center) / width) ** 2 / 2.)
 
+
+def gaussians_sum(x, centers, width, weights=None, nsigma=None, chunk_size=2**20):
+    """
+    Compute the weighted sum of normalized gaussians centered on `centers`:
+
+        out[..., i] = sum_c weights[..., c] * gaussian(x[i], width, center=centers[c])
+
+    The computation is fully vectorized and performed in chunks so that the size
+    of the temporary arrays is bounded by chunk_size.
+
+    Args:
+        x: Array-like with the points where the sum is evaluated. Must be sorted if nsigma is not None.
+        centers: Array-like with the centers of the gaussians.
+        width: Standard deviation of the gaussians.
+        weights: Weights of the gaussians. Either 1D array with len(centers) entries
+            or 2D array of shape (ncomp, len(centers)). In the later case, ncomp sums are computed at once.
+            None is equivalent to unit weights.
+        nsigma: If not None, the gaussians are truncated at nsigma * width from the center.
+            This option is much faster if x spans a range much larger than the width.
+        chunk_size: Max number of elements in the temporary arrays.
+
+    Returns:
+        ndarray of shape (len(x),) or (ncomp, len(x)) depending on the shape of weights.
+    """
+    x = np.asarray(x, dtype=np.float)
+    centers = np.ravel(np.asarray(centers, dtype=np.float))
+    nx, nc = len(x), len(centers)
+
+    if weights is None:
+        weights = np.ones(nc)
+    weights = np.asarray(weights)
+    squeeze = weights.ndim == 1
+    weights = np.reshape(weights, (-1, nc))
+
+    out = np.zeros((weights.shape[0], nx))
+
+    if nsigma is None:
+        # Dense blocks of gaussians, the sum is done with a matrix-matrix product.
+        step = max(1, chunk_size // max(nx, 1))
+        for start in range(0, nc, step):
+            stop = start + step
+            arg = (x[np.newaxis, :] - centers[start:stop, np.newaxis]) / width
+            out += np.dot(weights[:, start:stop], np.exp(-0.5 * arg ** 2))
+
+    else:
+        # Each gaussian contributes only to the points in [lo, hi[
+        lo = np.searchsorted(x, centers - nsigma * width, side="left")
+        hi = np.searchsorted(x, centers + nsigma * width, side="right")
+        nwin = (hi - lo).max() if nc else 0
+
+        if nwin > 0:
+            offsets = np.arange(nwin)
+            step = max(1, chunk_size // nwin)
+            for start in range(0, nc, step):
+                stop = start + step
+                inds = lo[start:stop, np.newaxis] + offsets
+                mask = inds < hi[start:stop, np.newaxis]
+                inds = np.minimum(inds, nx - 1)
+                arg = (x[inds] - centers[start:stop, np.newaxis]) / width
+                gauss = np.where(mask, np.exp(-0.5 * arg ** 2), 0.0)
+                for comp, w in enumerate(weights[:, start:stop]):
+                    out[comp] += np.bincount(inds.ravel(), weights=(w[:, np.newaxis] * gauss).ravel(), minlength=nx)
+
+    out *= 1.0 / (width * np.sqrt(2 * np.pi))
+
+    return out[0] if squeeze else out
+
 #=====================================
 # === Data Interpolation/Smoothing ===
 #=====================================
@@ -47,6 +47,20 @@ class TestTools(AbipyTest):
             self.assertTrue(np.all(view[...,0,0] == view[...,-1,-1]))
             self.assertTrue(np.all(view[...,0,0,0] == view[...,-1,-1,-1]))
 
+    def test_gaussians_sum(self):
+        """test gaussians_sum"""
+        x = np.linspace(-2, 12, 301)
+        centers = np.random.random(50) * 10
+        weights = np.random.random((2, 50))
+
+        ref = np.zeros((2, len(x)))
+        for i, c in enumerate(centers):
+            ref += weights[:, i, np.newaxis] * gaussian(x, 0.3, center=c)
+
+        self.assert_almost_equal(gaussians_sum(x, centers, 0.3, weights=weights, chunk_size=100), ref)
+        self.assert_almost_equal(gaussians_sum(x, centers, 0.3, weights=weights[1]), ref[1])
+        self.assert_almost_equal(gaussians_sum(x, centers, 0.3, weights=weights, nsigma=10, chunk_size=100), ref)
+
 
 if __name__ == "__main__":
    import unittest
@@ -10,11 +10,15 @@ import numpy as np
 
 from abipy.iotools import Visualizer
 from abipy.iotools.xsf import xsf_write_structure, xsf_write_data
+from abipy.iotools.cube import cube_write_data
 from abipy.core import Mesh3D
 from abipy.core.kpoints import Kpoint
 
 __all__ = [
     "PWWaveFunction",
+    "fft_ug_block",
+    "symmetry_dmats",
+    "kinetic_matrix",
 ]
 
 
@@ -23,6 +27,92 @@ __all__ = [
 #_dot = np.dot
 
 
+def fft_ug_block(gsphere, mesh, ug_block, backend=None):
+    """
+    Performs the FFT transform of a block of wavefunctions defined on the same G-sphere
+    with a single (batched) call to the FFT backend.
+
+    Args:
+        gsphere: :class:`GSphere` object.
+        mesh: :class:`Mesh3d` object.
+        ug_block: Array of shape (..., npw) e.g. (nband, nspinor, npw).
+        backend: Name of the FFT backend. None to use the default one.
+
+    Returns:
+        Array of shape (..., nx, ny, nz) with :math:`u(r)` on the real space FFT box.
+    """
+    ug_block = np.asarray(ug_block)
+    ug_mesh = np.reshape(gsphere.tofftmesh(mesh, ug_block), ug_block.shape[:-1] + mesh.shape)
+    return mesh.fft_g2r(ug_mesh, fg_ishifted=False, backend=backend)
+
+
+def kinetic_matrix(gsphere, ug_block):
+    """
+    Compute the matrix elements of the kinetic operator for a block of bands.
+
+    Args:
+        gsphere: :class:`GSphere` object.
+        ug_block: Array of shape [nband, nspinor, npw] with the Fourier components.
+
+    Returns:
+        Array of shape [nband, nband] with <u_i|T|u_j> in Hartree.
+    """
+    ug_block = np.asarray(ug_block)
+    nband = ug_block.shape[0]
+    ug_block = np.reshape(ug_block, (nband, -1, gsphere.npw))
+
+    tug_block = 0.5 * gsphere.kpg2 * ug_block
+    return np.dot(np.reshape(ug_block, (nband, -1)).conj(), np.reshape(tug_block, (nband, -1)).T)
+
+
+def symmetry_dmats(gsphere, ug_block, symmops, g0vecs=None):
+    """
+    Compute the matrices D(R) of a set of symmetry operations in the basis of a block of
+    wavefunctions defined on the same G-sphere (e.g. a set of degenerate states):
+
+        D[isym, a, b] = <u_a|R_t u_b>
+
+    where R_t u_b is the wavefunction rotated with :meth:`PWWaveFunction.rotate`.
+    The rotation is done directly on the G-sphere with one table per operation
+    and the phases of all the operations are computed at once (no FFT is needed).
+
+    Args:
+        gsphere: :class:`GSphere` object.
+        ug_block: Array of shape (nband, nspinor, npw) or (nband, npw).
+        symmops: List of :class:`SymmOp` objects preserving the k-point of the sphere.
+        g0vecs: List of reciprocal lattice vectors G0 = Sk - k (one for each operation). None if G0 = 0.
+
+    Returns:
+        Complex `ndarray` of shape (len(symmops), nband, nband)
+    """
+    ug_block = np.asarray(ug_block)
+    nband = ug_block.shape[0]
+    ug_block = np.reshape(ug_block, (nband, -1, gsphere.npw))
+    if ug_block.shape[1] != 1:
+        raise ValueError("Spinor rotation not available yet.")
+    ug_block = ug_block[:, 0, :]
+
+    nsym = len(symmops)
+    if g0vecs is None: g0vecs = np.zeros((nsym, 3), dtype=np.int)
+
+    # Phases exp(-i 2pi S(k+G).tau) for all the operations: shape (nsym, npw)
+    rots = np.array([op.rot_g * op.time_sign for op in symmops])
+    taus = np.array([op.tau for op in symmops])
+    kpg = gsphere.gvecs + gsphere.kpoint.frac_coords
+    rot_kpg = np.einsum("sij,gj->sgi", rots, kpg)
+    phases = np.exp(-2j * np.pi * np.einsum("sgi,si->sg", rot_kpg, taus))
+
+    dmats = np.zeros((nsym, nband, nband), dtype=np.complex)
+    for isym, (symmop, g0) in enumerate(zip(symmops, g0vecs)):
+        # The coefficient ug[ig] of the rotated wave is placed at S G_ig + G0.
+        table = gsphere.rotation_table(symmop, g0=g0)
+        ok = table >= 0
+        rot_ug = ug_block[:, ok] * phases[isym, ok]
+        dmats[isym] = np.dot(ug_block[:, table[ok]].conj(), rot_ug.T)
+
+    return dmats
+
+
 class WaveFunction(object):
     """
     Abstract class defining base and abstract methods for wavefunction objects.
@@ -172,6 +262,19 @@ class WaveFunction(object):
         ug_mesh = self.ug_mesh(mesh)
         return mesh.fft_g2r(ug_mesh, fg_ishifted=False)
 
+    def eval_ur(self, frac_coords):
+        """
+        Evaluate :math:`u(r)` at arbitrary points by summing the Fourier series on the G-sphere.
+
+        Args:
+            frac_coords: Reduced coordinates of the points. Array of shape [npts, 3] or [3].
+
+        Returns:
+            Array of shape [nspinor, npts]
+        """
+        ug_mesh = np.reshape(self.ug_mesh(), (-1,) + self.mesh.shape)
+        return self.mesh.fourier_eval(ug_mesh, frac_coords)
+
     def tostring(self, prtvol=0):
         """String representation."""
         lines = []
@@ -244,6 +347,7 @@ class PWWaveFunction(WaveFunction):
             filename: String specifying the file path and the file format.
                 The format is defined by the file extension. filename="prefix.xsf", for example, 
                 will produce a file in XSF format. An *empty* prefix, e.g. ".xsf" makes the code use a temporary file.
+                Supported extensions: "xsf", "cube" (Gaussian cube) and "npy" (raw numpy array).
             structure: :class:`Structure` object.
             visu: :class:`Visualizer` subclass. By default, this method returns the first available
                 visualizer that supports the given file format. If visu is not None, an
@@ -251,7 +355,7 @@ class PWWaveFunction(WaveFunction):
                 applications and formats supported.
 
         Returns:
-            Instance of :class:`Visualizer`
+            Instance of :class:`Visualizer` (None for the npy format)
         """
         if "." not in filename:
             raise ValueError("Cannot detect file extension in: %s" % filename)
@@ -266,11 +370,18 @@ class PWWaveFunction(WaveFunction):
         # Compute |u(r)|2 and write data according to ext.
         ur2 = np.reshape(self.ur2, (1,) + self.ur2.shape)
 
+        if ext == "npy":
+            # Raw numpy array (no visualizer).
+            np.save(filename, ur2[0])
+            return None
+
         with open(filename, mode="w") as fh:
             if ext == "xsf":
                 # xcrysden
                 xsf_write_structure(fh, structures=[structure])
                 xsf_write_data(fh, structure, ur2, add_replicas=True)
+            elif ext == "cube":
+                cube_write_data(fh, structure, ur2)
             else:
                 raise NotImplementedError("extension %s is not supported." % ext)
 
@@ -299,10 +410,16 @@ class PWWaveFunction(WaveFunction):
         else:
             raise visu.Error("Don't know how to export data for %s" % visu_name)
 
-    #def tkin(self):
-    #    """Computes the matrix element of the kinetic operator in reciprocal space."""
-    #    tug = -0.5 * self.gsphere.kpg2 * self.ug
-    #    return np.vdot(self.ug, tug).sum()
+    def tkin(self, other=None):
+        """
+        Computes the matrix element <self|T|other> of the kinetic operator in reciprocal space (Hartree).
+        If other is None, the expectation value of T is returned.
+        """
+        other = self if other is None else other
+        if self.gsphere != other.gsphere:
+            raise ValueError("The two waves must have the same G-sphere")
+
+        return np.vdot(self.ug, 0.5 * self.gsphere.kpg2 * other.ug)
 
     def braket(self, other, space="g"):
         """
@@ -387,14 +504,11 @@ class PWWaveFunction(WaveFunction):
         #rot_istwfk = istwfk(rot_kpt)
 
         if not np.allclose(symmop.tau, np.zeros(3)):
-            rot_ug = np.empty_like(self.ug)
             rot_gvecs = rot_gsphere.gvecs
             rot_kpt = rot_gsphere.kpoint.frac_coords
 
-            ug = self._ug
-            #phase = np.exp(-2j * np.pi * (np.dot(rot_gvecs + rot_kpt, symmop.tau)))
-            for ig in range(self.npw):
-                rot_ug[:, ig] = ug[:, ig] * np.exp(-2j * np.pi * (np.dot(rot_gvecs[ig] + rot_kpt, symmop.tau)))
+            phase = np.exp(-2j * np.pi * (np.dot(rot_gvecs + rot_kpt, symmop.tau)))
+            rot_ug = self._ug * phase
         else:
             rot_ug = self.ug.copy() 
                                                                                                                  
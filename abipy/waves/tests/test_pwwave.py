@@ -3,7 +3,8 @@ from __future__ import print_function, division
 
 import numpy as np
 
-from abipy.core import Mesh3D
+from abipy.core import Mesh3D, GSphere
+from abipy.core.fftengines import available_fft_backends
 from abipy.core.testing import *
 from abipy.waves.pwwave import *
 
@@ -48,6 +49,84 @@ class TestPWWave(AbipyTest):
                 self.assert_almost_equal(int_r, int_g)
 
 
+    def test_fft_ug_block(self):
+        """Batched FFT of a block of bands"""
+        vectors = np.eye(3)
+        mesh = Mesh3D((6,5,4), vectors)
+        gvecs = np.array([[0,0,0], [1,0,0], [-1,0,0], [0,2,-1], [2,-1,1]])
+        gsphere = GSphere(2, vectors, [0,0,0], gvecs)
+
+        nband, nspinor = 3, 1
+        ug_block = np.random.random((nband, nspinor, len(gvecs))) + 1j
+        waves = [PWWaveFunction(nspinor, 0, band, gsphere, ug_block[band]) for band in range(nband)]
+        for wave in waves:
+            wave.set_mesh(mesh)
+
+        for backend in available_fft_backends():
+            ur_block = fft_ug_block(gsphere, mesh, ug_block, backend=backend)
+            self.assertTrue(ur_block.shape == (nband, nspinor) + mesh.shape)
+            for band, wave in enumerate(waves):
+                self.assert_almost_equal(ur_block[band], mesh.reshape(wave.ur))
+
+        # Evaluation of u(r) at arbitrary points.
+        wave = waves[0]
+        self.assert_almost_equal(wave.eval_ur(mesh.rpoints), np.reshape(wave.ur, (nspinor, -1)))
+        shift = np.array([0.1, 0.2, 0.3])
+        ur_shifted = np.dot(wave.ug, np.exp(2j * np.pi * np.dot(gvecs, shift)))
+        self.assert_almost_equal(wave.eval_ur(shift), ur_shifted[:, np.newaxis])
+
+    def test_symmetry_dmats(self):
+        """D(R) matrices computed on the G-sphere"""
+        import itertools
+        from abipy.core.symmetries import SymmOp
+        lattice = np.eye(3)
+        mesh = Mesh3D((10,10,10), lattice)
+        r = range(-3, 4)
+        gvecs = np.array([g for g in itertools.product(r, r, r) if np.dot(g, g) <= 6])
+        gsphere = GSphere(2, lattice, [0,0,0], gvecs)
+
+        nband, nspinor = 3, 1
+        ug_block = np.random.random((nband, nspinor, len(gvecs))) + 1j * np.random.random((nband, nspinor, len(gvecs)))
+        waves = [PWWaveFunction(nspinor, 0, band, gsphere, ug_block[band]) for band in range(nband)]
+        for wave in waves:
+            wave.set_mesh(mesh)
+
+        symmops = [SymmOp(np.eye(3, dtype=np.int), [0,0,0], 1, 1),
+                   SymmOp([[0,1,0], [1,0,0], [0,0,1]], [0.25,0,0.5], 1, 1),
+                   SymmOp(-np.eye(3, dtype=np.int), [0,0.5,0], 1, 1)]
+
+        dmats = symmetry_dmats(gsphere, ug_block, symmops)
+        self.assertTrue(dmats.shape == (len(symmops), nband, nband))
+
+        # Compare with the rotation of the single waves.
+        for isym, symmop in enumerate(symmops):
+            for b, wave_b in enumerate(waves):
+                rot_wave = wave_b.rotate(symmop)
+                for a, wave_a in enumerate(waves):
+                    self.assert_almost_equal(dmats[isym, a, b], wave_a.braket(rot_wave))
+
+    def test_kinetic_matrix(self):
+        """Matrix elements of the kinetic operator"""
+        lattice = np.eye(3)
+        gvecs = np.array([[0,0,0], [1,0,0], [-1,0,0], [0,2,-1], [2,-1,1]])
+        gsphere = GSphere(2, lattice, [0.5,0,0], gvecs)
+
+        nband, nspinor = 3, 1
+        ug_block = np.random.random((nband, nspinor, len(gvecs))) + 1j * np.random.random((nband, nspinor, len(gvecs)))
+        waves = [PWWaveFunction(nspinor, 0, band, gsphere, ug_block[band]) for band in range(nband)]
+
+        tmat = kinetic_matrix(gsphere, ug_block)
+        self.assertTrue(tmat.shape == (nband, nband))
+        self.assert_almost_equal(tmat, tmat.T.conj())
+
+        for a, wave_a in enumerate(waves):
+            self.assert_almost_equal(wave_a.tkin().imag, 0)
+            self.assert_almost_equal(tmat[a, a], wave_a.tkin())
+            for b, wave_b in enumerate(waves):
+                expected = 0.5 * np.sum(gsphere.kpg2 * ug_block[a, 0].conj() * ug_block[b, 0])
+                self.assert_almost_equal(wave_a.tkin(wave_b), expected)
+                self.assert_almost_equal(tmat[a, b], expected)
+
 
 if __name__ == "__main__":
    import unittest
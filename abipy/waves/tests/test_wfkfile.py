@@ -5,6 +5,7 @@ import abipy.data as data
 
 from abipy.core.testing import *
 from abipy.waves import WfkFile
+from abipy.waves.wfkfile import WFK_Reader
 
 
 class TestWFKFile(AbipyTest):
@@ -59,6 +60,30 @@ class TestWFKFile(AbipyTest):
             if self.which("xcrysden") is not None:
                 wave.export_ur2(".xsf", structure)
 
+            # Read a block of bands with a single call.
+            waves = wfk.get_waves(spin, kpoint, band_range=[0, 1])
+            self.assertTrue(waves[0] == wave and waves[1] == other_wave)
+
+    def test_lazy_reader(self):
+        """Lazy and eager WFK_Reader must give the same results."""
+        for path in data.WFK_NCFILES:
+            lazy, eager = WFK_Reader(path), WFK_Reader(path, lazy=False)
+
+            for k in range(len(lazy.kpoints)):
+                gvecs, istwfk = lazy.read_gvecs_istwfk(k)
+                self.assert_equal(gvecs, eager.read_gvecs_istwfk(k)[0])
+
+                nband = lazy.nband_sk[0, k]
+                self.assert_equal(lazy.read_ug(0, k, nband-1), eager.read_ug(0, k, nband-1))
+                self.assert_equal(lazy.read_ug_block(0, k), eager.read_ug_block(0, k))
+                self.assert_equal(lazy.read_ug_block(0, k, slice(1, nband)),
+                                  eager.read_ug_block(0, k, slice(1, nband)))
+                self.assert_equal(lazy.read_ug_block(0, k, [nband-1, 0]),
+                                  eager.read_ug_block(0, k, [nband-1, 0]))
+
+            lazy.close()
+            eager.close()
+
 
 if __name__ == "__main__":
    import unittest
@@ -10,7 +10,7 @@ from abipy.core import Mesh3D, GSphere, Structure
 from abipy.core.mixins import AbinitNcFile, Has_Structure, Has_ElectronBands
 from abipy.iotools import ETSF_Reader, Visualizer 
 from abipy.electrons import ElectronsReader
-from abipy.waves.pwwave import PWWaveFunction
+from abipy.waves.pwwave import PWWaveFunction, fft_ug_block, symmetry_dmats
 
 __all__ = [
     "WfkFile",
@@ -69,17 +69,8 @@ class WfkFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
         # FFT mesh (augmented divisions reported in the WFK file)
         self.fft_mesh = Mesh3D(reader.fft_divs, self.structure.lattice_vectors())
 
-        # Build G-spheres for each k-point
-        gspheres = len(self.kpoints) * [None]
-        ecut = reader.ecut
-        for k, kpoint in enumerate(self.kpoints):
-            gvec_k, istwfk = reader.read_gvecs_istwfk(k)
-            gspheres[k] = GSphere(ecut, self.structure.reciprocal_lattice, kpoint, gvec_k, istwfk=istwfk)
-
-        self._gspheres = tuple(gspheres)
-
-        # Save reference to the reader.
-        self.reader = reader
+        # G-spheres are built on demand, see get_gsphere.
+        self._gspheres = len(self.kpoints) * [None]
 
     def close(self):
         self.reader.close()
@@ -102,7 +93,20 @@ class WfkFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
     @property
     def gspheres(self):
         """List of :class:`GSphere` objects ordered by k-points."""
-        return self._gspheres
+        return tuple(self.get_gsphere(k) for k in range(self.nkpt))
+
+    def get_gsphere(self, kpoint):
+        """
+        Return the :class:`GSphere` associated to the given k-point.
+        The G-vectors are read from file only the first time the sphere is requested.
+        """
+        k = self.kindex(kpoint)
+        if self._gspheres[k] is None:
+            gvec_k, istwfk = self.reader.read_gvecs_istwfk(k)
+            self._gspheres[k] = GSphere(self.reader.ecut, self.structure.reciprocal_lattice,
+                                        self.kpoints[k], gvec_k, istwfk=istwfk)
+
+        return self._gspheres[k]
 
     def __str__(self):
         return self.tostring()
@@ -151,15 +155,68 @@ class WfkFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
             band not in range(self.nband_sk[spin, k])):
             raise ValueError("Wrong (spin, band, kpt) indices")
 
-        ug_skb = self.reader.read_ug(spin, kpoint, band)
+        ug_skb = self.reader.read_ug(spin, k, band)
 
         # Istantiate the wavefunction object and set the FFT mesh
         # using the divisions reported in the WFK file.
-        wave = PWWaveFunction(self.nspinor, spin, band, self.gspheres[k], ug_skb)
+        wave = PWWaveFunction(self.nspinor, spin, band, self.get_gsphere(k), ug_skb)
         wave.set_mesh(self.fft_mesh)
 
         return wave
 
+    def get_waves(self, spin, kpoint, band_range=None):
+        """
+        Read a set of wavefunctions with a single netcdf call.
+
+        Args:
+            spin: spin index. Must be in (0, 1)
+            kpoint: Either :class:`Kpoint` instance or integer giving the sequential index in the IBZ (C-convention).
+            band_range: slice object or sequence of band indices. None for all the bands.
+
+        returns:
+            list of :class:`WaveFunction` instances.
+        """
+        k = self.kindex(kpoint)
+        if band_range is None:
+            band_range = slice(0, self.nband_sk[spin, k])
+        if isinstance(band_range, slice):
+            bands = list(range(self.nband_sk[spin, k]))[band_range]
+        else:
+            bands = list(band_range)
+
+        if (spin not in range(self.nsppol) or
+            k not in range(self.nkpt) or
+            any(band not in range(self.nband_sk[spin, k]) for band in bands)):
+            raise ValueError("Wrong (spin, band, kpt) indices")
+
+        ug_block = self.reader.read_ug_block(spin, k, band_range)
+        gsphere = self.get_gsphere(k)
+
+        waves = []
+        for band, ug_skb in zip(bands, ug_block):
+            wave = PWWaveFunction(self.nspinor, spin, band, gsphere, ug_skb)
+            wave.set_mesh(self.fft_mesh)
+            waves.append(wave)
+
+        return waves
+
+    def get_ur_block(self, spin, kpoint, band_range=None, backend=None):
+        """
+        Compute the periodic part of a set of wavefunctions in real space with a batched FFT.
+
+        Args:
+            spin: spin index. Must be in (0, 1)
+            kpoint: Either :class:`Kpoint` instance or integer giving the sequential index in the IBZ (C-convention).
+            band_range: slice object or sequence of band indices. None for all the bands.
+            backend: Name of the FFT backend. None to use the default one.
+
+        Returns:
+            Complex array of shape [nband, nspinor, nx, ny, nz]
+        """
+        k = self.kindex(kpoint)
+        ug_block = self.reader.read_ug_block(spin, k, band_range)
+        return fft_ug_block(self.get_gsphere(k), self.fft_mesh, ug_block, backend=backend)
+
     def export_ur2(self, filepath, spin, kpoint, band, visu=None):
         """
         Export :math:`|u(r)|^2` on file filename.
@@ -212,7 +269,7 @@ class WfkFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
         # Create list of tuples (energy, waves) for each degenerate set.
         deg_ewaves = []
         for e, bands in deg_ebands:
-            deg_ewaves.append((e, [self.get_wave(spin, k, band) for band in bands])) 
+            deg_ewaves.append((e, self.get_waves(spin, k, bands)))
 
         print("degeneracies detected:", deg_ebands)
         #print(deg_ewaves)
@@ -227,10 +284,23 @@ class WfkFile(AbinitNcFile, Has_Structure, Has_ElectronBands):
 
 
 class WFK_Reader(ElectronsReader):
-    """This object reads data from the WFK file."""
+    """
+    This object reads data from the WFK file.
 
-    def __init__(self, filepath):
-        """Initialize the object from a filename."""
+    By default, the Fourier components of the wavefunctions and the G-vectors
+    are read on demand by hyperslab so that the memory footprint does not depend
+    on the size of the file. Use `lazy=False` to load the full arrays in memory
+    at initialization (faster if most of the wavefunctions are needed).
+    """
+
+    def __init__(self, filepath, lazy=True):
+        """
+        Initialize the object from a filename.
+
+        Args:
+            filepath: Path to the netcdf file.
+            lazy: If False, the full block of wavefunctions and G-vectors is read at initialization.
+        """
         super(WFK_Reader, self).__init__(filepath)
 
         self.kpoints = self.read_kpoints()
@@ -250,15 +320,14 @@ class WFK_Reader(ElectronsReader):
         self.istwfk = self.read_value("istwfk")
         self.npwarr = self.read_value("number_of_coefficients")
 
-        # Gvectors
-        self._kg = self.read_value("reduced_coordinates_of_plane_waves")
+        if self.cplex_ug != 2:
+            raise NotImplementedError("cplex_ug %s is not supported" % self.cplex_ug)
 
-        # Wavefunctions (complex array)
-        # TODO use variables to avoid storing the full block.
-        if self.cplex_ug == 2:
+        self.lazy = lazy
+        if not lazy:
+            # Gvectors and wavefunctions (complex array)
+            self._kg = self.read_value("reduced_coordinates_of_plane_waves")
             self.ug_block = self.read_value("coefficients_of_wavefunctions", cmode="c")
-        else:
-            raise NotImplementedError("")
 
     @lazy_property
     def basis_set(self):
@@ -297,14 +366,68 @@ class WFK_Reader(ElectronsReader):
         """
         k = self.kindex(kpoint)
         npw_k, istwfk = self.npwarr[k], self.istwfk[k]
-        return self._kg[k, :npw_k, :], istwfk
+
+        if self.lazy:
+            gvecs = self.read_variable("reduced_coordinates_of_plane_waves")[k, :npw_k, :]
+            return np.asarray(gvecs), istwfk
+        else:
+            return self._kg[k, :npw_k, :], istwfk
 
     def read_ug(self, spin, kpoint, band):
         """Read the Fourier components of the wavefunction."""
         k = self.kindex(kpoint)
-        npw_k, istwfk = self.npwarr[k], self.istwfk[k]
-        # TODO use variables to avoid storing the full block.
-        return self.ug_block[spin, k, band, :, :npw_k]
+        npw_k = self.npwarr[k]
+
+        if self.lazy:
+            return self._read_ug_slab(spin, k, band, npw_k)
+        else:
+            return self.ug_block[spin, k, band, :, :npw_k]
+
+    def read_ug_block(self, spin, kpoint, band_range=None):
+        """
+        Read the Fourier components of a set of bands at the given spin and k-point.
+
+        Args:
+            spin: Spin index.
+            kpoint: :class:`Kpoint` object or integer.
+            band_range: slice object or sequence of band indices.
+                None to read all the bands available for this (spin, k-point).
+
+        Returns:
+            Complex array of shape [nband, nspinor, npw_k]
+        """
+        k = self.kindex(kpoint)
+        npw_k = self.npwarr[k]
+
+        if band_range is None:
+            band_range = slice(0, self.nband_sk[spin, k])
+
+        if isinstance(band_range, slice):
+            bands, start = band_range, 0
+        else:
+            # Read the smallest contiguous slab containing the bands, then select.
+            bands = np.asarray(band_range, dtype=np.int)
+            start, stop = bands.min(), bands.max() + 1
+            band_range = slice(start, stop)
+
+        if self.lazy:
+            ug = self._read_ug_slab(spin, k, band_range, npw_k)
+        else:
+            ug = self.ug_block[spin, k, band_range, :, :npw_k]
+
+        if isinstance(bands, slice):
+            return ug
+        else:
+            return ug[bands - start]
+
+    def _read_ug_slab(self, spin, k, bands, npw_k):
+        """
+        Read the hyperslab [spin, k, bands, :, :npw_k] of the wavefunction
+        coefficients and convert it to a complex array.
+        """
+        var = self.read_variable("coefficients_of_wavefunctions")
+        slab = np.asarray(var[spin, k, bands, :, :npw_k, :])
+        return slab[..., 0] + 1j * slab[..., 1]
 
 
 class DmatsError(Exception):
@@ -394,31 +517,22 @@ class DMatrices(object):
         self.num_degs = num_degs = len(deg_ewaves)
         num_rotk, num_classes = len(kgroup), kgroup.num_classes
 
-        # Allocate D(R) for each set of degenerated bands.
-        # Init them with np.inf. If everything goes well 
-        # only the diagonal element for the first operation 
-        # in each class has to be computed.
+        # The time-reversal operations are not used to classify the states
+        # (AFM operations are already excluded by find_little_group).
+        # symmops has the same order as the rotations in kgroup.
+        symmops, g0vecs = [], []
+        for symmop, g0 in ltk.iter_symmop_g0():
+            if symmop.has_timerev: continue
+            symmops.append(symmop)
+            g0vecs.append(g0)
+
+        # Compute the full D(R) for each set of degenerate bands.
+        # All the bands and all the operations are treated at once.
         dmats = self.num_degs * [None]
         for idg, (e, waves) in enumerate(deg_ewaves):
-            nb = len(waves)
-            dr_bbp = np.empty((num_rotk, nb, nb), dtype=np.complex)
-            dr_bbp[:,:,:] = np.inf
-            dmats[idg] = dr_bbp
-
-        # FIXME
-        # Here there's a problem since I have to exclude time_rev and afm.
-        #ltk_symmops = ltk.symmops[:48]
-        ltk_symmops = ltk.symmops[:8]
-
-        for idg, (e, waves) in enumerate(deg_ewaves):
-            nb = len(waves)
-            for isym, symmop in enumerate(ltk_symmops):
-                for (ii, wave) in enumerate(waves):
-                    rot_wave = wave.rotate(symmop)
-                    prod = wave.braket(rot_wave)
-                    # Update the entry
-                    dmats[idg][isym,ii,ii] = prod
-            print("idg", idg, "shape", dmats[idg].shape)
+            gsphere = waves[0].gsphere
+            ug_block = np.array([wave.ug for wave in waves])
+            dmats[idg] = symmetry_dmats(gsphere, ug_block, symmops, g0vecs)
 
         self.dmats = dmats
 